@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Micro-benchmark for fetch_prs.process_pr on a fixture of PR search nodes.
+
+Compares the epoch-integer timestamp path against the previous
+dateutil.isoparse implementation (kept below as the baseline), after checking
+that both produce identical rows.
+
+Usage:
+    python benchmarks/bench_process_pr.py [fixture.json.gz] [repeats]
+    GITHUB_TOKEN=... PUBLIC_REPO_OWNER=... PUBLIC_REPO_NAME=... DATE_RANGE=... \\
+        python benchmarks/bench_process_pr.py --record fixture.json.gz
+
+The default fixture (benchmarks/fixtures/pr_nodes.json.gz) holds 400 nodes in
+the shape of search result nodes, with 0-100 reviews each; they are compacted
+into PRRecords before timing. --record captures real ones from the search API
+instead.
+"""
+import gzip
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("RESPONSE_CACHE", "off") # Benchmarks must not touch the response cache
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+
+import fetch_prs
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pr_nodes.json.gz")
+RUNS = 5 # Best of
+
+
+def process_pr_isoparse(pr):
+    """process_pr as it was before the epoch-integer rewrite, for comparison."""
+    from dateutil import parser
+
+    def hours_between(d1, d2):
+        if not d1 or not d2:
+            return None
+        return int((d2 - d1).total_seconds() / 60)
+
+    created_at = parser.isoparse(pr['createdAt'])
+    merged_at = parser.isoparse(pr['mergedAt']) if pr['mergedAt'] else None
+    author = pr['author']['login'] if pr['author'] else None
+    first_review_at = None
+    first_approval_at = None
+    for node in pr['timelineItems']['nodes']:
+        if node['__typename'] == 'PullRequestReview':
+            reviewer = node['author']['login'] if node['author'] else None
+            if reviewer and reviewer != author:
+                if not first_review_at:
+                    first_review_at = parser.isoparse(node['submittedAt'])
+                if node['state'] == 'APPROVED' and not first_approval_at:
+                    first_approval_at = parser.isoparse(node['submittedAt'])
+        elif node['__typename'] == 'ReviewedEvent':
+            reviewer = node['actor']['login'] if node['actor'] else None
+            if reviewer and reviewer != author and not first_review_at:
+                first_review_at = parser.isoparse(node['createdAt'])
+        if first_review_at is not None and first_approval_at is not None:
+            break
+    t1 = hours_between(created_at, first_review_at)
+    t2 = hours_between(first_review_at, first_approval_at)
+    t3 = hours_between(first_approval_at, merged_at)
+    return {
+        'pr_number': pr['number'],
+        'created_date': pr['createdAt'],
+        'time_to_first_review_sec': t1 if t1 is not None else '',
+        'time_to_approval_sec': t2 if t2 is not None else '',
+        'time_to_merge_sec': t3 if t3 is not None else '',
+        'was_merged': 1 if pr['state'] == 'MERGED' else 0,
+        'updated_date': pr.get('updatedAt') or ''
+    }
+
+
+def load_fixture(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_fixture(path):
+    """Captures the PR nodes matching DATE_RANGE for PUBLIC_REPO_OWNER/NAME into `path`."""
+    search_query = fetch_prs.search_query_string(
+        fetch_prs.PUBLIC_REPO_OWNER, fetch_prs.PUBLIC_REPO_NAME, f"created:{fetch_prs.DATE_RANGE}"
+    )
+    nodes = [edge['node'] for edges, _, _ in fetch_prs.iter_pr_pages(search_query) for edge in edges]
+    records = [fetch_prs.compact_pr(node) for node in nodes]
+    fetch_prs.fetch_remaining_reviews(records, fetch_prs.PUBLIC_REPO_OWNER, fetch_prs.PUBLIC_REPO_NAME)
+    for node, record in zip(nodes, records):
+        # Store every review, in the node shape, so the fixture needs no follow-up pages
+        node['timelineItems'] = {'nodes': [
+            {'__typename': 'PullRequestReview', 'author': {'login': review.reviewer} if review.reviewer else None,
+             'state': review.state, 'submittedAt': review.submitted_at}
+            for review in record.reviews
+        ]}
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(nodes, f, separators=(",", ":"))
+    print(f"Recorded {len(nodes)} PR nodes to {path}")
+
+
+def best_time(func, nodes, clear=None):
+    """Best wall time of RUNS passes over `nodes`, calling `clear` before each pass."""
+    best = None
+    for _ in range(RUNS):
+        if clear:
+            clear()
+        start = time.perf_counter()
+        for node in nodes:
+            func(node)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--record"]:
+        record_fixture(args[1] if len(args) > 1 else DEFAULT_FIXTURE)
+        return
+    fixture = args[0] if args else DEFAULT_FIXTURE
+    repeats = int(args[1]) if len(args) > 1 else 10
+
+    nodes = load_fixture(fixture)
+    reviews = sum(len(node['timelineItems']['nodes']) for node in nodes)
+    records = [fetch_prs.compact_pr(node) for node in nodes]
+    print(f"Fixture: {len(nodes)} PRs, {reviews} review nodes ({fixture}); "
+          f"{len(nodes) * repeats} PRs per pass, best of {RUNS}")
+
+    clear_cache = fetch_prs.epoch_seconds.cache_clear
+    fast = best_time(fetch_prs.process_pr, records * repeats, clear_cache)
+    workload = nodes * repeats
+    print(f"  epoch-int process_pr : {fast * 1000:8.1f} ms  ({len(workload) / fast:,.0f} PRs/s)")
+
+    try:
+        import dateutil # noqa: F401
+    except ImportError:
+        print("  dateutil not installed; skipping the isoparse baseline.")
+        return
+    for node, record in zip(nodes, records):
+        if fetch_prs.process_pr(record) != process_pr_isoparse(node):
+            print(f"Mismatch on PR #{node['number']}", file=sys.stderr)
+            sys.exit(1)
+    slow = best_time(process_pr_isoparse, workload)
+    print(f"  isoparse baseline    : {slow * 1000:8.1f} ms  ({len(workload) / slow:,.0f} PRs/s)")
+    print(f"  speedup              : {slow / fast:.1f}x (identical rows)")
+
+
+if __name__ == "__main__":
+    main()
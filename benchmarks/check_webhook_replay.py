@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Replay check: a second delivery for the same PR must pick up the PR's new state.
+
+Starts the fake API and scripts/webhook_receiver.py with the response cache
+on, then replays the recorded deliveries for one PR
+(benchmarks/fixtures/webhook_deliveries.jsonl) twice. Between the two
+replays the PR's updatedAt changes in the fake, and the check fails unless
+prs.csv shows the new value after the second flush.
+
+    python benchmarks/check_webhook_replay.py [--pr 3] [--timeout 20]
+
+Exits 0 when the row is current, 1 otherwise.
+"""
+import argparse
+import csv
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from fake_github import DATA_START, Dataset, FakeGitHub, _ts
+from run_benchmarks import ROOT, run_env
+
+FIXTURE = os.path.join(ROOT, "benchmarks", "fixtures", "webhook_deliveries.jsonl")
+RECEIVER = os.path.join(ROOT, "scripts", "webhook_receiver.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def pr_row(path, number):
+    if not os.path.exists(path):
+        return None
+    with open(path, newline="", encoding="utf-8") as f:
+        return next((row for row in csv.DictReader(f) if row["pr_number"] == str(number)), None)
+
+
+def pr_deliveries(number):
+    """The recorded deliveries about PR `number`, as JSON lines."""
+    with open(FIXTURE, encoding="utf-8") as f:
+        return [line for line in f
+                if ((json.loads(line)["payload"].get("pull_request") or {}).get("number")) == number]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays two deliveries for one PR with changed data in between.")
+    parser.add_argument("--pr", type=int, default=3, help="PR number with recorded deliveries")
+    parser.add_argument("--timeout", type=float, default=20, help="seconds to wait for each flush")
+    args = parser.parse_args()
+
+    deliveries = pr_deliveries(args.pr)
+    if not deliveries:
+        parser.error(f"no recorded deliveries for PR #{args.pr} in {FIXTURE}")
+    dataset = Dataset(scale=1)
+    fake = FakeGitHub(dataset).start()
+    workdir = tempfile.mkdtemp(prefix="webhook-replay-")
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/"
+    env = run_env(fake)
+    env.update({
+        "RESPONSE_CACHE": os.path.join(workdir, "cache.sqlite"), # On, as in production
+        "WEBHOOK_PORT": str(port),
+        "WEBHOOK_SECRET": "replay-check",
+        "WEBHOOK_FLUSH_SEC": "0.5",
+        "WEBHOOK_RECONCILE_SEC": "0",
+        "WEBHOOK_DASHBOARD": "false",
+    })
+    prs_csv = os.path.join(workdir, "prs.csv")
+    log = open(os.path.join(workdir, "receiver.log"), "w")
+    receiver = subprocess.Popen([sys.executable, RECEIVER], cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    def replay(lines, name):
+        path = os.path.join(workdir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        subprocess.run([sys.executable, RECEIVER, "replay", path, url], env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+
+    ok = False
+    try:
+        if not wait_for(lambda: socket.socket().connect_ex(("127.0.0.1", port)) == 0, args.timeout):
+            print("Receiver did not start.", file=sys.stderr)
+            return 1
+        replay(deliveries[:1], "first.jsonl")
+        if not wait_for(lambda: pr_row(prs_csv, args.pr), args.timeout):
+            print(f"PR #{args.pr} was not written after the first delivery.", file=sys.stderr)
+            return 1
+        before = pr_row(prs_csv, args.pr)["updated_date"]
+
+        pr = dataset.prs_by_number[args.pr]
+        pr["updatedAt"] = _ts(DATA_START + timedelta(days=400))
+        replay(deliveries[-1:], "second.jsonl")
+        ok = wait_for(lambda: pr_row(prs_csv, args.pr)["updated_date"] == pr["updatedAt"], args.timeout)
+        after = pr_row(prs_csv, args.pr)["updated_date"]
+        print(f"PR #{args.pr} updated_date: {before} -> {after} (expected {pr['updatedAt']}): "
+              f"{'current' if ok else 'STALE'}")
+    finally:
+        receiver.send_signal(signal.SIGTERM)
+        receiver.wait(30)
+        log.close()
+        fake.stop()
+    if not ok:
+        print(f"Receiver log: {log.name}", file=sys.stderr)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
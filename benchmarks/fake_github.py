@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Local stand-in for the GitHub GraphQL API, for offline benchmarks.
+
+Serves deterministic synthetic data for every query the fetchers send:
+commit `history`, repository `issues` with paginated timelines, aliased
+`issue.timelineItems`, `pullRequest.commits` and `pullRequest.timelineItems`
+batches, PR `search`
+(with created:/updated: filters, issueCount probes, paginated review
+timelines and, if selected, a first page of commits), `totalCount` probes
+and rateLimit(dryRun: true) estimates and `defaultBranchRef`. Reported rateLimit costs follow GitHub's
+formula. It can also inject per-request latency, secondary rate-limit
+responses and 5xx errors.
+
+Point a fetcher at it with GITHUB_GRAPHQL_URL=http://127.0.0.1:<port>/graphql.
+Run standalone to poke at it by hand:
+
+    python benchmarks/fake_github.py --scale 4 --latency-ms 50 --port 8765
+"""
+import http.server
+import json
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+# --- Dataset shape at scale 1 ---
+COMMITS_PER_SCALE = 600
+ISSUES_PER_SCALE = 300
+PRS_PER_SCALE = 300
+AUTHORS_PER_SCALE = 40
+DATA_START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+DATA_DAYS = 180
+RATE_LIMIT_REMAINING = 4999 # Reported budget; kept high so clients never wait for a reset
+BUSY_PR_RATE = 0.1 # PRs whose review discussion runs on long after the first reviews
+BUSY_ISSUE_RATE = 0.05 # Long-lived issues cross-referenced by many PRs
+
+
+def _ts(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_ts(value, end_of_day=False):
+    """Parses the bounds used in search filters: a day or a full timestamp."""
+    if len(value) == 10:
+        value += "T23:59:59Z" if end_of_day else "T00:00:00Z"
+    return value
+
+
+class Dataset:
+    """Synthetic repository activity, deterministic for a given scale and seed."""
+
+    def __init__(self, scale=1, seed=1):
+        rng = random.Random(seed)
+        authors = [f"dev{i}" for i in range(AUTHORS_PER_SCALE * scale)]
+
+        def moment():
+            return DATA_START + timedelta(seconds=rng.randrange(DATA_DAYS * 86400))
+
+        self.commits = []
+        for n in range(COMMITS_PER_SCALE * scale):
+            author = rng.choice(authors)
+            self.commits.append({
+                "oid": f"{n:040x}",
+                "messageHeadline": f"Commit {n}",
+                "committedDate": _ts(moment()),
+                "changedFilesIfAvailable": rng.randint(1, 20),
+                "additions": rng.randint(0, 400),
+                "deletions": rng.randint(0, 200),
+                "author": {"name": author.title(), "email": f"{author}@example.com",
+                           "user": {"login": author} if rng.random() < 0.9 else None},
+            })
+        self.commits.sort(key=lambda c: c["committedDate"], reverse=True) # history is newest first
+        self.commits_by_oid = {commit["oid"]: commit for commit in self.commits}
+
+        self.prs = []
+        self.pr_commit_authors = {}
+        busy_rng = random.Random(seed + 1) # Separate stream keeps the rest of the data unchanged
+        for number in range(1, PRS_PER_SCALE * scale + 1):
+            created = moment()
+            author = rng.choice(authors)
+            reviews = []
+            t = created
+            for _ in range(rng.choice([0, 1, 1, 2, 3, 5, 8])):
+                t += timedelta(minutes=rng.randint(5, 3000))
+                reviews.append({
+                    "__typename": "PullRequestReview",
+                    "author": {"login": rng.choice(authors)},
+                    "state": rng.choice(["COMMENTED", "COMMENTED", "APPROVED", "CHANGES_REQUESTED"]),
+                    "submittedAt": _ts(t),
+                })
+            if busy_rng.random() < BUSY_PR_RATE:
+                # Long review threads; replies by the PR author also count as reviews
+                burst = busy_rng.randint(5, 150)
+                for minutes in range(1, burst + 1):
+                    reviews.append({"__typename": "PullRequestReview",
+                                    "author": {"login": busy_rng.choice([author, busy_rng.choice(authors)])},
+                                    "state": "COMMENTED", "submittedAt": _ts(t + timedelta(minutes=minutes))})
+                t += timedelta(minutes=burst)
+            merged = rng.random() < 0.6
+            merged_at = _ts(t + timedelta(minutes=rng.randint(5, 3000))) if merged else None
+            self.prs.append({
+                "number": number, "title": f"PR {number}", "author": {"login": author},
+                "state": "MERGED" if merged else rng.choice(["OPEN", "CLOSED"]),
+                "createdAt": _ts(created), "updatedAt": _ts(t + timedelta(days=1)),
+                "mergedAt": merged_at, "closedAt": merged_at, "merged": merged,
+                "reviews": reviews,
+            })
+            commit_count = rng.choice([1, 1, 2, 3, 5, 8, 40, 150])
+            self.pr_commit_authors[number] = [rng.choice(authors + [author] * 4) for _ in range(commit_count)]
+        self.prs_by_number = {pr["number"]: pr for pr in self.prs}
+
+        self.issues = []
+        busy_rng = random.Random(seed + 2)
+        for number in range(1, ISSUES_PER_SCALE * scale + 1):
+            created = moment()
+            closed = rng.random() < 0.6
+            links = [rng.randint(1, len(self.prs)) for _ in range(rng.choice([0, 0, 1, 1, 2, 3]))]
+            if busy_rng.random() < BUSY_ISSUE_RATE:
+                links += [busy_rng.randint(1, len(self.prs)) for _ in range(busy_rng.randint(10, 120))]
+            self.issues.append({
+                "id": f"I_{number}", "number": number, "title": f"Issue {number}",
+                "state": "CLOSED" if closed else "OPEN",
+                "createdAt": _ts(created),
+                "closedAt": _ts(created + timedelta(days=rng.randint(0, 30))) if closed else None,
+                "updatedAt": _ts(created + timedelta(days=rng.randint(0, 40))),
+                "timeline": [
+                    {"__typename": "CrossReferencedEvent",
+                     "source": {"__typename": "PullRequest", "number": link, "repository": {"nameWithOwner": "bench/repo"}}}
+                    for link in links
+                ],
+            })
+        self.issues.sort(key=lambda i: i["updatedAt"], reverse=True) # orderBy UPDATED_AT DESC
+        self.issues_by_number = {issue["number"]: issue for issue in self.issues}
+        self.linked_prs = {event["source"]["number"] for issue in self.issues for event in issue["timeline"]}
+
+
+def _page(items, cursor, per_page):
+    start = int(cursor or 0)
+    end = min(len(items), start + per_page)
+    return items[start:end], {"endCursor": str(end), "hasNextPage": end < len(items)}
+
+
+def _first(query, field, default):
+    match = re.search(field + r"\([^)]*first:\s*(\d+)", query, re.S)
+    return int(match.group(1)) if match else default
+
+
+def _with_timeline(item, items_key, window):
+    """The API node for an issue or PR: its first `window` timeline items replace `items_key`."""
+    node = {key: value for key, value in item.items() if key != items_key}
+    nodes, page_info = _page(item[items_key], None, window)
+    node["timelineItems"] = {"pageInfo": page_info, "nodes": nodes}
+    return node
+
+
+def _cost(connection_requests):
+    """GitHub's query cost: requests needed for every connection, divided by 100, at least 1."""
+    return max(1, round(connection_requests / 100))
+
+
+class FakeGitHub:
+    """Threaded HTTP server answering the fetchers' GraphQL queries from a Dataset."""
+
+    def __init__(self, dataset, latency_ms=0, rate_limit_rate=0.0, error_rate=0.0, retry_after_sec=1, seed=1, port=0):
+        self.dataset = dataset
+        self.latency_sec = latency_ms / 1000
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after_sec = retry_after_sec
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_counters()
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/graphql"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.rate_limited = 0
+            self.errors = 0
+            self.bytes_sent = 0
+
+    # --- Query handling ---
+    def answer(self, body):
+        query = body.get("query", "")
+        variables = body.get("variables") or {}
+        rate_limit = {"cost": _cost(self._connection_requests(query, variables)),
+                      "remaining": RATE_LIMIT_REMAINING, "resetAt": "2099-01-01T00:00:00Z"}
+        if "dryRun: true" in query: # Priced, not run (cost_planner.py)
+            return {"data": {"estimate": rate_limit}}
+        data = {"rateLimit": rate_limit}
+        if "totalCount" in query: # Planning probes
+            since = variables.get("since") or ""
+            if "history(" in query:
+                count = sum(1 for c in self.dataset.commits if c["committedDate"] >= since)
+                data["repository"] = {"ref": {"target": {"history": {"totalCount": count}}}}
+            else:
+                count = sum(1 for i in self.dataset.issues if i["updatedAt"] >= since)
+                data["repository"] = {"issues": {"totalCount": count}}
+            if "search(" in query:
+                data["search"] = self._search(query, {"searchQuery": variables.get("linkedPRs", "")})
+        elif "defaultBranchRef" in query:
+            data["repository"] = {"defaultBranchRef": {"name": "main"}}
+        elif "history(" in query:
+            since = re.search(r'since:\s*"([^"]+)"', query).group(1)
+            after = re.search(r'after:\s*"([^"]+)"', query)
+            commits = [c for c in self.dataset.commits if c["committedDate"] >= since]
+            nodes, page_info = _page(commits, after and after.group(1), _first(query, "history", 100))
+            data["repository"] = {"ref": {"target": {"history": {"nodes": nodes, "pageInfo": page_info}}}}
+        elif "issues(" in query:
+            since = variables.get("since") or ""
+            issues = [i for i in self.dataset.issues if i["updatedAt"] >= since]
+            nodes, page_info = _page(issues, variables.get("cursor"), _first(query, "issues", 100))
+            window = _first(query, "timelineItems", 100)
+            data["repository"] = {"issues": {"nodes": [_with_timeline(issue, "timeline", window) for issue in nodes],
+                                             "pageInfo": page_info}}
+        elif "search(" in query:
+            data["search"] = self._search(query, variables)
+        elif "object(oid" in query: # Aliased commit lookups (webhook_receiver.py)
+            data["repository"] = {f"c{i}": self.dataset.commits_by_oid.get(variables[f"oid{i}"])
+                                  for i in range(sum(1 for name in variables if name.startswith("oid")))}
+        i = 0
+        while f"number{i}" in variables: # Aliased issue or pullRequest batch
+            if "issue(number" in query:
+                data[f"issue{i}"] = self._issue_timeline(variables[f"number{i}"], variables.get(f"cursor{i}"), query)
+            elif "timelineItems(" in query:
+                data[f"pr{i}"] = self._pr_reviews(variables[f"number{i}"], variables.get(f"cursor{i}"), query)
+            else:
+                data[f"pr{i}"] = self._pr_commits(variables[f"number{i}"], variables.get(f"cursor{i}"), query)
+            i += 1
+        return {"data": data}
+
+    def _connection_requests(self, query, variables):
+        """Requests GitHub would count for the query: one per connection, times its parents' page size."""
+        if "search(" in query and "edges" in query:
+            # Each PR's timelineItems (and commits, when selected) is a nested connection
+            return 1 + _first(query, "search", 50) * (2 if "commits(" in query else 1)
+        if "issues(" in query:
+            return 1 + _first(query, "issues", 100)
+        aliases = sum(1 for name in variables if name.startswith("number"))
+        return max(1, aliases)
+
+    def _search(self, query, variables):
+        search_query = variables.get("searchQuery", "")
+        prs = self.dataset.prs
+        created = re.search(r"created:(\S+)\.\.(\S+)", search_query)
+        if created:
+            low, high = _parse_ts(created.group(1)), _parse_ts(created.group(2), end_of_day=True)
+            prs = [pr for pr in prs if low <= pr["createdAt"] <= high]
+        updated = re.search(r"updated:>=(\S+)", search_query)
+        if updated:
+            prs = [pr for pr in prs if pr["updatedAt"] >= updated.group(1)]
+        if "linked:issue" in search_query:
+            prs = [pr for pr in prs if pr["number"] in self.dataset.linked_prs]
+        if "sort:created-desc" in search_query:
+            prs = sorted(prs, key=lambda pr: pr["createdAt"], reverse=True)
+        edges, page_info = _page(prs, variables.get("cursor"), _first(query, "search", 50))
+        window = _first(query, "timelineItems", 100)
+        nodes = [_with_timeline(pr, "reviews", window) for pr in edges]
+        if "commits(" in query: # fetch_all.py also collects the first commit authors
+            for node in nodes:
+                node["commits"] = self._pr_commits(node["number"], None, query)["pullRequest"]["commits"]
+        return {"issueCount": len(prs), "pageInfo": page_info, "edges": [{"node": node} for node in nodes]}
+
+
+    def _issue_timeline(self, number, cursor, query):
+        issue = self.dataset.issues_by_number.get(number)
+        if issue is None:
+            return {"issue": None}
+        nodes, page_info = _page(issue["timeline"], cursor, _first(query, "timelineItems", 100))
+        return {"issue": {"timelineItems": {"pageInfo": page_info, "nodes": nodes}}}
+
+    def _pr_reviews(self, number, cursor, query):
+        pr = self.dataset.prs_by_number.get(number)
+        if pr is None:
+            return {"pullRequest": None}
+        nodes, page_info = _page(pr["reviews"], cursor, _first(query, "timelineItems", 100))
+        fields = {key: value for key, value in pr.items() if key != "reviews"} if "createdAt" in query else {}
+        return {"pullRequest": dict(fields, timelineItems={"pageInfo": page_info, "nodes": nodes})}
+
+    def _pr_commits(self, number, cursor, query):
+        pr = self.dataset.prs_by_number.get(number)
+        if pr is None:
+            return {"pullRequest": None}
+        authors = self.dataset.pr_commit_authors[number]
+        nodes, page_info = _page(authors, cursor, _first(query, "commits", 100))
+        return {"pullRequest": {"state": pr["state"], "commits": {
+            "pageInfo": page_info,
+            "nodes": [{"commit": {"author": {"user": {"login": login}, "name": login.title()}}} for login in nodes],
+        }}}
+
+    def _fault(self):
+        """Returns 'rate_limit', 'error' or None for the next request."""
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.rate_limit_rate:
+            return "rate_limit"
+        if roll < self.rate_limit_rate + self.error_rate:
+            return "error"
+        return None
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                with fake._lock:
+                    fake.bytes_sent += len(payload)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake._lock:
+                    fake.requests += 1
+                if fake.latency_sec:
+                    time.sleep(fake.latency_sec)
+                fault = fake._fault()
+                if fault == "rate_limit":
+                    with fake._lock:
+                        fake.rate_limited += 1
+                    message = b'{"message":"You have exceeded a secondary rate limit."}'
+                    self._send(403, message, [("Retry-After", str(fake.retry_after_sec))])
+                elif fault == "error":
+                    with fake._lock:
+                        fake.errors += 1
+                    self._send(502)
+                else:
+                    payload = json.dumps(fake.answer(body), separators=(",", ":")).encode()
+                    self._send(200, payload, [("Content-Type", "application/json"),
+                                              ("X-RateLimit-Remaining", str(RATE_LIMIT_REMAINING))])
+
+        return Handler
+
+
+# --- Main Execution ---
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    args = parser.parse_args()
+    fake = FakeGitHub(Dataset(args.scale), args.latency_ms, args.rate_limit_rate, args.error_rate, port=args.port).start()
+    print(f"Fake GitHub GraphQL API on {fake.url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
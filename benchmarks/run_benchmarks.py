@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for the fetch scripts against benchmarks/fake_github.py.
+
+Runs fetch_commits.py, fetch_issues.py, fetch_prs.py and fetch_all.py
+(all three in one process) as subprocesses against the local fake API at several data sizes. Each run gets a fresh
+working directory and the response cache is off. For every run it reports
+wall time, request count, rows written, throughput (rows/s) and the peak RSS
+of the child process.
+
+    python benchmarks/run_benchmarks.py                            # all scripts, all sizes
+    python benchmarks/run_benchmarks.py --sizes 1,4 --latency-ms 20 --rate-limit-rate 0.02
+    python benchmarks/run_benchmarks.py --save benchmarks/baseline.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json [--max-slowdown 1.5]
+
+With --baseline the run fails (exit 1) when a script sends more requests or
+writes a different number of rows than the baseline recorded. Both numbers
+are deterministic for a given size. Wall time and RSS are only checked when
+--max-slowdown is given, because they depend on the machine.
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_github import DATA_START, DATA_DAYS, Dataset, FakeGitHub
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = { # script -> the CSVs whose rows it writes
+    "fetch_commits.py": ["commits.csv"],
+    "fetch_issues.py": ["issues.csv"],
+    "fetch_prs.py": ["prs.csv"],
+    "fetch_all.py": ["commits.csv", "issues.csv", "prs.csv"],
+}
+DEFAULT_SIZES = [1, 4, 16]
+# Runs argv[2:] and writes its peak RSS (ru_maxrss) to argv[1]. A process started
+# straight from this one would inherit its high-water RSS (fake dataset included)
+# across exec, so the fetcher is forked from this small launcher instead.
+RSS_LAUNCHER = '''
+import os, sys
+pid = os.fork()
+if pid == 0:
+    os.execv(sys.argv[2], sys.argv[2:])
+_, status, usage = os.wait4(pid, 0)
+with open(sys.argv[1], "w") as f:
+    f.write(str(usage.ru_maxrss))
+sys.exit(os.waitstatus_to_exitcode(status))
+'''
+
+
+def run_env(fake):
+    """Environment for a fetcher run against `fake`, covering the whole synthetic window."""
+    end = DATA_START.toordinal() + DATA_DAYS
+    end_day = DATA_START.fromordinal(end).strftime("%Y-%m-%d")
+    env = dict(os.environ)
+    env.update({
+        "GITHUB_TOKEN": "benchmark",
+        "GITHUB_GRAPHQL_URL": fake.url,
+        "PUBLIC_REPO_OWNER": "bench",
+        "PUBLIC_REPO_NAME": "repo",
+        "SINCE_DATE": DATA_START.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "DATE_RANGE": f"{DATA_START:%Y-%m-%d}..{end_day}",
+        "RESPONSE_CACHE": "off",
+        "INCREMENTAL": "",
+        "PYTHONUNBUFFERED": "1",
+        "PYTHONHASHSEED": "0", # Python set order decides PR batch composition, hence request counts
+    })
+    return env
+
+
+def count_rows(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, newline="", encoding="utf-8") as f:
+        return max(0, sum(1 for _ in csv.reader(f)) - 1)
+
+
+def run_script(script, fake, extra_env):
+    """Runs one fetcher to completion and returns its metrics."""
+    fake.reset_counters()
+    with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        env = run_env(fake)
+        env.update(extra_env)
+        log_path = os.path.join(workdir, "run.log")
+        rss_path = os.path.join(workdir, "rss.txt")
+        with open(log_path, "w") as log:
+            start = time.perf_counter()
+            returncode = subprocess.call(
+                [sys.executable, "-c", RSS_LAUNCHER, rss_path, sys.executable, os.path.join(ROOT, "scripts", script)],
+                cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+            wall = time.perf_counter() - start
+        rows = sum(count_rows(os.path.join(workdir, output)) for output in SCRIPTS[script])
+        if returncode != 0:
+            with open(log_path) as log:
+                tail = log.read()[-2000:]
+            print(f"  {script} exited with {returncode}:\n{tail}", file=sys.stderr)
+        with open(rss_path) as f:
+            max_rss = int(f.read()) # KiB on Linux, bytes on macOS
+    rss_kib = max_rss if sys.platform != "darwin" else max_rss // 1024
+    return {
+        "exit_code": returncode,
+        "wall_sec": round(wall, 3),
+        "requests": fake.requests,
+        "rate_limited": fake.rate_limited,
+        "errors": fake.errors,
+        "bytes": fake.bytes_sent,
+        "rows": rows,
+        "rows_per_sec": round(rows / wall, 1) if wall else 0.0,
+        "peak_rss_mib": round(rss_kib / 1024, 1),
+    }
+
+
+def print_table(results):
+    header = f"{'script':<18} {'size':>4} {'wall s':>8} {'requests':>8} {'rows':>7} {'rows/s':>9} {'RSS MiB':>8} {'429/403':>7} {'5xx':>4}"
+    print(header)
+    print("-" * len(header))
+    for key, r in results.items():
+        script, size = key.rsplit("@", 1)
+        print(f"{script:<18} {size:>4} {r['wall_sec']:>8.2f} {r['requests']:>8} {r['rows']:>7} "
+              f"{r['rows_per_sec']:>9.0f} {r['peak_rss_mib']:>8.1f} {r['rate_limited']:>7} {r['errors']:>4}")
+
+
+def compare(results, baseline, max_slowdown):
+    """Returns a list of regression messages versus `baseline`."""
+    problems = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if r["requests"] > base["requests"]:
+            problems.append(f"{key}: {r['requests']} requests, baseline {base['requests']}")
+        if r["rows"] != base["rows"]:
+            problems.append(f"{key}: {r['rows']} rows written, baseline {base['rows']}")
+        if max_slowdown:
+            if r["wall_sec"] > base["wall_sec"] * max_slowdown:
+                problems.append(f"{key}: {r['wall_sec']}s wall, baseline {base['wall_sec']}s")
+            if r["peak_rss_mib"] > base["peak_rss_mib"] * max_slowdown:
+                problems.append(f"{key}: {r['peak_rss_mib']} MiB peak RSS, baseline {base['peak_rss_mib']} MiB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline fetcher benchmarks against a fake GitHub API.")
+    parser.add_argument("--scripts", default=",".join(SCRIPTS), help="comma-separated subset of %s" % ", ".join(SCRIPTS))
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="dataset scale factors")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added to every response")
+    parser.add_argument("--rate-limit-rate", type=float, default=0, help="fraction of requests answered 403 secondary limit")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered 502")
+    parser.add_argument("--workers", type=int, default=None, help="FETCH_WORKERS for the fetchers")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a saved JSON and fail on regressions")
+    parser.add_argument("--max-slowdown", type=float, default=None, help="also fail when wall time or RSS exceed baseline by this factor")
+    args = parser.parse_args()
+
+    scripts = [s for s in args.scripts.split(",") if s]
+    unknown = set(scripts) - set(SCRIPTS)
+    if unknown:
+        parser.error(f"unknown scripts: {sorted(unknown)}")
+    extra_env = {"GITHUB_MAX_RETRIES": "10"} # Injected faults must not exhaust the retry budget
+    if args.workers:
+        extra_env["FETCH_WORKERS"] = str(args.workers)
+
+    results = {}
+    for size in [int(s) for s in args.sizes.split(",") if s]:
+        fake = FakeGitHub(Dataset(scale=size), args.latency_ms, args.rate_limit_rate, args.error_rate).start()
+        try:
+            for script in scripts:
+                print(f"Running {script} at size {size}...", file=sys.stderr)
+                results[f"{script}@{size}"] = run_script(script, fake, extra_env)
+        finally:
+            fake.stop()
+
+    print_table(results)
+    failed = [key for key, r in results.items() if r["exit_code"] != 0]
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved results to {args.save}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.max_slowdown)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}.")
+    if failed:
+        print(f"Failed runs: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,153 +1,214 @@
 $(document).ready(function() {
-    const issueDataPath = 'issues.csv';
-    const commitDataPath = 'commits.csv';
-    const prDataPath = 'prs.csv';
+    // Pre-aggregated by scripts/build_dashboard_data.py from the fetched CSVs: one directory per
+    // dataset, with a manifest listing its monthly partitions and an all-months summary
+    const dataDir = 'dashboard';
+    const GANTT_DEFAULT_MONTHS = 3; // The Gantt chart opens on the latest months, not all of history
 
     // Tooltip setup
     const ganttTooltip = d3.select("#gantt-tooltip");
     const scatterTooltip = d3.select("#scatter-tooltip");
     const barTooltip = d3.select("#bar-tooltip");
 
-    // --- Data Loading and Processing ---
-    Promise.all([
-        d3.csv(issueDataPath),
-        d3.csv(commitDataPath),
-        d3.csv(prDataPath)
-    ]).then(function([issueData, commitData, prData]) {
+    const manifests = {};
+    const partitionCache = new Map(); // "dataset/file" -> Promise of the parsed partition
+
+    // Partitions are gzipped JSON. Servers that send them with Content-Encoding: gzip hand over
+    // JSON already; otherwise the gzip magic bytes are there and the browser inflates it here.
+    function loadGzipJSON(url) {
+        return fetch(url).then(response => {
+            if (!response.ok) throw new Error(`${url}: HTTP ${response.status}`);
+            return response.arrayBuffer();
+        }).then(buffer => {
+            const bytes = new Uint8Array(buffer);
+            if (bytes[0] !== 0x1f || bytes[1] !== 0x8b) return JSON.parse(new TextDecoder().decode(bytes));
+            const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+            return new Response(stream).json();
+        });
+    }
+
+    // The summary ('all') or one month of a dataset; null if the manifest does not list it.
+    // Each file is fetched at most once per page load.
+    function loadPartition(dataset, month) {
+        const manifest = manifests[dataset];
+        const entry = month === 'all' ? manifest && manifest.summary : manifest && manifest.partitions[month];
+        if (!entry) return Promise.resolve(null);
+        const key = `${dataset}/${entry.path}`;
+        if (!partitionCache.has(key)) partitionCache.set(key, loadGzipJSON(`${dataDir}/${key}`));
+        return partitionCache.get(key);
+    }
+
+    function loadPartitions(dataset, months) {
+        return Promise.all(months.map(month => loadPartition(dataset, month)))
+            .then(partitions => partitions.filter(p => p));
+    }
+
+    function partitionMonths(dataset) {
+        return manifests[dataset] ? Object.keys(manifests[dataset].partitions).sort() : [];
+    }
+
+    // --- Data Loading and Processing --- (Only the manifests up front; partitions as the filters need them)
+    Promise.all(['issues', 'commits', 'prs'].map(dataset =>
+        d3.json(`${dataDir}/${dataset}/manifest.json`).catch(error => {
+            console.warn(`Could not load the ${dataset} manifest:`, error);
+            return null;
+        })
+    )).then(function([issueManifest, commitManifest, prManifest]) {
+        Object.assign(manifests, { issues: issueManifest, commits: commitManifest, prs: prManifest });
+
         // Basic check if data loaded
-        if (!issueData || issueData.length === 0) {
+        const hasIssues = issueManifest && issueManifest.rows > 0;
+        if (!hasIssues) {
             console.warn("Issue data is empty or failed to load.");
-            // Optionally display a message to the user in the chart container
-            d3.select("#gantt-chart").html("<p class='text-danger text-center'>Could not load issues.csv</p>");
-            // return; // Stop if issues are critical
+            d3.select("#gantt-chart").html("<p class='text-danger text-center'>Could not load issue data</p>");
         }
-        if (!commitData || commitData.length === 0) {
+        const hasCommits = commitManifest && commitManifest.rows > 0;
+        if (!hasCommits) {
             console.warn("Commit data is empty or failed to load.");
-            d3.select("#scatter-chart").html("<p class='text-danger text-center'>Could not load commits.csv</p>");
-            d3.select("#bar-chart").html("<p class='text-danger text-center'>Could not load commits.csv</p>");
-            // return; // Stop if commits are critical
+            d3.select("#scatter-chart").html("<p class='text-danger text-center'>Could not load commit data</p>");
+            d3.select("#bar-chart").html("<p class='text-danger text-center'>Could not load commit data</p>");
         }
-        if (!prData || prData.length === 0) {
+        if (!prManifest) {
             console.warn("PR data is empty or failed to load.");
-            d3.select("#funnel-chart").html("<p class='text-danger text-center'>Could not load prs.csv</p>");
-            return;
+            d3.select("#funnel-chart").html("<p class='text-danger text-center'>Could not load PR data</p>");
         }
 
-        // --- Process Issue Data --- (Handle potential errors)
-        const parseTime = d3.timeParse("%Y-%m-%dT%H:%M:%SZ");
-        let processedIssues = [];
-        if (issueData) {
-            processedIssues = issueData.map(d => {
-                const created = parseTime(d.created_date);
-                let closed = d.closed_date ? parseTime(d.closed_date) : new Date(); // Use current date if not closed
-                return {
-                    id: d.issue_id,
-                    number: +d.issue_number,
-                    title: d.title,
-                    state: d.state?.toUpperCase() || 'OPEN', // Default to OPEN if state is missing
-                    startDate: created,
-                    endDate: closed,
-                    contributors: d.contributors ? d.contributors.split(';').filter(c => c.trim() !== '') : [],
-                    duration: (created && closed) ? d3.timeDay.count(created, closed) : 0,
-                    repoOwner: d.repo_owner,
-                    repoName: d.repo_name
-                };
-            }).filter(d => d.startDate); // Filter out issues with invalid start dates
+        // Populate month filters
+        if (hasCommits) {
+            const commitMonths = partitionMonths('commits');
+            populateMonthFilters(commitMonths);
+            // One month of points keeps the first paint the same size however long the history gets
+            $('#scatter-month-filter').val(commitMonths[commitMonths.length - 1]);
         }
-
-        // --- Process Commit Data ---
-        let processedCommits = [];
-        if (commitData) {
-            processedCommits = commitData.map(d => {
-                const date = parseTime(d.created_date);
-                return {
-                    sha: d.sha,
-                    message: d.message,
-                    date: date,
-                    filesChanged: +d.number_of_files_updated,
-                    diff: +d.diff,
-                    author: d.author,
-                    weekday: date ? date.getDay() : -1, // 0 = Sunday, 6 = Saturday
-                    hour: date ? date.getHours() : -1,
-                    month: date ? date.getMonth() : -1, // 0 = January, 11 = December
-                    year: date ? date.getFullYear() : -1,
-                    repoOwner: d.repo_owner,
-                    repoName: d.repo_name
-                };
-            }).filter(d => d.date && d.weekday !== -1 && d.hour !== -1); // Filter out commits with invalid dates
+        if (prManifest) populateFunnelMonthFilter(partitionMonths('prs'));
+        if (hasIssues && !$('#gantt-start-date').val()) {
+            const latest = d3.timeParse("%Y-%m")(partitionMonths('issues').slice(-1)[0]);
+            $('#gantt-start-date').val(d3.timeFormat("%Y-%m-%d")(d3.timeMonth.offset(latest, 1 - GANTT_DEFAULT_MONTHS)));
         }
 
-        // Populate month filters
-        populateMonthFilters(processedCommits);
-        populateFunnelMonthFilter(prData);
-
         // --- Initial Chart Renders ---
-        if (processedIssues.length > 0) renderGanttChart(processedIssues);
-        if (processedCommits.length > 0) {
-            renderScatterChart(processedCommits);
-            renderBarChart(processedCommits);
+        if (hasIssues) showGanttChart();
+        if (hasCommits) {
+            showScatterChart();
+            showBarChart();
         }
+        if (prManifest) showFunnelChart();
 
         // --- Event Listeners for Filters ---
         // Gantt Filters
         $('#gantt-filter-apply').on('click', () => {
-            if (processedIssues.length > 0) renderGanttChart(processedIssues);
+            if (hasIssues) showGanttChart();
         });
 
         // Scatter Filter
         $('#scatter-month-filter').on('change', () => {
-             if (processedCommits.length > 0) renderScatterChart(processedCommits);
+             if (hasCommits) showScatterChart();
         });
 
         // Bar Chart Filters
         $('#bar-metric-select, #bar-month-filter').on('change', () => {
-             if (processedCommits.length > 0) renderBarChart(processedCommits);
+             if (hasCommits) showBarChart();
         });
 
         // Funnel Chart Filter
-        $('#funnel-month-filter').on('change', function() {
-            updateFunnelChart(prData);
+        $('#funnel-month-filter').on('change', () => {
+            if (prManifest) showFunnelChart();
         });
-        updateFunnelChart(prData);
     }).catch(error => {
-        console.error('Error loading or processing CSV data:', error);
+        console.error('Error loading or processing dashboard data:', error);
         // Display error message to the user
          d3.select("#gantt-chart").html("<p class='text-danger text-center'>Error loading data. Check console.</p>");
          d3.select("#scatter-chart").html("<p class='text-danger text-center'>Error loading data. Check console.</p>");
          d3.select("#bar-chart").html("<p class='text-danger text-center'>Error loading data. Check console.</p>");
     });
 
-    function updateFunnelChart(prData) {
-        let filtered = prData;
-        const monthFilter = $('#funnel-month-filter').val();
-        if (monthFilter && monthFilter !== 'all') {
-            const [year, month] = monthFilter.split('-').map(Number);
-            filtered = prData.filter(d => d._funnelYear === year && d._funnelMonth === month - 1);
-        }
-        const funnelStages = [
-            { stage: 'Created', count: 0, avgTimeSec: null },
-            { stage: 'Reviewed', count: 0, avgTimeSec: null },
-            { stage: 'Approved', count: 0, avgTimeSec: null },
-            { stage: 'Merged', count: 0, avgTimeSec: null }
-        ];
-        funnelStages[0].count = filtered.length;
-        const reviewed = filtered.filter(d => d.time_to_first_review_sec && d.time_to_first_review_sec !== '');
-        funnelStages[1].count = reviewed.length;
-        funnelStages[1].avgTimeSec = reviewed.length > 0 ? d3.mean(reviewed, d => +d.time_to_first_review_sec) : null;
-        const approved = filtered.filter(d => d.time_to_approval_sec && d.time_to_approval_sec !== '');
-        funnelStages[2].count = approved.length;
-        funnelStages[2].avgTimeSec = approved.length > 0 ? d3.mean(approved, d => +d.time_to_approval_sec) : null;
-        const merged = filtered.filter(d => d.was_merged === '1' || d.was_merged === 'true' || d.was_merged === 1);
-        funnelStages[3].count = merged.length;
-        funnelStages[3].avgTimeSec = merged.length > 0 ? d3.mean(merged, d => +d.time_to_merge_sec) : null;
-        renderFunnelChart(funnelStages);
+    // Renders with what the filters asked for, unless they changed again while partitions were loading
+    function whenCurrent(filterValues, load, render) {
+        const requested = filterValues().join('|');
+        return load().then(data => {
+            if (filterValues().join('|') === requested) render(data);
+        }).catch(error => console.error('Error loading dashboard partitions:', error));
+    }
+
+    // --- Process Issue Data --- (Issues are stored column-wise; rebuild one object per bar)
+    const parseTime = d3.timeParse("%Y-%m-%dT%H:%M:%SZ");
+    function issueBars(issueData) {
+        const columns = issueData.issues;
+        return columns.number.map((number, i) => {
+            const created = parseTime(columns.created[i]);
+            let closed = columns.closed[i] ? parseTime(columns.closed[i]) : new Date(); // Use current date if not closed
+            const [repoOwner, repoName] = issueData.repos[columns.repo[i]].split('/');
+            return {
+                number: number,
+                title: columns.title[i],
+                state: columns.state[i],
+                startDate: created,
+                endDate: closed,
+                contributors: columns.contributors[i].map(a => issueData.authors[a]),
+                duration: (created && closed) ? d3.timeDay.count(created, closed) : 0,
+                repoOwner: repoOwner,
+                repoName: repoName
+            };
+        }).filter(d => d.startDate); // Filter out issues with invalid start dates
+    }
+
+    function showGanttChart() {
+        // Issues are partitioned by creation month, which is what the date filters select on
+        const dateFilters = () => [$('#gantt-start-date').val(), $('#gantt-end-date').val()];
+        const [start, end] = dateFilters();
+        const months = partitionMonths('issues')
+            .filter(month => (!start || month >= start.slice(0, 7)) && (!end || month <= end.slice(0, 7)));
+        whenCurrent(dateFilters, () => loadPartitions('issues', months),
+            partitions => renderGanttChart([].concat(...partitions.map(issueBars))));
+    }
+
+    function showScatterChart() {
+        const monthFilter = () => [$('#scatter-month-filter').val()];
+        const [month] = monthFilter();
+        whenCurrent(monthFilter, () => loadPartitions('commits', month === 'all' ? partitionMonths('commits') : [month]),
+            partitions => renderScatterChart([].concat(...partitions.map(commitPoints))));
+    }
+
+    function showBarChart() {
+        // Per-author totals are precomputed per month as [author, commits, lines]; 'all' is the summary
+        const monthFilter = () => [$('#bar-month-filter').val()];
+        whenCurrent(monthFilter, () => loadPartition('commits', monthFilter()[0]),
+            commitData => renderBarChart(commitData ? commitData.contributors.map(([author, commits, lines]) =>
+                [commitData.authors[author], commits, lines]) : []));
+    }
+
+    function showFunnelChart() {
+        // Stage counts, averages and percentiles are precomputed per creation month; 'all' is the summary
+        const monthFilter = () => [$('#funnel-month-filter').val() || 'all'];
+        whenCurrent(monthFilter, () => loadPartition('prs', monthFilter()[0]), prData => {
+            if (!prData) return;
+            renderFunnelChart(prData.stages.map((stage, i) => ({
+                stage: stage,
+                count: prData.funnel[i][0],
+                avgTimeSec: prData.funnel[i][1],
+                // [p50, p90, p99]; files built before percentiles were added have none
+                percentilesSec: prData.funnel[i].length > 2 ? prData.funnel[i].slice(2) : null
+            })));
+        });
+    }
+
+    // Expands the column-wise commit points of one month partition into one object per dot
+    function commitPoints(commitData) {
+        const activity = commitData.activity;
+        return activity.sha.map((sha, i) => ({
+            sha: sha,
+            weekday: activity.weekday[i], // 0 = Sunday, 6 = Saturday
+            hour: activity.hour[i],
+            author: commitData.authors[activity.author[i]],
+            date: activity.date[i],
+            message: activity.message[i],
+            repo: commitData.repos[activity.repo[i]]
+        }));
     }
 
     // --- Populate Month Filters --- (Helper function)
-    function populateMonthFilters(commitData) {
+    function populateMonthFilters(commitMonths) {
         const months = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"];
-        const availableMonths = [...new Set(commitData.map(d => `${d.year}-${String(d.month + 1).padStart(2, '0')}`))] // Get unique YYYY-MM
-                              .sort()
+        const availableMonths = commitMonths // Sorted unique YYYY-MM
                               .map(ym => {
                                   const [year, month] = ym.split('-');
                                   return { value: ym, text: `${months[parseInt(month) - 1]} ${year}` };
@@ -270,18 +331,10 @@ $(document).ready(function() {
     }
 
     // --- Scatter Chart Rendering ---
-    function renderScatterChart(data) {
+    function renderScatterChart(filteredData) {
         const container = $("#scatter-chart");
         container.empty();
 
-        // Filter data
-        const monthFilter = $('#scatter-month-filter').val();
-        const filteredData = data.filter(d => {
-            if (monthFilter === 'all') return true;
-            const [year, month] = monthFilter.split('-').map(Number);
-            return d.year === year && d.month === month - 1;
-        });
-
          if (filteredData.length === 0) {
              container.html("<p class='text-info text-center'>No matching commits found for the selected filters.</p>");
              return;
@@ -351,7 +404,7 @@ $(document).ready(function() {
                 scatterTooltip.transition().duration(200).style("opacity", .9);
                 scatterTooltip.html(
                     `<strong>Author:</strong> ${d.author}<br/>` +
-                    `<strong>Date:</strong> ${d3.timeFormat("%Y-%m-%d %H:%M")(d.date)}<br/>` +
+                    `<strong>Date:</strong> ${d.date}<br/>` +
                     `<strong>Message:</strong> ${d.message}`
                 )
                 .style("left", (event.pageX + 5) + "px")
@@ -362,7 +415,7 @@ $(document).ready(function() {
             })
             .on("click", function(event, d) {
                 if (d.sha) {
-                    const commitUrl = `https://github.com/${d.repoOwner}/${d.repoName}/commit/${d.sha}`;
+                    const commitUrl = `https://github.com/${d.repo}/commit/${d.sha}`;
                     window.open(commitUrl, '_blank'); // Open in a new tab
                 } else {
                     console.error("Commit SHA not found for this point. Data:", d);
@@ -372,31 +425,20 @@ $(document).ready(function() {
     }
 
     // --- Bar Chart Rendering ---
-    function renderBarChart(data) {
+    function renderBarChart(totals) {
         const container = $("#bar-chart");
         container.empty();
 
-        // Filter data
-        const monthFilter = $('#bar-month-filter').val();
-        const filteredData = data.filter(d => {
-            if (monthFilter === 'all') return true;
-            const [year, month] = monthFilter.split('-').map(Number);
-            return d.year === year && d.month === month - 1;
-        });
-
-        if (filteredData.length === 0) {
+        if (totals.length === 0) {
              container.html("<p class='text-info text-center'>No matching commits found for the selected filters.</p>");
              return;
         }
 
-        // Aggregate data
         const metric = $('#bar-metric-select').val(); // 'commits' or 'lines'
-        const aggregatedData = d3.rollup(filteredData,
-            v => metric === 'commits' ? v.length : d3.sum(v, d => d.diff),
-            d => d.author
-        );
-
-        const chartData = Array.from(aggregatedData, ([author, value]) => ({ author, value }))
+        const chartData = totals.map(([author, commits, lines]) => ({
+                                 author: author,
+                                 value: metric === 'commits' ? commits : lines
+                             }))
                              .sort((a, b) => b.value - a.value); // Sort descending
 
         const margin = { top: 30, right: 30, bottom: 100, left: 60 }; // Increased bottom margin for rotated labels
@@ -484,7 +526,7 @@ $(document).ready(function() {
         container.html('');
         const width = 600, height = 400, stageHeight = 80, margin = 40;
         const funnelWidth = (width - 2 * margin) / 2; // Only use left half for funnel
-        const rightTextX = width / 2 + funnelWidth / 2 + 20; // Start of right half for text
+        const rightTextX = margin + funnelWidth + 20; // Start of right half for text
         const svg = container.append('svg')
             .attr('width', width)
             .attr('height', height);
@@ -534,32 +576,38 @@ $(document).ready(function() {
                 .attr('font-weight', 'bold')
                 .attr('fill', '#fff')
                 .text(funnelStages[i].stage);
-            // PR count and avg time to the right half
-            let rightText = `${funnelStages[i].count} PRs`;
-            if (funnelStages[i].avgTimeSec != null) {
-                rightText += ` | Avg: ${formatTime(funnelStages[i].avgTimeSec)}`;
+            // PR count and stage times to the right half: percentiles, which outliers don't skew, else the average
+            const percentiles = funnelStages[i].percentilesSec;
+            let timeText = '';
+            if (percentiles && percentiles[0] != null) {
+                timeText = ['p50', 'p90', 'p99'].map((label, j) => `${label}: ${formatTime(percentiles[j])}`).join(' · ');
+            } else if (funnelStages[i].avgTimeSec != null) {
+                timeText = `Avg: ${formatTime(funnelStages[i].avgTimeSec)}`;
             }
             svg.append('text')
                 .attr('x', rightTextX)
-                .attr('y', y0 + stageHeight/2)
-                .attr('text-anchor', 'end')
+                .attr('y', y0 + stageHeight/2 - (timeText ? 10 : 0))
+                .attr('text-anchor', 'start')
                 .attr('dominant-baseline', 'middle')
                 .attr('font-size', 16)
                 .attr('fill', color)
-                .text(rightText);
+                .text(`${funnelStages[i].count} PRs`);
+            if (timeText) {
+                svg.append('text')
+                    .attr('x', rightTextX)
+                    .attr('y', y0 + stageHeight/2 + 12)
+                    .attr('text-anchor', 'start')
+                    .attr('dominant-baseline', 'middle')
+                    .attr('font-size', 12)
+                    .attr('fill', color)
+                    .text(timeText);
+            }
         }
     }
 
-    function populateFunnelMonthFilter(prData) {
+    function populateFunnelMonthFilter(prMonths) {
         const months = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"];
-        // Parse created_date to get year and month
-        prData.forEach(d => {
-            const date = d3.timeParse("%Y-%m-%dT%H:%M:%SZ")(d.created_date);
-            d._funnelYear = date ? date.getFullYear() : -1;
-            d._funnelMonth = date ? date.getMonth() : -1;
-        });
-        const availableMonths = [...new Set(prData.filter(d => d._funnelYear !== -1 && d._funnelMonth !== -1).map(d => `${d._funnelYear}-${String(d._funnelMonth + 1).padStart(2, '0')}`))]
-            .sort()
+        const availableMonths = prMonths // Sorted unique YYYY-MM of PR creation dates
             .map(ym => {
                 const [year, month] = ym.split('-');
                 return { value: ym, text: `${months[parseInt(month) - 1]} ${year}` };
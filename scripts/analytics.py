@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Vectorized review-latency and churn metrics over the fetched datasets.
+
+Reads the typed Parquet/Arrow files written with COLUMNAR_OUTPUT (or the
+CSVs, converted with the same column types) into pandas and computes every
+metric with grouped column operations, so years of history across many repos
+take seconds rather than a row-by-row pass over CSV text.
+
+Usage: python scripts/analytics.py prs.parquet commits.parquet
+       (the dataset is taken from each file's base name)
+
+Needs pandas and pyarrow: pip install pandas pyarrow
+"""
+import os
+import sys
+
+from columnar_store import load_table
+
+# --- Configuration ---
+# Group by repo as well as month; useful for combined multi-repo files
+GROUP_BY_REPO = os.environ.get("ANALYTICS_BY_REPO", "").lower() in ("1", "true", "yes")
+LATENCY_COLUMNS = ["time_to_first_review_sec", "time_to_approval_sec", "time_to_merge_sec"]
+
+
+def load_frame(path, dataset=None):
+    """Loads a dataset as a DataFrame with nullable integer columns and UTC timestamps."""
+    import pandas as pd
+    return load_table(path, dataset).to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _group_keys(df, date_column):
+    keys = [df[date_column].dt.strftime("%Y-%m").rename("month")]
+    if GROUP_BY_REPO and "repo_owner" in df:
+        keys.insert(0, (df["repo_owner"] + "/" + df["repo_name"]).rename("repo"))
+    return keys
+
+
+def review_latency(prs):
+    """Per month: PR counts through each funnel stage and the median / p90 of each latency column.
+
+    Latencies are in the units of the prs.csv columns; missing values are skipped.
+    """
+    import pandas as pd
+
+    grouped = prs.groupby(_group_keys(prs, "created_date"), sort=True)
+    result = pd.DataFrame({
+        "prs": grouped.size(),
+        "reviewed": grouped["time_to_first_review_sec"].count(),
+        "approved": grouped["time_to_approval_sec"].count(),
+        "merged": grouped["was_merged"].sum(),
+    })
+    result["merge_rate"] = result["merged"] / result["prs"]
+    for column in LATENCY_COLUMNS:
+        name = column.removesuffix("_sec")
+        result[f"{name}_p50"] = grouped[column].median()
+        result[f"{name}_p90"] = grouped[column].quantile(0.9)
+    return result
+
+
+def churn(commits):
+    """Per month: commits, lines and files changed, active authors, and the top author's share of lines."""
+    import pandas as pd
+
+    keys = _group_keys(commits, "created_date")
+    grouped = commits.groupby(keys, sort=True)
+    result = pd.DataFrame({
+        "commits": grouped.size(),
+        "lines_changed": grouped["diff"].sum(),
+        "files_changed": grouped["number_of_files_updated"].sum(),
+        "authors": grouped["author"].nunique(),
+    })
+    per_author = commits.groupby(keys + [commits["author"]], sort=False)["diff"].sum()
+    top_author_lines = per_author.groupby(level=list(range(len(keys)))).max()
+    result["top_author_share"] = top_author_lines / result["lines_changed"].where(result["lines_changed"] > 0)
+    return result
+
+
+def author_churn(commits):
+    """Per author: commits and lines changed over the whole dataset, largest first."""
+    grouped = commits.groupby("author", sort=False)
+    return (grouped.agg(commits=("sha", "size"), lines_changed=("diff", "sum"))
+                   .sort_values(["lines_changed", "commits"], ascending=False))
+
+
+REPORTS = {
+    "prs": [("Review latency", review_latency)],
+    "commits": [("Churn", churn), ("Churn by author (top 20)", lambda df: author_churn(df).head(20))],
+}
+
+
+# --- Main Execution ---
+def main():
+    paths = sys.argv[1:]
+    if not paths:
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(1)
+    try:
+        import pandas as pd
+    except ImportError:
+        print("Error: analytics.py needs pandas and pyarrow (pip install pandas pyarrow).", file=sys.stderr)
+        sys.exit(1)
+    pd.set_option("display.width", 200)
+    pd.set_option("display.max_columns", None)
+
+    for path in paths:
+        dataset = os.path.splitext(os.path.basename(path))[0]
+        if dataset not in REPORTS:
+            print(f"Skipping {path}: no metrics for dataset '{dataset}'.", file=sys.stderr)
+            continue
+        df = load_frame(path, dataset)
+        for title, report in REPORTS[dataset]:
+            print(f"\n=== {title} ({path}, {len(df)} rows) ===")
+            print(report(df).round(2).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""Pre-aggregates the fetched CSVs into the compact files the dashboard loads.
+
+The browser used to download every raw CSV and regroup it on each filter
+change. This script does that grouping once, after the fetchers have run.
+Each dataset is split by month into gzipped JSON partitions, so what the
+dashboard downloads for a month does not grow with the length of history:
+
+    dashboard/<dataset>/manifest.json    row count and date bounds of every partition
+    dashboard/<dataset>/all.json.gz      totals over all months (the "All Months" views)
+    dashboard/<dataset>/YYYY-MM.json.gz  that month's records
+
+    commits  per month: scatter points and per-author totals; all: per-author totals
+    issues   per month: issue bars for the Gantt chart, by creation month; all: none
+    prs      per month: PR funnel stage counts, average and p50/p90/p99 times; all: the same over every month
+
+The dashboard loads the manifests first, then only the partitions the
+selected filters need. Each dataset depends on exactly one CSV, so the three
+fetch workflows can each rebuild their own directory. Repeated strings
+(authors, repos) are stored once per file in an index table, and records are
+stored column-wise to keep the files small.
+
+Usage: python scripts/build_dashboard_data.py [commits] [issues] [prs]   (default: all)
+"""
+import gzip
+import json
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from csv_store import iter_rows
+from quantile_sketch import SketchStore, percentiles, sketch_path
+
+# --- Configuration ---
+INPUT_DIR = os.environ.get("DASHBOARD_INPUT_DIR", ".")
+OUTPUT_DIR = os.environ.get("DASHBOARD_OUTPUT_DIR", "dashboard")
+ALL_MONTHS = "all"
+MANIFEST = "manifest.json"
+
+
+class StringIndex:
+    """Assigns each distinct string a small integer, in order of first appearance."""
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def __call__(self, value):
+        if value not in self._ids:
+            self._ids[value] = len(self.values)
+            self.values.append(value)
+        return self._ids[value]
+
+
+def parse_timestamp(value):
+    """Parses the fetchers' `YYYY-MM-DDTHH:MM:SSZ` timestamps; None if blank or malformed."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+    except (TypeError, ValueError):
+        return None
+
+
+def _dumps(payload):
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, sort_keys=True).encode("utf-8")
+
+
+def _write_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_partitions(name, summary, partitions, stats):
+    """Writes OUTPUT_DIR/name/: one gzipped file per month, the summary and the manifest.
+
+    Keys are sorted and gzip timestamps zeroed, so unchanged data produces
+    byte-identical files (and no commit). The manifest is replaced after the
+    partitions it lists; partitions of months no longer present are removed.
+    """
+    directory = os.path.join(OUTPUT_DIR, name)
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"dataset": name, "rows": sum(s["rows"] for s in stats.values()), "partitions": {}}
+    for month in sorted(partitions):
+        path = f"{month}.json.gz"
+        data = gzip.compress(_dumps(partitions[month]), mtime=0)
+        _write_atomic(os.path.join(directory, path), data)
+        manifest["partitions"][month] = dict(stats[month], path=path, bytes=len(data))
+    if summary is not None:
+        data = gzip.compress(_dumps(summary), mtime=0)
+        _write_atomic(os.path.join(directory, "all.json.gz"), data)
+        manifest["summary"] = {"path": "all.json.gz", "bytes": len(data)}
+    months = list(manifest["partitions"])
+    manifest["first"] = stats[months[0]]["first"] if months else None
+    manifest["last"] = stats[months[-1]]["last"] if months else None
+    _write_atomic(os.path.join(directory, MANIFEST), _dumps(manifest))
+
+    keep = {entry["path"] for entry in manifest["partitions"].values()}
+    if summary is not None:
+        keep.add("all.json.gz")
+    for stale in sorted(set(os.listdir(directory)) - keep):
+        if stale.endswith(".json.gz"):
+            os.remove(os.path.join(directory, stale))
+    total = sum(entry["bytes"] for entry in manifest["partitions"].values())
+    print(f"Wrote {directory}/: {len(months)} monthly partitions ({total / 1024:.1f} KiB), {manifest['rows']} rows")
+
+
+def tracked(rows, stats):
+    """Passes through rows with a valid created_date, counting rows and date bounds per month in `stats`."""
+    for row in rows:
+        created = row.get("created_date")
+        if parse_timestamp(created) is None:
+            continue
+        month = stats.setdefault(created[:7], {"rows": 0, "first": created, "last": created})
+        month["rows"] += 1
+        month["first"] = min(month["first"], created)
+        month["last"] = max(month["last"], created)
+        yield row
+
+
+def publish(name, rows):
+    """Builds dataset `name` from CSV rows and writes its partitions and manifest."""
+    stats = {}
+    summary, partitions = BUILDERS[name](tracked(rows, stats))
+    write_partitions(name, summary, partitions, stats)
+
+
+# --- Commits ---
+def contributor_totals(by_author):
+    """[author, commits, lines] entries, most commits first."""
+    return sorted(([author, commits, lines] for author, (commits, lines) in by_author.items()),
+                  key=lambda entry: (-entry[1], entry[0]))
+
+
+def build_commits(rows):
+    """Per month: scatter points and per-author commit/line totals. Summary: per-author totals overall."""
+    months = defaultdict(lambda: {
+        "authors": StringIndex(),
+        "repos": StringIndex(),
+        "activity": {"sha": [], "weekday": [], "hour": [], "author": [], "date": [], "message": [], "repo": []},
+        "totals": defaultdict(lambda: [0, 0]), # author id -> [commits, lines]
+    })
+    authors = StringIndex()
+    overall = defaultdict(lambda: [0, 0])
+
+    for row in rows:
+        date = parse_timestamp(row["created_date"])
+        month = months[row["created_date"][:7]]
+        name = row.get("author") or "Unknown"
+        author = month["authors"](name)
+        lines = int(row.get("diff") or 0)
+        points = month["activity"]
+        points["sha"].append(row.get("sha"))
+        points["weekday"].append((date.weekday() + 1) % 7) # 0 = Sunday, as in JS Date.getDay()
+        points["hour"].append(date.hour)
+        points["author"].append(author)
+        points["date"].append(row["created_date"][:16].replace("T", " "))
+        points["message"].append(row.get("message") or "")
+        points["repo"].append(month["repos"](f"{row.get('repo_owner')}/{row.get('repo_name')}"))
+        for totals, key in ((month["totals"], author), (overall, authors(name))):
+            totals[key][0] += 1
+            totals[key][1] += lines
+
+    partitions = {
+        key: {"authors": month["authors"].values, "repos": month["repos"].values,
+              "activity": month["activity"], "contributors": contributor_totals(month["totals"])}
+        for key, month in months.items()
+    }
+    return {"authors": authors.values, "contributors": contributor_totals(overall)}, partitions
+
+
+# --- Issues ---
+def build_issues(rows):
+    """Per creation month: issue bars as parallel columns; contributors are lists of author indexes."""
+    months = defaultdict(lambda: {
+        "authors": StringIndex(),
+        "repos": StringIndex(),
+        "issues": {"number": [], "title": [], "state": [], "created": [], "closed": [], "contributors": [], "repo": []},
+    })
+    for row in rows:
+        month = months[row["created_date"][:7]]
+        columns = month["issues"]
+        contributors = [c for c in (row.get("contributors") or "").split(";") if c.strip()]
+        columns["number"].append(int(row["issue_number"]))
+        columns["title"].append(row.get("title") or "")
+        columns["state"].append((row.get("state") or "OPEN").upper())
+        columns["created"].append(row["created_date"])
+        columns["closed"].append(row.get("closed_date") or None)
+        columns["contributors"].append([month["authors"](c) for c in contributors])
+        columns["repo"].append(month["repos"](f"{row.get('repo_owner')}/{row.get('repo_name')}"))
+    partitions = {
+        key: {"authors": month["authors"].values, "repos": month["repos"].values, "issues": month["issues"]}
+        for key, month in months.items()
+    }
+    return None, partitions
+
+
+# --- PRs ---
+FUNNEL_STAGES = ["Created", "Reviewed", "Approved", "Merged"]
+STAGE_COLUMNS = [None, "time_to_first_review_sec", "time_to_approval_sec", "time_to_merge_sec"]
+
+def build_prs(rows):
+    """Funnel stage counts, average and percentile durations, per creation month and (summary) overall.
+
+    Each stage is [count, avgTimeSec, p50, p90, p99]; times over no PRs are null.
+    Percentiles come from the latency sketches fetch_prs.py keeps next to prs.csv,
+    merged over repos (and for the summary, over the months in the CSV). Without
+    that file the rows are sketched here.
+    """
+    stored = SketchStore.load(sketch_path(os.path.join(INPUT_DIR, "prs.csv")))
+    sketches = stored or SketchStore()
+    # month -> per stage [count, sum of durations, number of durations]
+    stages = defaultdict(lambda: [[0, 0, 0] for _ in FUNNEL_STAGES])
+
+    def add(stage, duration):
+        stage[0] += 1
+        if duration not in (None, ""):
+            stage[1] += float(duration)
+            stage[2] += 1
+
+    for row in rows:
+        if stored is None:
+            sketches.add_row(row)
+        for key in (row["created_date"][:7], ALL_MONTHS):
+            created, reviewed, approved, merged = stages[key]
+            created[0] += 1
+            if row.get("time_to_first_review_sec"):
+                add(reviewed, row["time_to_first_review_sec"])
+            if row.get("time_to_approval_sec"):
+                add(approved, row["time_to_approval_sec"])
+            if row.get("was_merged") in ("1", "true"):
+                add(merged, row.get("time_to_merge_sec"))
+
+    months = [key for key in stages if key != ALL_MONTHS]
+    funnel = {}
+    for key, per_stage in stages.items():
+        merged = sketches.merged(months=months if key == ALL_MONTHS else [key])
+        funnel[key] = {"stages": FUNNEL_STAGES,
+                       "funnel": [[count, total / samples if samples else None] + percentiles(merged.get(column))
+                                  for (count, total, samples), column in zip(per_stage, STAGE_COLUMNS)]}
+    summary = funnel.pop(ALL_MONTHS, {"stages": FUNNEL_STAGES,
+                                      "funnel": [[0, None] + percentiles(None) for _ in FUNNEL_STAGES]})
+    return summary, funnel
+
+
+BUILDERS = {
+    "commits": build_commits,
+    "issues": build_issues,
+    "prs": build_prs,
+}
+
+
+# --- Main Execution ---
+def main():
+    targets = sys.argv[1:] or list(BUILDERS)
+    unknown = set(targets) - set(BUILDERS)
+    if unknown:
+        print(f"Unknown targets {sorted(unknown)}; expected any of {list(BUILDERS)}.", file=sys.stderr)
+        sys.exit(1)
+
+    failed = False
+    for name in targets:
+        csv_path = os.path.join(INPUT_DIR, f"{name}.csv")
+        if not os.path.exists(csv_path):
+            print(f"Skipping {name}: {csv_path} not found.", file=sys.stderr)
+            failed = True
+            continue
+        publish(name, iter_rows(csv_path))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
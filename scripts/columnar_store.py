@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Optional typed columnar copies (Parquet or Arrow IPC) of the fetched CSVs.
+
+Set COLUMNAR_OUTPUT=parquet (or arrow) and each fetcher writes, next to its
+CSV, a file with real timestamp and integer columns: commits.parquet,
+issues.parquet, prs.parquet. Downstream analysis (see analytics.py) can then
+load years of history without re-parsing CSV text.
+
+The conversion uses pyarrow's multithreaded CSV reader, so it costs a small
+fraction of the fetch. pyarrow is only imported when the option is enabled:
+
+    pip install pyarrow
+"""
+import os
+import sys
+
+# --- Configuration ---
+# "parquet", "arrow" (Arrow IPC / Feather v2) or empty to only write CSV
+COLUMNAR_OUTPUT = os.environ.get("COLUMNAR_OUTPUT", "").lower()
+FORMAT_EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# Column types per dataset; columns not listed stay strings.
+# Types are given as names so this module imports without pyarrow.
+SCHEMAS = {
+    "commits": {
+        "created_date": "timestamp",
+        "number_of_files_updated": "int64",
+        "diff": "int64",
+    },
+    "issues": {
+        "issue_number": "int64",
+        "created_date": "timestamp",
+        "closed_date": "timestamp",
+        "updated_date": "timestamp",
+    },
+    "prs": {
+        "pr_number": "int64",
+        "created_date": "timestamp",
+        "time_to_first_review_sec": "int64",
+        "time_to_approval_sec": "int64",
+        "time_to_merge_sec": "int64",
+        "was_merged": "bool_",
+        "updated_date": "timestamp",
+    },
+}
+
+
+def columnar_path(csv_path, fmt=COLUMNAR_OUTPUT):
+    """`commits.csv` -> `commits.parquet` (or `.arrow`)."""
+    return os.path.splitext(csv_path)[0] + FORMAT_EXTENSIONS[fmt]
+
+
+def _arrow_type(pa, name):
+    if name == "timestamp":
+        return pa.timestamp("s", tz="UTC")
+    return getattr(pa, name)()
+
+
+def read_csv_table(csv_path, dataset):
+    """Reads a fetcher CSV into a typed pyarrow Table.
+
+    Blank cells in typed columns become nulls; string columns keep "" as "".
+    """
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    column_types = {column: _arrow_type(pa, type_name) for column, type_name in SCHEMAS[dataset].items()}
+    return pa_csv.read_csv(
+        csv_path,
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            timestamp_parsers=[pa_csv.ISO8601], # The fetchers write `...T...Z` timestamps
+            true_values=["1", "true"],
+            false_values=["0", "false"],
+        ),
+    )
+
+
+def write_columnar(csv_path, dataset, fmt=COLUMNAR_OUTPUT):
+    """Converts `csv_path` to a typed columnar file and returns its path.
+
+    The file is written under a temporary name and renamed into place, so
+    readers never see a half-written file.
+    """
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    table = read_csv_table(csv_path, dataset)
+    path = columnar_path(csv_path, fmt)
+    tmp_path = path + ".tmp"
+    if fmt == "parquet":
+        pq.write_table(table, tmp_path, compression="zstd")
+    else:
+        feather.write_feather(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    print(f"Wrote {table.num_rows} rows to {path}")
+    return path
+
+
+def export_columnar(csv_path, dataset):
+    """Writes the columnar copy when COLUMNAR_OUTPUT is set. Returns False if that failed.
+
+    A failure here never affects the CSV, which has already been written.
+    """
+    if not COLUMNAR_OUTPUT:
+        return True
+    if COLUMNAR_OUTPUT not in FORMAT_EXTENSIONS:
+        print(f"Warning: unknown COLUMNAR_OUTPUT={COLUMNAR_OUTPUT!r}; expected one of {list(FORMAT_EXTENSIONS)}.", file=sys.stderr)
+        return False
+    try:
+        write_columnar(csv_path, dataset)
+    except ImportError:
+        print("Warning: COLUMNAR_OUTPUT needs pyarrow (pip install pyarrow); only the CSV was written.", file=sys.stderr)
+        return False
+    except Exception as e:
+        print(f"Warning: could not write columnar copy of {csv_path}: {e}", file=sys.stderr)
+        return False
+    return True
+
+
+def load_table(path, dataset=None):
+    """Loads a dataset from a .parquet, .arrow or .csv file as a pyarrow Table.
+
+    CSV input needs `dataset` (commits/issues/prs) to apply the column types;
+    it defaults to the file's base name.
+    """
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    extension = os.path.splitext(path)[1]
+    if extension == ".parquet":
+        return pq.read_table(path)
+    if extension in (".arrow", ".feather"):
+        return feather.read_table(path)
+    dataset = dataset or os.path.splitext(os.path.basename(path))[0]
+    return read_csv_table(path, dataset)
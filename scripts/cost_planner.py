@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Dry-run cost planning for the fetch scripts.
+
+With PLAN_ONLY=true, fetch_commits.py, fetch_issues.py, fetch_prs.py,
+fetch_all.py and fetch_batch.py fetch nothing. They print what a run would
+cost instead:
+
+    PLAN_ONLY=true         print the plan and exit
+    PLAN_BUDGET=2000       points a run may spend (default: what the rate limit has left)
+    PLAN_OUTPUT=plan.json  also write the plans as JSON, e.g. for a scheduler
+
+Each script sizes its work with cheap probes: `totalCount` on `history` and
+`issues`, and `issueCount` on `search`. The per-page price comes from
+rateLimit(dryRun: true) on the real page query, which GitHub prices
+without running it. Expected requests and points follow from those, and the
+wall time follows from the probes' own round trips. When the points exceed
+the budget, PR plans are split into runs over consecutive search shards.
+
+Follow-up pages (long issue timelines, PRs with many reviews) depend on the
+data itself, so they are not included. A plan is a lower bound for them and
+an upper bound for incremental runs, which skip what is already known.
+"""
+import json
+import math
+import os
+import time
+
+from github_client import RATE_LIMIT_FRAGMENT
+
+# --- Configuration ---
+PLAN_ONLY = os.environ.get("PLAN_ONLY", "").lower() in ("1", "true", "yes")
+PLAN_BUDGET = int(os.environ.get("PLAN_BUDGET", "0")) # 0: the remaining rate-limit budget
+PLAN_OUTPUT = os.environ.get("PLAN_OUTPUT", "")
+DEFAULT_LATENCY_SEC = 1.0 # Assumed round trip when no probe was timed
+
+# Replaces RATE_LIMIT_FRAGMENT in a page query to price it without running it. The alias keeps
+# the client from counting the estimate as points spent.
+DRY_RUN_FRAGMENT = "estimate: rateLimit(dryRun: true) { cost remaining resetAt }"
+
+_probe_seconds = [] # Round trip of every planning request, for the wall-time estimate
+_remaining = None # Points left, as reported by the last dry run
+
+
+def probe(client, query, variables=None):
+    """Runs a planning query, bypassing the response cache, and times it."""
+    start = time.perf_counter()
+    data = client.query(query, variables, use_cache=False)
+    _probe_seconds.append(time.perf_counter() - start)
+    return data
+
+
+def dry_run_cost(client, query, variables=None):
+    """Points GitHub would charge for `query`, which must contain RATE_LIMIT_FRAGMENT."""
+    global _remaining
+    data = probe(client, query.replace(RATE_LIMIT_FRAGMENT, DRY_RUN_FRAGMENT, 1), variables)
+    estimate = (data.get("data") or {}).get("estimate") or {}
+    if estimate.get("remaining") is not None:
+        _remaining = estimate["remaining"]
+    return estimate.get("cost") or 1
+
+
+def proposed_page_size(page_size, cost, max_points, minimum=1, maximum=None):
+    """Largest page size expected to cost at most `max_points`, given that `page_size` items cost `cost`.
+
+    Points are taken to grow in proportion to the items a page asks for. Every
+    request costs at least 1 point, so smaller pages never lower the total;
+    they are only used to keep a single request under `max_points`. A page at
+    that 1-point floor says nothing about a bigger one, so the size goes
+    straight back to `maximum` (default: `page_size`). The result is never
+    below `minimum`.
+    """
+    maximum = page_size if maximum is None else maximum
+    if not cost or cost <= 1:
+        return maximum
+    return max(minimum, min(maximum, page_size * max_points // cost))
+
+
+def pages(items, page_size):
+    return math.ceil(items / page_size) if items else 1 # An empty window still takes one request
+
+
+def new_plan(dataset, repo, items, requests, points, workers=1, **details):
+    """A plan: what one dataset of one repo is expected to cost. `details` are reported as-is."""
+    return dict(details, dataset=dataset, repo=repo, items=items, requests=requests, points=points, workers=workers)
+
+
+def budget(client):
+    """Points a run may spend: PLAN_BUDGET, else what the rate limit has left (None if unknown)."""
+    if PLAN_BUDGET:
+        return PLAN_BUDGET
+    return _remaining if _remaining is not None else client.remaining
+
+
+def split_by_budget(windows, limit):
+    """Merges consecutive [start, end, points] windows into runs of at most `limit` points each.
+
+    A window over the limit on its own is its own run.
+    """
+    runs = []
+    for start, end, points in windows:
+        if runs and runs[-1][2] + points <= limit:
+            runs[-1][1] = end
+            runs[-1][2] += points
+        else:
+            runs.append([start, end, points])
+    return runs
+
+
+def report(plans, client):
+    """Prints the plans with totals and, if PLAN_OUTPUT is set, writes them as JSON."""
+    latency = sum(_probe_seconds) / len(_probe_seconds) if _probe_seconds else DEFAULT_LATENCY_SEC
+    limit = budget(client)
+    print(f"{'dataset':<8} {'repo':<32} {'items':>8} {'requests':>8} {'points':>7} {'wall':>8}")
+    for plan in plans:
+        plan["wall_sec"] = round(plan["requests"] * latency / plan["workers"], 1)
+        items = plan["items"] if plan["items"] is not None else "?"
+        print(f"{plan['dataset']:<8} {plan['repo']:<32} {items:>8} {plan['requests']:>8} "
+              f"{plan['points']:>7} {plan['wall_sec']:>7.0f}s")
+        for note in plan.get("notes", []):
+            print(f"    {note}")
+    total_points = sum(plan["points"] for plan in plans)
+    total_requests = sum(plan["requests"] for plan in plans)
+    print(f"Total: {total_requests} requests, {total_points} points, "
+          f"~{sum(plan['wall_sec'] for plan in plans):.0f}s at {latency:.2f}s per request.")
+    if limit is None:
+        print("Remaining rate-limit budget unknown; set PLAN_BUDGET to check the plan against one.")
+    elif total_points <= limit:
+        print(f"Fits in the budget of {limit} points ({limit - total_points} to spare).")
+    else:
+        print(f"Exceeds the budget of {limit} points by {total_points - limit}; "
+              f"needs {math.ceil(total_points / limit)} rate-limit windows. A run that outlasts the budget "
+              f"waits for the reset; one that is stopped resumes from its checkpoint.")
+        for plan in plans:
+            if plan["points"] > limit and plan.get("windows"):
+                # Search windows can be fetched as separate runs, each within the budget
+                plan["runs"] = split_by_budget(plan["windows"], limit)
+                print(f"  {plan['dataset']} {plan['repo']} in {len(plan['runs'])} runs of at most {limit} points:")
+                for start, end, points in plan["runs"]:
+                    print(f"    {start}..{end} ({points} points)")
+
+    if PLAN_OUTPUT:
+        with open(PLAN_OUTPUT, "w", encoding="utf-8") as f:
+            json.dump({"budget": limit, "seconds_per_request": round(latency, 3), "plans": plans}, f, indent=2)
+        print(f"Wrote the plan to {PLAN_OUTPUT}")
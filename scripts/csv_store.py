@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""Helpers for streaming, checkpointing and atomically replacing the output CSVs.
+
+Fetchers write rows to `<output>.partial` as each page arrives and record the
+page cursor in `<output>.checkpoint.json`. A killed run resumes from the last
+checkpointed page; a finished run renames the partial file over the output.
+The incremental fetch mode also uses these helpers: the existing CSV supplies
+the high-water mark (or the set of known keys), and on finalize its rows are
+streamed back in behind the fresh ones, skipping any that were re-fetched (an
+upsert by key column).
+"""
+import csv
+import json
+import os
+import sys
+
+
+def has_columns(path, required_columns):
+    """True when `path` exists and its header contains every column in `required_columns`.
+
+    Files written with an older schema return False; callers then fall back to a full fetch.
+    """
+    if not os.path.exists(path):
+        return False
+    try:
+        with open(path, newline='', encoding='utf-8') as csvfile:
+            header = next(csv.reader(csvfile), [])
+    except (IOError, csv.Error) as e:
+        print(f"  Could not read existing {path}: {e}", file=sys.stderr)
+        return False
+    missing = set(required_columns) - set(header)
+    if missing:
+        print(f"  {path} is missing columns {sorted(missing)}; ignoring existing data.", file=sys.stderr)
+        return False
+    return True
+
+
+def iter_rows(path, keep=None):
+    """Streams dict rows from an existing CSV, optionally only those where keep(row) is true."""
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            if keep is None or keep(row):
+                yield row
+
+
+def high_water_mark(rows, column):
+    """Returns the latest ISO-8601 timestamp in `column`, or None if there is none."""
+    return max((row[column] for row in rows if row.get(column)), default=None)
+
+
+class Checkpoint:
+    """Records how far a paged fetch got, so a killed run can resume from the last page.
+
+    `params` identifies the run (repo, window, ...); a checkpoint saved with
+    different params is ignored so a changed configuration starts fresh.
+    """
+
+    def __init__(self, output_path, params, suffix=".checkpoint.json"):
+        self.path = output_path + suffix
+        self.params = json.loads(json.dumps(params)) # Normalise tuples etc. to what load() returns
+
+    def load(self):
+        """Returns the saved state dict, or None when there is nothing to resume."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if saved.get("params") != self.params:
+            print(f"  Ignoring checkpoint {self.path} from a run with different parameters.")
+            return None
+        return saved.get("state")
+
+    def save(self, **state):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"params": self.params, "state": state}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class _PartialFile:
+    """Append-only temp file that can be reopened at a checkpointed byte offset."""
+
+    def __init__(self, path, resume_offset=None):
+        self.path = path
+        if resume_offset is not None and os.path.exists(path):
+            self._file = open(path, 'r+', newline='', encoding='utf-8')
+            self._file.truncate(resume_offset) # Drop anything written after the last checkpoint
+            self._file.seek(resume_offset)
+            self.resumed = True
+        else:
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            self.resumed = False
+
+    def tell(self):
+        """Flushes to disk and returns the offset to store in a checkpoint."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def discard(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class StreamingCSVWriter(_PartialFile):
+    """Writes dict rows to `<path>.partial` and renames it over `path` on finalize.
+
+    Writers that are not resumable pass another `suffix`, so they never touch
+    the partial file an interrupted fetch will resume from.
+
+    When `key` is given the keys of written rows are remembered (only the keys,
+    not the rows) so finalize can merge an existing CSV without duplicates.
+    `on_write`, if given, is called with every row in the partial file: those a
+    resumed file already holds, then each one written (not the merged rows).
+    """
+
+    def __init__(self, path, fieldnames, key=None, resume_offset=None, on_write=None, suffix=".partial"):
+        super().__init__(path + suffix, resume_offset)
+        self.target_path = path
+        self.fieldnames = fieldnames
+        self.key = key
+        self.on_write = on_write
+        self.keys_written = set()
+        self.rows_written = 0
+        if self.resumed:
+            self._file.seek(0)
+            for row in csv.DictReader(self._file):
+                self._remember(row)
+            self._file.seek(resume_offset)
+        self._writer = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore')
+        if not self.resumed:
+            self._writer.writeheader()
+
+    def _remember(self, row):
+        self.rows_written += 1
+        if self.key:
+            self.keys_written.add(str(row[self.key]))
+        if self.on_write:
+            self.on_write(row)
+
+    def write_rows(self, rows):
+        """Writes rows; with a `key`, a row whose key was already written is skipped."""
+        for row in rows:
+            if self.key and str(row[self.key]) in self.keys_written:
+                continue
+            self._writer.writerow(row)
+            self._remember(row)
+
+    def finalize(self, merge_rows=()):
+        """Appends `merge_rows` not superseded by a written row, then atomically replaces the target."""
+        for row in merge_rows:
+            if self.key and row[self.key] in self.keys_written:
+                continue
+            self._writer.writerow(row)
+            self.rows_written += 1
+        self.tell()
+        self.close()
+        os.replace(self.path, self.target_path)
+        return self.rows_written
+
+
+class JsonlSpool(_PartialFile):
+    """Append-only JSON-lines scratch file for intermediate records between stages."""
+
+    def append(self, record):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def __iter__(self):
+        for line in self.lines():
+            yield json.loads(line)
+
+    def lines(self):
+        """Yields the records as undecoded JSON lines."""
+        self.tell()
+        with open(self.path, encoding='utf-8') as f:
+            yield from f
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Fetches commits, PRs and issues for one repository in a single process.
+
+Runs the same stages as fetch_commits.py, fetch_prs.py and fetch_issues.py,
+configured by the same environment variables (PUBLIC_REPO_OWNER/NAME,
+SINCE_DATE, DATE_RANGE, INCREMENTAL, FETCH_WORKERS, ...). The stages share
+one GraphQL client and one interpreter start-up.
+
+PRs are fetched before issues. Their search pages also select each PR's
+first commit authors into a PRRegistry, so the reviews and commit authors of
+a PR come back in one query. The issue stage then looks up the authors of
+linked PRs there, and only queries the PRs the search did not return (other
+repositories, PRs created outside DATE_RANGE) or pages the registry lacks.
+
+    STAGES=commits,prs,issues    which stages to run (always in this order)
+    PLAN_ONLY=true               estimate the run's cost instead (see cost_planner.py)
+
+Usage: python scripts/fetch_all.py
+"""
+import os
+import sys
+
+import cost_planner
+import fetch_commits
+import fetch_issues
+import fetch_prs
+from github_client import print_run_summary, shared_client
+from pr_registry import PRRegistry
+from telemetry import telemetry
+
+# --- Configuration ---
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+PUBLIC_REPO_OWNER = os.environ.get("PUBLIC_REPO_OWNER")
+PUBLIC_REPO_NAME = os.environ.get("PUBLIC_REPO_NAME")
+SINCE_DATE_ISO = os.environ.get("SINCE_DATE")
+DATE_RANGE = os.environ.get("DATE_RANGE")
+STAGE_ORDER = ["commits", "prs", "issues"] # prs fills the registry that issues reads
+STAGES = [stage.strip() for stage in os.environ.get("STAGES", ",".join(STAGE_ORDER)).split(",") if stage.strip()]
+
+
+def run_stage(stage, owner, name, registry):
+    """Runs one stage with its script's defaults. Returns True on success; errors are reported, not raised."""
+    print(f"=== {stage} ===")
+    try:
+        with telemetry.span(f"all.{stage}", repo=f"{owner}/{name}") as span:
+            if stage == "commits":
+                succeeded = fetch_commits.fetch_commits(owner, name, SINCE_DATE_ISO)
+            elif stage == "prs":
+                fetch_prs.fetch_prs(owner, name, DATE_RANGE, registry=registry)
+                succeeded = True
+            else:
+                succeeded = fetch_issues.fetch_issues(owner, name, SINCE_DATE_ISO, registry=registry)
+            span["ok"] = succeeded
+    except Exception as e:
+        print(f"[{stage}] failed: {e}", file=sys.stderr)
+        return False
+    if stage == "prs":
+        print(f"Recorded commit authors of {len(registry)} PRs for the issue stage.")
+    elif stage == "issues" and "prs" in STAGES:
+        print(f"{registry.hits} linked PRs were complete in the PR registry and needed no commits query.")
+    return succeeded
+
+
+def plan_stages(owner, name):
+    """Dry-run plans of the selected stages, with PR pages priced as this script sends them."""
+    plans = []
+    for stage in STAGE_ORDER:
+        if stage not in STAGES:
+            continue
+        if stage == "commits":
+            plans.append(fetch_commits.plan_commits(owner, name, SINCE_DATE_ISO))
+        elif stage == "prs":
+            plans.append(fetch_prs.plan_prs(owner, name, DATE_RANGE, with_commits=True))
+        else:
+            plan = fetch_issues.plan_issues(owner, name, SINCE_DATE_ISO)
+            if "prs" in STAGES:
+                plan["notes"].append("Stage 2 is an upper bound: linked PRs created in DATE_RANGE "
+                                     "come from the PR stage's search pages")
+            plans.append(plan)
+    return plans
+
+
+# --- Main Execution ---
+def main():
+    if not GITHUB_TOKEN:
+        print("Error: GITHUB_TOKEN environment variable not set.", file=sys.stderr)
+        sys.exit(1)
+    unknown = set(STAGES) - set(STAGE_ORDER)
+    if unknown:
+        print(f"Unknown stages {sorted(unknown)}; expected any of {STAGE_ORDER}.", file=sys.stderr)
+        sys.exit(1)
+    if (set(STAGES) & {"commits", "issues"}) and not SINCE_DATE_ISO:
+        print("Error: SINCE_DATE environment variable not set.", file=sys.stderr)
+        sys.exit(1)
+
+    if cost_planner.PLAN_ONLY:
+        cost_planner.report(plan_stages(PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME), shared_client())
+        return
+
+    registry = PRRegistry()
+    failed = [stage for stage in STAGE_ORDER
+              if stage in STAGES and not run_stage(stage, PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME, registry)]
+    print_run_summary(shared_client())
+    if failed:
+        print(f"Stages failed: {', '.join(failed)}. Re-run to resume them.", file=sys.stderr)
+        sys.exit(1)
+    print("All stages completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Fetches commits, issues and PRs for several repositories in one process.
+
+All (repo, stage) tasks run on one worker pool and share a single GraphQL
+client, so they share its connection pool, response cache and rate-limit
+budget. The repositories are listed in a JSON config file (BATCH_CONFIG):
+
+    {
+      "since": "2025-01-01T00:00:00Z",        # commits/issues; default SINCE_DATE
+      "date_range": "2025-01-01..2025-04-30", # PRs; default DATE_RANGE
+      "output": "per_repo",                   # or "combined"
+      "output_dir": "data",
+      "repos": [
+        {"owner": "octo", "name": "app", "stages": ["commits", "prs"]},
+        "octo/lib"                            # all stages
+      ]
+    }
+
+With PLAN_ONLY=true nothing is fetched. Every task is priced instead, and
+the totals are checked against the rate-limit budget (see cost_planner.py).
+
+Per-repo CSVs are written to `<output_dir>/<owner>__<name>/`. In combined mode
+they are also concatenated into `<output_dir>/commits.csv` etc., relying on the
+repo_owner/repo_name columns to tell the rows apart. The repos' PR latency
+sketches are merged into `<output_dir>/prs.csv.sketches.json`.
+"""
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import cost_planner
+import fetch_commits
+import fetch_issues
+import fetch_prs
+from columnar_store import export_columnar
+from csv_store import StreamingCSVWriter, iter_rows
+from github_client import print_run_summary, shared_client
+from quantile_sketch import SketchStore, sketch_path
+
+# --- Configuration ---
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+BATCH_CONFIG = os.environ.get("BATCH_CONFIG", "repos.json")
+# (repo, stage) tasks run in parallel; clamped to stay clear of secondary rate limits
+MAX_BATCH_WORKERS = 4
+BATCH_WORKERS = max(1, min(int(os.environ.get("BATCH_WORKERS", "2")), MAX_BATCH_WORKERS))
+STAGES = ["commits", "issues", "prs"]
+STAGE_FIELDS = {
+    "commits": fetch_commits.CSV_FIELDS,
+    "issues": fetch_issues.CSV_FIELDS,
+    "prs": fetch_prs.CSV_FIELDS,
+}
+
+
+def load_config(path):
+    """Reads the batch config and normalises each repo entry to {owner, name, stages}."""
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    repos = []
+    for entry in config.get("repos", []):
+        if isinstance(entry, str):
+            owner, name = entry.split("/", 1)
+            entry = {"owner": owner, "name": name}
+        stages = entry.get("stages") or STAGES
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stages {sorted(unknown)} for {entry['owner']}/{entry['name']}")
+        repos.append({"owner": entry["owner"], "name": entry["name"], "stages": stages})
+    config["repos"] = repos
+    config.setdefault("since", os.environ.get("SINCE_DATE"))
+    config.setdefault("date_range", os.environ.get("DATE_RANGE"))
+    config.setdefault("output", "per_repo")
+    config.setdefault("output_dir", ".")
+    if config["output"] not in ("per_repo", "combined"):
+        raise ValueError(f"output must be 'per_repo' or 'combined', not {config['output']!r}")
+    return config
+
+
+def repo_csv_path(config, repo, stage):
+    directory = os.path.join(config["output_dir"], f"{repo['owner']}__{repo['name']}")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{stage}.csv")
+
+
+def run_task(config, repo, stage):
+    """Runs one stage for one repo. Returns True on success; errors are reported, not raised."""
+    label = f"{repo['owner']}/{repo['name']} {stage}"
+    output_csv = repo_csv_path(config, repo, stage)
+    print(f"[{label}] starting -> {output_csv}")
+    try:
+        # Each task fetches serially; parallelism comes from the shared batch pool
+        if stage == "commits":
+            succeeded = fetch_commits.fetch_commits(repo["owner"], repo["name"], config["since"], output_csv)
+        elif stage == "issues":
+            succeeded = fetch_issues.fetch_issues(repo["owner"], repo["name"], config["since"], output_csv, workers=1)
+        else:
+            fetch_prs.fetch_prs(repo["owner"], repo["name"], config["date_range"], output_csv, workers=1)
+            succeeded = True
+    except Exception as e:
+        print(f"[{label}] failed: {e}", file=sys.stderr)
+        return False
+    print(f"[{label}] {'done' if succeeded else 'FAILED'}")
+    return succeeded
+
+
+def plan_task(config, repo, stage):
+    """The cost_planner plan of one stage for one repo."""
+    if stage == "commits":
+        return fetch_commits.plan_commits(repo["owner"], repo["name"], config["since"])
+    if stage == "issues":
+        return fetch_issues.plan_issues(repo["owner"], repo["name"], config["since"], workers=1)
+    plan = fetch_prs.plan_prs(repo["owner"], repo["name"], config["date_range"])
+    plan["workers"] = 1 # As in run_task; the batch pool supplies the parallelism
+    return plan
+
+
+def write_combined(config, stage, repos):
+    """Concatenates the per-repo CSVs of `stage` into `<output_dir>/<stage>.csv`, in config order."""
+    output_csv = os.path.join(config["output_dir"], f"{stage}.csv")
+    writer = StreamingCSVWriter(output_csv, STAGE_FIELDS[stage])
+    for repo in repos:
+        writer.write_rows(iter_rows(repo_csv_path(config, repo, stage)))
+    total = writer.finalize()
+    print(f"Wrote {total} combined rows to {output_csv}")
+    export_columnar(output_csv, stage)
+    if stage == "prs":
+        # Sketches are kept per repo, so merging them keeps every repo's history
+        sketches = SketchStore()
+        for repo in repos:
+            sketches.merge(SketchStore.load(sketch_path(repo_csv_path(config, repo, stage))) or SketchStore())
+        sketches.save(sketch_path(output_csv))
+
+
+def run_batch(config):
+    """Runs every (repo, stage) task of `config`. Returns the list of failed task labels."""
+    tasks = [(repo, stage) for repo in config["repos"] for stage in repo["stages"]]
+    print(f"Scheduling {len(tasks)} tasks for {len(config['repos'])} repositories on {BATCH_WORKERS} workers...")
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as executor:
+        results = list(executor.map(lambda task: run_task(config, *task), tasks))
+
+    failed = [f"{repo['owner']}/{repo['name']} {stage}"
+              for (repo, stage), ok in zip(tasks, results) if not ok]
+    if config["output"] == "combined":
+        for stage in STAGES:
+            repos = [repo for repo in config["repos"] if stage in repo["stages"]]
+            if not repos:
+                continue
+            if any(label.endswith(f" {stage}") for label in failed):
+                # Leave the previous combined file in place rather than write a partial one
+                print(f"Skipping combined {stage}.csv because some repositories failed.", file=sys.stderr)
+                continue
+            write_combined(config, stage, repos)
+    return failed
+
+
+# --- Main Execution ---
+def main():
+    if not GITHUB_TOKEN:
+        print("Error: GITHUB_TOKEN environment variable not set.", file=sys.stderr)
+        sys.exit(1)
+    try:
+        config = load_config(BATCH_CONFIG)
+    except (IOError, ValueError, KeyError) as e:
+        print(f"Error reading batch config {BATCH_CONFIG}: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not config["repos"]:
+        print(f"No repositories listed in {BATCH_CONFIG}.", file=sys.stderr)
+        sys.exit(1)
+
+    if cost_planner.PLAN_ONLY:
+        plans = [plan_task(config, repo, stage) for repo in config["repos"] for stage in repo["stages"]]
+        cost_planner.report(plans, shared_client())
+        return
+
+    failed = run_batch(config)
+    print_run_summary(shared_client())
+    if failed:
+        print(f"{len(failed)} tasks failed: {', '.join(failed)}. Re-run to resume them.", file=sys.stderr)
+        sys.exit(1)
+    print("Batch completed!")
+
+
+if __name__ == "__main__":
+    main()
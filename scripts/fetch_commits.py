@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 import os
+import subprocess
 import requests
-import csv
-import json
-from datetime import datetime, timedelta
+
+import cost_planner
+from columnar_store import export_columnar
+import git_mirror
+from csv_store import Checkpoint, StreamingCSVWriter, has_columns, iter_rows
+from github_client import RATE_LIMIT_FRAGMENT, print_run_summary, shared_client
+from process_pool import RowPool
+from telemetry import telemetry
+from warehouse import shared_warehouse
 
 # --- Configuration ---
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
@@ -11,17 +18,23 @@ PUBLIC_REPO_OWNER = os.environ.get("PUBLIC_REPO_OWNER")
 PUBLIC_REPO_NAME = os.environ.get("PUBLIC_REPO_NAME")
 SINCE_DATE_ISO = os.environ.get("SINCE_DATE")
 OUTPUT_CSV = "commits.csv"
-API_URL = "https://api.github.com/graphql"
 COMMITS_PER_PAGE = 100
+# Sync against the SHAs already in OUTPUT_CSV instead of refetching the window
+INCREMENTAL = os.environ.get("INCREMENTAL", "").lower() in ("1", "true", "yes")
+# An incremental walk stops after this many consecutive already-known commits
+SYNC_STOP_AFTER_KNOWN = 50
+# "graphql" pages the history API; "git" reads a local clone (see git_mirror.py)
+COMMITS_BACKEND = os.environ.get("COMMITS_BACKEND", "graphql").lower()
+CSV_FIELDS = ["sha", "message", "created_date", "number_of_files_updated", "diff", "author", "repo_owner", "repo_name"]
+
+client = shared_client()
+warehouse = shared_warehouse() # None unless WAREHOUSE_DB is set
 
 # --- Helper Functions ---
 def get_default_branch(owner, repo):
     """Gets the default branch name for the repository."""
     query = f'{{ repository(owner: "{owner}", name: "{repo}") {{ defaultBranchRef {{ name }} }} }}'
-    headers = {"Authorization": f"bearer {GITHUB_TOKEN}"}
-    response = requests.post(API_URL, json={'query': query}, headers=headers)
-    response.raise_for_status()
-    data = response.json()
+    data = client.query(query)
     if "errors" in data:
         print("GraphQL Error fetching default branch:", data["errors"])
         return "main" # Fallback
@@ -33,11 +46,11 @@ def get_default_branch(owner, repo):
         print("Could not determine default branch, defaulting to 'main'")
         return "main"
 
-def fetch_commits_page(owner, repo, branch, since, cursor=None):
-    """Fetches a single page of commits."""
+def build_commits_page_query(owner, repo, branch, since, cursor=None):
     after_clause = f', after: "{cursor}"' if cursor else ""
     query = f"""
     {{
+      {RATE_LIMIT_FRAGMENT}
       repository(owner: "{owner}", name: "{repo}") {{
         ref(qualifiedName: "{branch}") {{
           target {{
@@ -69,10 +82,51 @@ def fetch_commits_page(owner, repo, branch, since, cursor=None):
       }}
     }}
     """
-    headers = {"Authorization": f"bearer {GITHUB_TOKEN}"}
-    response = requests.post(API_URL, json={'query': query}, headers=headers)
-    response.raise_for_status() # Raise exception for bad status codes
-    return response.json()
+    return query
+
+def fetch_commits_page(owner, repo, branch, since, cursor=None, use_cache=False, refresh=False):
+    """Fetches a single page of commits."""
+    query = build_commits_page_query(owner, repo, branch, since, cursor)
+    return client.query(query, use_cache=use_cache, refresh=refresh) # Retries transient failures before raising
+
+def update_sync_walk(walk, nodes, known_shas, previous_head):
+    """Advances the incremental walk state over one history page (newest first).
+
+    Sets walk["stopped_early"] once SYNC_STOP_AFTER_KNOWN consecutive known
+    commits follow the previous head. Known commits without the previous head
+    mean history was rewritten; the walk then continues to the end of the window.
+    """
+    for commit in nodes:
+        sha = commit.get("oid")
+        if walk["head"] is None:
+            walk["head"] = sha
+        if sha == previous_head:
+            walk["passed_previous_head"] = True
+        walk["known_run"] = walk["known_run"] + 1 if sha in known_shas else 0
+        if walk["known_run"] >= SYNC_STOP_AFTER_KNOWN and not walk["rewritten"]:
+            if previous_head is None or walk["passed_previous_head"]:
+                walk["stopped_early"] = True
+                print(f"Reached {walk['known_run']} already-known commits; history below is unchanged.")
+                return
+            walk["rewritten"] = True
+            print(f"Previous head {previous_head} is no longer on the branch (force-push?); "
+                  f"re-walking the whole window to reconcile.")
+
+def build_commit_row(commit, owner, repo):
+    """Projects one history node onto a commits.csv row."""
+    author = commit.get("author", {})
+    author_name = get_author_name(author)
+    diff = commit.get("additions", 0) + commit.get("deletions", 0)
+    return dict(zip(CSV_FIELDS, [
+        commit.get("oid"),
+        commit.get("messageHeadline"),
+        commit.get("committedDate"),
+        commit.get("changedFilesIfAvailable", 0), # Provide default if missing
+        diff,
+        author_name,
+        owner,
+        repo
+    ]))
 
 def get_author_name(author_data):
     """Extracts the best available author identifier."""
@@ -84,86 +138,233 @@ def get_author_name(author_data):
         return author_data["email"]
     return "Unknown"
 
-# --- Main Execution ---
-if not GITHUB_TOKEN:
-    print("Error: GITHUB_TOKEN environment variable not set.")
-    exit(1)
-if not SINCE_DATE_ISO:
-    print("Error: SINCE_DATE environment variable not set.")
-    exit(1)
+def clone_commit_rows(records, context):
+    """RowPool function: commits.csv rows for a chunk of raw `git log` records."""
+    owner, repo, logins = context
+    return [build_commit_row(git_mirror.commit_node(header, numstat_lines, logins), owner, repo)
+            for header, numstat_lines in records]
+
+def fetch_commits_from_clone(owner, repo, since_iso, output_csv=OUTPUT_CSV):
+    """Builds `output_csv` from `git log --numstat` over a local clone instead of the API.
+
+    The local pass is cheap, so every run rewrites the whole window; there is
+    no incremental merge or checkpoint. Returns True on success.
+    """
+    writer = None
+    try:
+        path = git_mirror.ensure_mirror(owner, repo, since_iso)
+        print(f"Reading commits since {since_iso} from {path}...")
+        writer = StreamingCSVWriter(output_csv, CSV_FIELDS, key="sha")
+        # Raw log records go to the row pool; parsing and row building happen there
+        row_pool = RowPool(clone_commit_rows, (owner, repo, git_mirror.load_author_logins()))
+        with row_pool, telemetry.span("commits.git_log", repo=f"{owner}/{repo}",
+                                      process_workers=row_pool.workers) as span:
+            for rows in row_pool.map(git_mirror.iter_log_records(path, since_iso)):
+                writer.write_rows(rows)
+                if warehouse:
+                    warehouse.upsert("commits", rows)
+            span["rows"] = writer.rows_written
+        total = writer.finalize()
+    except (subprocess.CalledProcessError, OSError) as e:
+        detail = getattr(e, "stderr", None) or e
+        print(f"Error reading commits from the git clone: {detail}")
+        if writer:
+            writer.discard()
+        return False
+    print(f"Successfully wrote {total} commits to {output_csv}")
+    export_columnar(output_csv, "commits")
+    return True
+
+def fetch_commits(owner, repo, since_iso, output_csv=OUTPUT_CSV, incremental=INCREMENTAL):
+    """Fetches the default-branch history since `since_iso` into `output_csv`.
+
+    In incremental mode history is walked newest first and paging stops after
+    SYNC_STOP_AFTER_KNOWN consecutive commits already in `output_csv`. The
+    branch head of each run is kept in `<output_csv>.sync.json`; if the walk
+    reaches known commits without passing the previous head, the branch was
+    force-pushed, so the whole window is walked and replaces the old rows.
+
+    Returns True on success. On failure the partial file and checkpoint are kept
+    so the next call resumes, `output_csv` is left untouched and False is returned.
+    With COMMITS_BACKEND=git the rows come from fetch_commits_from_clone instead.
+    """
+    if COMMITS_BACKEND == "git":
+        return fetch_commits_from_clone(owner, repo, since_iso, output_csv)
+    has_next_page = True
+    current_cursor = None
+    fetch_failed = False
+    default_branch = get_default_branch(owner, repo)
 
-all_commits = []
-has_next_page = True
-current_cursor = None
-default_branch = get_default_branch(PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME)
+    def in_window(row):
+        return row["created_date"] >= since_iso
 
-print(f"Fetching commits since {SINCE_DATE_ISO} from {PUBLIC_REPO_OWNER}/{PUBLIC_REPO_NAME} on branch {default_branch}...")
+    incremental = incremental and has_columns(output_csv, CSV_FIELDS)
+    sync_state = Checkpoint(output_csv, {"repo": f"{owner}/{repo}", "branch": default_branch}, suffix=".sync.json")
+    known_shas = set()
+    previous_head = None
+    if incremental:
+        known_shas = {row["sha"] for row in iter_rows(output_csv, in_window)}
+        previous_head = (sync_state.load() or {}).get("head")
+        print(f"Incremental mode: syncing against {len(known_shas)} known commits in {output_csv}"
+              f" (previous head: {previous_head or 'unknown'}).")
+    # Walk state, checkpointed with the cursor so a resumed walk stops at the same place
+    walk = {"head": None, "known_run": 0, "passed_previous_head": False, "rewritten": False, "stopped_early": False}
 
-while has_next_page:
+    # Rows stream to commits.csv.partial page by page; the checkpoint remembers the cursor
+    checkpoint = Checkpoint(output_csv, {"repo": f"{owner}/{repo}", "branch": default_branch, "since": since_iso,
+                                         "incremental": incremental})
+    saved = checkpoint.load()
+    writer = StreamingCSVWriter(output_csv, CSV_FIELDS, key="sha", resume_offset=saved and saved["offset"])
+    resumed = bool(saved and writer.resumed)
+    if resumed:
+        current_cursor = saved["cursor"]
+        walk.update(saved.get("walk") or {})
+        print(f"Resuming interrupted run after {writer.rows_written} commits (cursor: {current_cursor}).")
+
+    print(f"Fetching commits since {since_iso} from {owner}/{repo} on branch {default_branch}...")
+
+    with telemetry.span("commits.fetch", repo=f"{owner}/{repo}") as span:
+        while has_next_page:
+            try:
+                # The head page (no cursor) shows new and rewritten commits, and a sync walk decides
+                # where to stop from what it sees, so neither may come from the response cache.
+                # Later pages of a full walk are stored, and read back only by a resumed run.
+                data = fetch_commits_page(
+                    owner,
+                    repo,
+                    default_branch,
+                    since_iso,
+                    current_cursor,
+                    use_cache=current_cursor is not None and not incremental,
+                    refresh=not resumed
+                )
+
+                if "errors" in data:
+                    print("GraphQL Error fetching commits page:", data["errors"])
+                    fetch_failed = True
+                    break
+
+                history = data.get("data", {}).get("repository", {}).get("ref", {}).get("target", {}).get("history", {})
+                nodes = history.get("nodes", [])
+                page_info = history.get("pageInfo", {})
+
+                if not nodes and current_cursor is None: # Check if repository/ref/target is null on first fetch
+                     if not data.get("data", {}).get("repository", {}).get("ref", {}):
+                          print("Warning: Repository or ref not found, or history is empty.")
+                     elif not data.get("data", {}).get("repository", {}).get("ref", {}).get("target"):
+                          print(f"Warning: Target (commit history) for branch '{default_branch}' not found. Branch might be empty or incorrect.")
+                     else:
+                         print("No commits found for the specified period.")
+                     break
+
+                with telemetry.span("commits.write_page", rows=len(nodes)):
+                    rows = [build_commit_row(commit, owner, repo) for commit in nodes]
+                    writer.write_rows(rows)
+                    if warehouse:
+                        warehouse.upsert("commits", rows)
+
+                has_next_page = page_info.get("hasNextPage", False)
+                current_cursor = page_info.get("endCursor")
+                if incremental:
+                    update_sync_walk(walk, nodes, known_shas, previous_head)
+                    if walk["stopped_early"]:
+                        has_next_page = False
+                checkpoint.save(cursor=current_cursor, offset=writer.tell(), walk=walk)
+
+                print(f"Fetched {len(nodes)} commits... Has next page: {has_next_page}")
+                if not has_next_page:
+                    print("Reached end of commit history for the period.")
+
+            except requests.exceptions.RequestException as e:
+                print(f"HTTP Request failed: {e}")
+                fetch_failed = True
+                break
+            except Exception as e:
+                print(f"An unexpected error occurred: {e}")
+                fetch_failed = True
+                break
+        span["rows"] = writer.rows_written
+        span["ok"] = not fetch_failed
+
+    if fetch_failed:
+        # Keep the partial file and checkpoint; the next run picks up from the last page
+        writer.close()
+        print(f"Fetch interrupted after {writer.rows_written} commits. Re-run to resume; {output_csv} was left unchanged.")
+        return False
+
+    # --- Write CSV ---
+    # A walk to the end of the window replaces the existing rows, dropping
+    # commits no longer on the branch; any other incremental walk merges them.
+    walked_window = not has_next_page and not walk["stopped_early"]
+    merge = incremental and not walked_window
+    if incremental and walked_window:
+        dropped = sorted(known_shas - writer.keys_written)
+        if dropped:
+            print(f"Dropping {len(dropped)} commits that are no longer on {default_branch}.")
+            if warehouse:
+                warehouse.delete("commits", [{"repo_owner": owner, "repo_name": repo, "sha": sha} for sha in dropped])
     try:
-        data = fetch_commits_page(
-            PUBLIC_REPO_OWNER,
-            PUBLIC_REPO_NAME,
-            default_branch,
-            SINCE_DATE_ISO,
-            current_cursor
-        )
-
-        if "errors" in data:
-            print("GraphQL Error fetching commits page:", data["errors"])
-            break
-
-        history = data.get("data", {}).get("repository", {}).get("ref", {}).get("target", {}).get("history", {})
-        nodes = history.get("nodes", [])
-        page_info = history.get("pageInfo", {})
-
-        if not nodes and current_cursor is None: # Check if repository/ref/target is null on first fetch
-             if not data.get("data", {}).get("repository", {}).get("ref", {}):
-                  print("Warning: Repository or ref not found, or history is empty.")
-             elif not data.get("data", {}).get("repository", {}).get("ref", {}).get("target"):
-                  print(f"Warning: Target (commit history) for branch '{default_branch}' not found. Branch might be empty or incorrect.")
-             else:
-                 print("No commits found for the specified period.")
-             break
-
-
-        for commit in nodes:
-            author = commit.get("author", {})
-            author_name = get_author_name(author)
-            diff = commit.get("additions", 0) + commit.get("deletions", 0)
-            all_commits.append([
-                commit.get("oid"),
-                commit.get("messageHeadline"),
-                commit.get("committedDate"),
-                commit.get("changedFilesIfAvailable", 0), # Provide default if missing
-                diff,
-                author_name,
-                PUBLIC_REPO_OWNER,
-                PUBLIC_REPO_NAME
-            ])
-
-        has_next_page = page_info.get("hasNextPage", False)
-        current_cursor = page_info.get("endCursor")
-
-        print(f"Fetched {len(nodes)} commits... Has next page: {has_next_page}")
-        if not has_next_page:
-            print("Reached end of commit history for the period.")
-
-    except requests.exceptions.RequestException as e:
-        print(f"HTTP Request failed: {e}")
-        break
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
-        break
-
-# --- Write CSV ---
-print(f"Writing {len(all_commits)} commits to {OUTPUT_CSV}...")
-try:
-    with open(OUTPUT_CSV, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(["sha", "message", "created_date", "number_of_files_updated", "diff", "author", "repo_owner", "repo_name"])
-        writer.writerows(all_commits)
-    print("Successfully wrote commits.csv")
-except IOError as e:
-    print(f"Error writing CSV file: {e}")
-    exit(1) 
\ No newline at end of file
+        if merge:
+            print(f"Merging {writer.rows_written} fetched commits with the existing rows in {output_csv}...")
+        with telemetry.span("commits.finalize", repo=f"{owner}/{repo}") as span:
+            total = writer.finalize(iter_rows(output_csv, in_window) if merge else ())
+            span["rows"] = total
+        checkpoint.clear()
+        if walk["head"]:
+            sync_state.save(head=walk["head"])
+        print(f"Successfully wrote {total} commits to {output_csv}")
+    except IOError as e:
+        print(f"Error writing CSV file: {e}")
+        return False
+    export_columnar(output_csv, "commits")
+    return True
+
+# --- Dry-Run Planning ---
+COMMIT_COUNT_QUERY = """
+query($owner: String!, $name: String!, $branch: String!, $since: GitTimestamp!) {
+  repository(owner: $owner, name: $name) {
+    ref(qualifiedName: $branch) {
+      target {
+        ... on Commit {
+          history(since: $since) { totalCount }
+        }
+      }
+    }
+  }
+}"""
+
+def plan_commits(owner, repo, since_iso):
+    """Estimates what fetch_commits would cost, without fetching (see cost_planner.py)."""
+    if COMMITS_BACKEND == "git":
+        return cost_planner.new_plan("commits", f"{owner}/{repo}", None, 0, 0,
+                                     notes=["git backend: the history is read from a clone at no API cost"])
+    default_branch = get_default_branch(owner, repo)
+    data = cost_planner.probe(client, COMMIT_COUNT_QUERY,
+                              {"owner": owner, "name": repo, "branch": default_branch, "since": since_iso})
+    target = (((data.get("data") or {}).get("repository") or {}).get("ref") or {}).get("target") or {}
+    total = (target.get("history") or {}).get("totalCount") or 0
+    page_cost = cost_planner.dry_run_cost(client, build_commits_page_query(owner, repo, default_branch, since_iso))
+    page_count = cost_planner.pages(total, COMMITS_PER_PAGE)
+    # One extra request (and point) looks up the default branch
+    return cost_planner.new_plan("commits", f"{owner}/{repo}", total, 1 + page_count, 1 + page_count * page_cost,
+                                 page_size=COMMITS_PER_PAGE, page_cost=page_cost)
+
+# --- Main Execution ---
+def main():
+    if not GITHUB_TOKEN and COMMITS_BACKEND != "git": # The git backend can read public repos anonymously
+        print("Error: GITHUB_TOKEN environment variable not set.")
+        exit(1)
+    if not SINCE_DATE_ISO:
+        print("Error: SINCE_DATE environment variable not set.")
+        exit(1)
+    if cost_planner.PLAN_ONLY:
+        cost_planner.report([plan_commits(PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME, SINCE_DATE_ISO)], client)
+        return
+
+    succeeded = fetch_commits(PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME, SINCE_DATE_ISO)
+    print_run_summary(client)
+    if not succeeded:
+        exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
+import math
 import os
 import requests
-import csv
 import json
 import sys
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import cost_planner
+from columnar_store import export_columnar
+from csv_store import Checkpoint, JsonlSpool, StreamingCSVWriter, has_columns, high_water_mark, iter_rows
+from github_client import RATE_LIMIT_FRAGMENT, error_messages, print_run_summary, shared_client
+from pr_registry import commit_authors
+from process_pool import RowPool
+from telemetry import telemetry
+from warehouse import shared_warehouse
 
 # --- Configuration ---
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
@@ -12,30 +21,30 @@ PUBLIC_REPO_OWNER = os.environ.get("PUBLIC_REPO_OWNER")
 PUBLIC_REPO_NAME = os.environ.get("PUBLIC_REPO_NAME")
 SINCE_DATE_ISO = os.environ.get("SINCE_DATE")
 OUTPUT_CSV = "issues.csv"
-API_URL = "https://api.github.com/graphql"
 ISSUES_PER_PAGE = 100
+TIMELINE_FIRST_PAGE = 5 # Timeline items fetched with each issue; most link fewer PRs than this
+TIMELINE_ITEMS_PER_PAGE = 100 # Timeline items per follow-up page for issues that have more
+ISSUE_BATCH_SIZE = 50 # Max issues packed into one aliased timeline follow-up query
 PR_COMMITS_PER_PAGE = 100
-
-# --- Input Validation ---
-if not GITHUB_TOKEN:
-    print("Error: GITHUB_TOKEN environment variable not set.", file=sys.stderr)
-    sys.exit(1)
-if not SINCE_DATE_ISO:
-    print("Error: SINCE_DATE environment variable not set.", file=sys.stderr)
-    sys.exit(1)
+PR_BATCH_SIZE = 50 # Max PRs packed into one aliased Stage 2 query
+MAX_QUERY_POINTS = 10 # Per-request cap that Stage 2 batches are sized to (cost_planner.proposed_page_size)
+# Concurrent requests in flight. GitHub's secondary limits punish heavy
+# parallelism, so the value is clamped to MAX_FETCH_WORKERS. 1 = serial stages.
+MAX_FETCH_WORKERS = 4
+FETCH_WORKERS = max(1, min(int(os.environ.get("FETCH_WORKERS", "1")), MAX_FETCH_WORKERS))
+# Only fetch issues updated since the newest `updated_date` already in OUTPUT_CSV
+INCREMENTAL = os.environ.get("INCREMENTAL", "").lower() in ("1", "true", "yes")
+ISSUE_DETAIL_FIELDS = ("id", "number", "title", "state", "createdAt", "closedAt", "updatedAt")
+CSV_FIELDS = ["issue_id", "issue_number", "title", "state", "created_date", "closed_date", "contributors", "repo_owner", "repo_name", "updated_date"]
+
+client = shared_client()
+warehouse = shared_warehouse() # None unless WAREHOUSE_DB is set
 
 # --- Helper Functions ---
-def run_graphql_query(query, variables={}):
-    """Executes a GraphQL query against the GitHub API."""
-    headers = {"Authorization": f"bearer {GITHUB_TOKEN}"}
+def run_graphql_query(query, variables={}, use_cache=False, refresh=False):
+    """Executes a GraphQL query against the GitHub API (retries handled by the shared client)."""
     try:
-        response = requests.post(
-            API_URL,
-            headers=headers,
-            json={"query": query, "variables": variables}
-        )
-        response.raise_for_status()
-        resp_json = response.json()
+        resp_json = client.query(query, variables, use_cache=use_cache, refresh=refresh)
         # Check for GraphQL-level errors
         if "errors" in resp_json:
             print(f"GraphQL Error: {resp_json['errors']}", file=sys.stderr)
@@ -48,24 +57,44 @@ def run_graphql_query(query, variables={}):
         return None
     except json.JSONDecodeError as e:
         print(f"Error decoding JSON response: {e}", file=sys.stderr)
-        print(f"Response text: {response.text}", file=sys.stderr) # Use response from outer scope
         return None
 
-def get_author_name(author_data):
-    """Extracts the best available author identifier from commit author nodes."""
-    if not author_data: return None
-    user = author_data.get("user")
-    if user and user.get("login"):
-        return user["login"]
-    if author_data.get("name"):
-        return author_data["name"]
-    return None
-
 # --- GraphQL Queries ---
 
+# Timeline items that can link an issue to a PR (ClosedEvent closer or CrossRef source)
+LINKED_PR_PAGE_FRAGMENT = """
+fragment LinkedPRPage on IssueTimelineItemsConnection {
+  pageInfo {
+    endCursor
+    hasNextPage
+  }
+  nodes {
+    __typename
+    ... on ClosedEvent {
+      closer {
+         __typename
+        ... on PullRequest {
+          number
+          repository { nameWithOwner } # Get owner/name
+        }
+      }
+    }
+    ... on CrossReferencedEvent {
+       source {
+         __typename
+        ... on PullRequest {
+          number
+          repository { nameWithOwner } # Get owner/name
+        }
+      }
+    }
+  }
+}"""
+
 # Stage 1: Fetch Issues and identify linked PRs via timeline
 FETCH_ISSUES_QUERY = """
 query($owner: String!, $name: String!, $since: DateTime!, $cursor: String) {
+  %s
   repository(owner: $owner, name: $name) {
     issues(
       first: %d, # Issues per page
@@ -84,42 +113,46 @@ query($owner: String!, $name: String!, $since: DateTime!, $cursor: String) {
         state
         createdAt
         closedAt
-        # Find PRs linked via timeline (ClosedEvent closer or CrossRef source)
-        timelineItems(itemTypes: [CLOSED_EVENT, CROSS_REFERENCED_EVENT], first: 20) { # Limit timeline check per issue
-          nodes {
-            __typename
-            ... on ClosedEvent {
-              closer {
-                 __typename
-                ... on PullRequest {
-                  number
-                  repository { nameWithOwner } # Get owner/name
-                }
-              }
-            }
-            ... on CrossReferencedEvent {
-               source {
-                 __typename
-                ... on PullRequest {
-                  number
-                  repository { nameWithOwner } # Get owner/name
-                }
-              }
-            }
-          }
+        updatedAt
+        # Find PRs linked via timeline; issues with more items get follow-up pages
+        timelineItems(itemTypes: [CLOSED_EVENT, CROSS_REFERENCED_EVENT], first: %d) {
+          ...LinkedPRPage
         }
       }
     }
   }
 }
-""" % ISSUES_PER_PAGE # Inject page size into query string
-
-# Stage 2: Fetch commits for a specific PR
-FETCH_PR_COMMITS_QUERY = """
-query($owner: String!, $name: String!, $prNumber: Int!, $cursor: String) {
-  repository(owner: $owner, name: $name) {
-    pullRequest(number: $prNumber) {
-      commits(first: %d, after: $cursor) { # Commits per page
+%s
+""" % (RATE_LIMIT_FRAGMENT, ISSUES_PER_PAGE, TIMELINE_FIRST_PAGE, LINKED_PR_PAGE_FRAGMENT) # Inject page sizes into query string
+
+# Stage 1 follow-ups: the rest of the timeline of issues that outgrew the first
+# window, one aliased `repository` selection (issue0, issue1, ...) per issue.
+ISSUE_TIMELINE_SELECTION = """
+  issue%(i)d: repository(owner: $owner, name: $name) {
+    issue(number: $number%(i)d) {
+      timelineItems(itemTypes: [CLOSED_EVENT, CROSS_REFERENCED_EVENT], first: %(per_page)d, after: $cursor%(i)d) {
+        ...LinkedPRPage
+      }
+    }
+  }"""
+
+def build_issue_timelines_batch_query(batch_len):
+    """Builds one query that fetches a timeline page for `batch_len` issues via aliases."""
+    params = ["$owner: String!, $name: String!"]
+    selections = []
+    for i in range(batch_len):
+        params.append(f"$number{i}: Int!, $cursor{i}: String")
+        selections.append(ISSUE_TIMELINE_SELECTION % {"i": i, "per_page": TIMELINE_ITEMS_PER_PAGE})
+    return "query(%s) {\n  %s%s\n}\n%s" % (", ".join(params), RATE_LIMIT_FRAGMENT, "".join(selections),
+                                           LINKED_PR_PAGE_FRAGMENT)
+
+# Stage 2: Fetch a commits page for many PRs at once. Each PR gets its own
+# aliased `repository` selection (pr0, pr1, ...) so one round trip covers a batch.
+PR_COMMITS_SELECTION = """
+  pr%(i)d: repository(owner: $owner%(i)d, name: $name%(i)d) {
+    pullRequest(number: $number%(i)d) {
+      state
+      commits(first: %(per_page)d, after: $cursor%(i)d) { # Commits per page
         pageInfo {
           endCursor
           hasNextPage
@@ -135,18 +168,121 @@ query($owner: String!, $name: String!, $prNumber: Int!, $cursor: String) {
         }
       }
     }
-  }
-}
-""" % PR_COMMITS_PER_PAGE # Inject page size
+  }"""
+
+def build_pr_commits_batch_query(batch_len):
+    """Builds one query that fetches a page of commits for `batch_len` PRs via aliases."""
+    params = []
+    selections = []
+    for i in range(batch_len):
+        params.append(f"$owner{i}: String!, $name{i}: String!, $number{i}: Int!, $cursor{i}: String")
+        selections.append(PR_COMMITS_SELECTION % {"i": i, "per_page": PR_COMMITS_PER_PAGE})
+    return "query(%s) {\n  %s%s\n}" % (", ".join(params), RATE_LIMIT_FRAGMENT, "".join(selections))
 
 # --- Stage 1: Fetch Issues and Identify Linked PRs ---
-def fetch_issues_and_identify_prs(target_owner, target_name, since_iso):
-    all_issues_raw_data = [] # Store {issue_details, linked_pr_keys_set}
-    unique_pr_keys = set() # Store unique (owner, name, number) tuples
-    issues_cursor = None
-    issues_has_next_page = True
+def make_pr_key(pr_owner, pr_name, pr_number):
+    """(owner, name, number) key of a PR, with the repeated owner and name strings interned."""
+    return (sys.intern(pr_owner), sys.intern(pr_name), pr_number)
+
+def extract_linked_pr_keys(issue):
+    """Returns the set of (owner, name, number) keys for PRs linked in an issue's timeline."""
+    linked_pr_keys_for_issue = set()
+    timeline_items = issue.get("timelineItems", {}).get("nodes", [])
+
+    for item in timeline_items:
+        pr_info = None
+        # Check ClosedEvent closer
+        if item and item.get("__typename") == "ClosedEvent":
+            closer = item.get("closer")
+            if closer and closer.get("__typename") == "PullRequest":
+                pr_info = closer
+        # Check CrossReferencedEvent source
+        elif item and item.get("__typename") == "CrossReferencedEvent":
+            source = item.get("source")
+            if source and source.get("__typename") == "PullRequest":
+                pr_info = source
+
+        # If a PR was found, store its identifier
+        if pr_info and pr_info.get("repository") and pr_info.get("number"):
+            repo_full_name = pr_info["repository"]["nameWithOwner"]
+            pr_number = pr_info["number"]
+            try:
+                pr_owner, pr_name = repo_full_name.split('/')
+                linked_pr_keys_for_issue.add(make_pr_key(pr_owner, pr_name, pr_number))
+            except ValueError:
+                print(f"  Warning: Could not parse owner/name from {repo_full_name} for PR #{pr_number} linked to issue #{issue['number']}", file=sys.stderr)
+
+    return linked_pr_keys_for_issue
+
+def compact_issue(issue):
+    """Keeps only what Stage 3 needs so the raw issue and its timeline can be released."""
+    return {
+        "details": {field: issue.get(field) for field in ISSUE_DETAIL_FIELDS},
+        "linked_pr_keys": sorted(extract_linked_pr_keys(issue))
+    }
 
-    print(f"Stage 1: Fetching issues updated since {since_iso} from {target_owner}/{target_name}...")
+def decode_spooled_issue(line):
+    """Parses one Stage 1 spool line, restoring linked PR keys as a set of tuples."""
+    record = json.loads(line)
+    record["linked_pr_keys"] = {make_pr_key(*key) for key in record["linked_pr_keys"]}
+    return record
+
+def iter_spooled_issues(spool):
+    """Reads Stage 1 records back from the spool."""
+    for line in spool.lines():
+        yield decode_spooled_issue(line)
+
+def timeline_cursor(issue):
+    """End cursor of the issue's fetched timeline if it has more items, else None."""
+    page_info = (issue.get("timelineItems") or {}).get("pageInfo") or {}
+    return page_info.get("endCursor") if page_info.get("hasNextPage") else None
+
+def fetch_remaining_timelines(target_owner, target_name, issues):
+    """Pages through the rest of the timeline of issues whose first window has more items.
+
+    Fetched items are appended to each issue's timelineItems in place, batching
+    up to ISSUE_BATCH_SIZE issues per aliased query. Returns False if a
+    follow-up query failed, leaving the issues incomplete.
+    """
+    pending = [(issue, timeline_cursor(issue)) for issue in issues if timeline_cursor(issue)]
+    if pending:
+        print(f"  Fetching more timeline items for {len(pending)} issues...")
+    while pending:
+        batch, pending = pending[:ISSUE_BATCH_SIZE], pending[ISSUE_BATCH_SIZE:]
+        variables = {"owner": target_owner, "name": target_name}
+        for i, (issue, cursor) in enumerate(batch):
+            variables[f"number{i}"] = issue["number"]
+            variables[f"cursor{i}"] = cursor
+        # Uncached: the timeline of an open issue keeps growing, and a cursor page is rarely requested twice
+        response = run_graphql_query(build_issue_timelines_batch_query(len(batch)), variables, use_cache=False)
+        if not response or response.get("data") is None:
+            print(f"  Error fetching timeline items for {len(batch)} issues.", file=sys.stderr)
+            return False
+
+        for i, (issue, _) in enumerate(batch):
+            timeline = ((response["data"].get(f"issue{i}") or {}).get("issue") or {}).get("timelineItems")
+            if not timeline:
+                continue # Issue no longer accessible; keep the items already fetched
+            issue["timelineItems"]["nodes"].extend(timeline["nodes"])
+            issue["timelineItems"]["pageInfo"] = timeline["pageInfo"]
+            if timeline_cursor(issue):
+                pending.append((issue, timeline_cursor(issue)))
+    return True
+
+def iter_issue_pages(target_owner, target_name, since_iso, issues_cursor=None):
+    """Yields (compact issue records, end cursor, has_next_page) per issues page.
+
+    Pages are held back until ISSUE_BATCH_SIZE of their issues need more
+    timeline items (or the last page arrives), so one round of follow-up
+    queries serves several pages. Only those issues are held raw; the
+    others are compacted as soon as their page is parsed. Stops early, without a final
+    has_next_page=False, when a page cannot be fetched; held pages are then
+    not yielded, so a resumed run fetches them again.
+    """
+    issues_has_next_page = True
+    resumed = issues_cursor is not None # Only a run resuming from its checkpoint starts at a cursor
+    held_pages = [] # (records, end cursor, has_next_page) awaiting follow-ups
+    held_incomplete = [] # Raw issues among the held records whose timeline has more items
 
     while issues_has_next_page:
         print(f"  Fetching issues page (cursor: {issues_cursor})...")
@@ -156,7 +292,10 @@ def fetch_issues_and_identify_prs(target_owner, target_name, since_iso):
             "since": since_iso,
             "cursor": issues_cursor
         }
-        response = run_graphql_query(FETCH_ISSUES_QUERY, variables)
+        # The first page is never cached: with an unchanged high-water mark a re-run sends the same
+        # variables. Cursor pages are stored, and read back only by a resumed run.
+        response = run_graphql_query(FETCH_ISSUES_QUERY, variables, use_cache=issues_cursor is not None,
+                                     refresh=not resumed)
 
         if not response or response.get("data") is None:
             print(f"  Error fetching issues or empty data received. Stopping issue fetch.", file=sys.stderr)
@@ -164,120 +303,225 @@ def fetch_issues_and_identify_prs(target_owner, target_name, since_iso):
 
         repo_data = response.get("data", {}).get("repository")
         if not repo_data or not repo_data.get("issues"):
-            print(f"  Could not find repository/issues data in response. Skipping page.", file=sys.stderr)
-            issues_has_next_page = False
-            continue
+            print(f"  Could not find repository/issues data in response. Stopping issue fetch.", file=sys.stderr)
+            break
 
-        issues = repo_data["issues"]["nodes"]
+        # Project each issue onto its details plus the set of linked PR keys, unless it needs follow-ups
+        records = []
+        for issue in repo_data["issues"]["nodes"]:
+            if issue and timeline_cursor(issue):
+                held_incomplete.append(issue)
+                records.append(issue)
+            elif issue:
+                records.append(compact_issue(issue))
         page_info = repo_data["issues"]["pageInfo"]
         issues_has_next_page = page_info.get("hasNextPage", False)
         issues_cursor = page_info.get("endCursor")
+        response = repo_data = None # Release the raw page before the next request
 
-        print(f"  Fetched {len(issues)} issues on this page.")
-
-        for issue in issues:
-            if not issue: continue
-            linked_pr_keys_for_issue = set()
-            timeline_items = issue.get("timelineItems", {}).get("nodes", [])
-
-            for item in timeline_items:
-                pr_info = None
-                # Check ClosedEvent closer
-                if item and item.get("__typename") == "ClosedEvent":
-                    closer = item.get("closer")
-                    if closer and closer.get("__typename") == "PullRequest":
-                        pr_info = closer
-                # Check CrossReferencedEvent source
-                elif item and item.get("__typename") == "CrossReferencedEvent":
-                    source = item.get("source")
-                    if source and source.get("__typename") == "PullRequest":
-                        pr_info = source
-
-                # If a PR was found, store its identifier
-                if pr_info and pr_info.get("repository") and pr_info.get("number"):
-                    repo_full_name = pr_info["repository"]["nameWithOwner"]
-                    pr_number = pr_info["number"]
-                    try:
-                        pr_owner, pr_name = repo_full_name.split('/')
-                        pr_key = (pr_owner, pr_name, pr_number)
-                        linked_pr_keys_for_issue.add(pr_key)
-                        unique_pr_keys.add(pr_key)
-                    except ValueError:
-                        print(f"  Warning: Could not parse owner/name from {repo_full_name} for PR #{pr_number} linked to issue #{issue['number']}", file=sys.stderr)
-
-            # Store raw issue data along with the set of linked PR keys
-            all_issues_raw_data.append({
-                "details": issue,
-                "linked_pr_keys": linked_pr_keys_for_issue
-            })
+        print(f"  Fetched {len(records)} issues on this page.")
+        held_pages.append((records, issues_cursor, issues_has_next_page))
+        if issues_has_next_page and len(held_incomplete) < ISSUE_BATCH_SIZE:
+            continue
+
+        if not fetch_remaining_timelines(target_owner, target_name, held_incomplete):
+            break # Held pages are not spooled, so a re-run resumes before them
+        for records, cursor, has_next_page in held_pages:
+            yield [compact_issue(r) if "timelineItems" in r else r for r in records], cursor, has_next_page
+        held_pages, held_incomplete = [], []
 
         if not issues_has_next_page:
             print(f"  No more issues pages.")
-            break
 
-    print(f"Stage 1 Complete: Identified {len(all_issues_raw_data)} relevant issues and {len(unique_pr_keys)} unique linked PRs.")
-    return all_issues_raw_data, unique_pr_keys
+def spool_issue_pages(target_owner, target_name, since_iso, spool, checkpoint, cursor=None, on_page=None):
+    """Appends each issues page to `spool`, checkpointing after every page.
+
+    `on_page`, if given, is called with each page's records once they are spooled.
+    Returns True once the last page has been spooled, False if the fetch stopped early.
+    """
+    for page, cursor, has_next_page in iter_issue_pages(target_owner, target_name, since_iso, cursor):
+        for issue_data in page:
+            spool.append(issue_data)
+        checkpoint.save(cursor=cursor, offset=spool.tell(), stage1_complete=not has_next_page)
+        if on_page:
+            on_page(page)
+        if not has_next_page:
+            return True
+    return False
+
+def fetch_issues_and_identify_prs(target_owner, target_name, since_iso, spool, checkpoint, resume_state=None):
+    """Stage 1: spools every issue updated since `since_iso`.
+
+    Returns the set of unique linked PR keys, or None if the issue fetch was interrupted.
+    """
+    resume_state = resume_state or {}
+    if not resume_state.get("stage1_complete"):
+        print(f"Stage 1: Fetching issues updated since {since_iso} from {target_owner}/{target_name}...")
+        if not spool_issue_pages(target_owner, target_name, since_iso, spool, checkpoint, resume_state.get("cursor")):
+            return None
+
+    issue_count = 0
+    unique_pr_keys = set() # Store unique (owner, name, number) tuples
+    for issue_data in iter_spooled_issues(spool):
+        issue_count += 1
+        unique_pr_keys.update(issue_data["linked_pr_keys"])
+
+    print(f"Stage 1 Complete: Identified {issue_count} relevant issues and {len(unique_pr_keys)} unique linked PRs.")
+    return unique_pr_keys
 
 # --- Stage 2: Fetch Commits for Unique PRs ---
-def fetch_authors_for_prs(pr_keys):
-    pr_author_map = {} # { pr_key: set(authors) }
+def fetch_authors_for_prs(pr_keys, registry=None):
     total_prs = len(pr_keys)
-    print(f"Stage 2: Fetching commit authors for {total_prs} unique PRs...")
-
-    for i, pr_key in enumerate(pr_keys, 1):
-        pr_owner, pr_name, pr_number = pr_key
-        print(f"  Processing PR {i}/{total_prs}: {pr_owner}/{pr_name}#{pr_number}")
-        pr_authors = set()
-        commits_cursor = None
-        commits_has_next_page = True
-
-        while commits_has_next_page:
-            variables = {
-                "owner": pr_owner,
-                "name": pr_name,
-                "prNumber": pr_number,
-                "cursor": commits_cursor
-            }
-            response = run_graphql_query(FETCH_PR_COMMITS_QUERY, variables)
+    print(f"Stage 2: Fetching commit authors for {total_prs} unique PRs in batches of up to {PR_BATCH_SIZE}...")
+    pr_author_map, requests_made = fetch_author_pages(pr_keys, registry)
+    print(f"Stage 2 Complete: Processed authors for {len(pr_author_map)} PRs in {requests_made} requests.")
+    return pr_author_map
 
-            if not response or response.get("data") is None:
-                print(f"    Error fetching commits for PR {pr_key}. Skipping.", file=sys.stderr)
-                commits_has_next_page = False # Stop trying for this PR
-                continue
+def pr_authors_cache_key(pr_key):
+    pr_owner, pr_name, pr_number = pr_key
+    return f"pr_authors:{pr_owner}/{pr_name}#{pr_number}"
+
+def fetch_author_pages(pr_keys, registry=None):
+    """Fetches every commit page for `pr_keys`. Returns ({pr_key: set(authors)}, request count).
+
+    Pages already recorded in `registry` (a PRRegistry) are not fetched again.
+    """
+    pr_author_map = {pr_key: set() for pr_key in pr_keys} # { pr_key: set(authors) }
+
+    # Work queue of (pr_key, cursor). Every PR starts with its first page; only PRs
+    # reporting hasNextPage are re-queued with their cursor for a follow-up page.
+    # PRs whose author set is already cached are skipped entirely, and PRs the
+    # registry has seen start after the pages it holds.
+    pending = []
+    for pr_key in pr_author_map:
+        known = registry.lookup(pr_key) if registry is not None else None
+        if known is not None:
+            pr_author_map[pr_key].update(known.authors)
+            if known.cursor is not None:
+                pending.append((pr_key, known.cursor))
+            continue
+        cached = client.cache.get(pr_authors_cache_key(pr_key)) if client.cache else None
+        if cached is not None:
+            pr_author_map[pr_key] = set(map(sys.intern, cached))
+        else:
+            pending.append((pr_key, None))
+    batch_size = batch_limit = PR_BATCH_SIZE
+    requests_made = 0
+
+    while pending:
+        batch, pending = pending[:batch_size], pending[batch_size:]
+        variables = {}
+        for i, (pr_key, cursor) in enumerate(batch):
+            pr_owner, pr_name, pr_number = pr_key
+            variables.update({
+                f"owner{i}": pr_owner,
+                f"name{i}": pr_name,
+                f"number{i}": pr_number,
+                f"cursor{i}": cursor
+            })
+        # Batch composition varies run to run, so cache per PR below instead of per query
+        response = run_graphql_query(build_pr_commits_batch_query(len(batch)), variables, use_cache=False)
+        requests_made += 1
+
+        if not response or response.get("data") is None:
+            if len(batch) > 1:
+                # Large batches can time out server-side; retry them as two halves, and grow no larger again
+                batch_size = batch_limit = max(1, len(batch) // 2)
+                print(f"    Batch of {len(batch)} PRs failed. Retrying in batches of {batch_size}.", file=sys.stderr)
+                pending = batch + pending
+            else:
+                print(f"    Error fetching commits for PR {batch[0][0]}. Skipping.", file=sys.stderr)
+            continue
 
-            pr_data = response.get("data", {}).get("repository", {}).get("pullRequest")
+        data = response["data"]
+        cost = (data.get("rateLimit") or {}).get("cost")
+        batch_size = cost_planner.proposed_page_size(len(batch), cost, MAX_QUERY_POINTS, maximum=batch_limit)
+
+        follow_ups = []
+        for i, (pr_key, _) in enumerate(batch):
+            pr_data = (data.get(f"pr{i}") or {}).get("pullRequest")
             if not pr_data or not pr_data.get("commits"):
-                commits_has_next_page = False
-                continue
+                continue # PR not found or not accessible; GraphQL error already printed
 
             commits = pr_data["commits"]["nodes"]
             page_info = pr_data["commits"]["pageInfo"]
-            commits_has_next_page = page_info.get("hasNextPage", False)
-            commits_cursor = page_info.get("endCursor")
-
-            for commit_node in commits:
-                if not commit_node or not commit_node.get("commit"): continue
-                author_info = commit_node["commit"].get("author", {})
-                name = get_author_name(author_info)
-                if name:
-                    pr_authors.add(name)
-
-            if not commits_has_next_page:
-                pass
-
-        pr_author_map[pr_key] = pr_authors
-        print(f"  -> Found {len(pr_authors)} unique authors for PR {pr_key}")
 
-
-    print(f"Stage 2 Complete: Processed authors for {len(pr_author_map)} PRs.")
+            pr_author_map[pr_key].update(commit_authors(commits))
+
+            if page_info.get("hasNextPage", False):
+                follow_ups.append((pr_key, page_info.get("endCursor")))
+            elif client.cache:
+                # Commits of a merged or closed PR can no longer change
+                immutable = pr_data.get("state") in ("MERGED", "CLOSED")
+                client.cache.set(pr_authors_cache_key(pr_key), sorted(pr_author_map[pr_key]), immutable=immutable)
+
+        pending.extend(follow_ups)
+        print(f"  Fetched commits for {len(batch)} PRs ({len(follow_ups)} need another page, {len(pending)} pages queued)")
+
+    return pr_author_map, requests_made
+
+# --- Stages 1+2 Overlapped: Concurrent Mode ---
+def fetch_issues_and_authors_concurrently(target_owner, target_name, since_iso, workers, spool, checkpoint, resume_state=None,
+                                          registry=None):
+    """Runs Stage 1 and Stage 2 together on a bounded thread pool.
+
+    Issue pages are still fetched one after another (the cursor chains them), but
+    every full batch of newly discovered PR keys is handed to the pool straight
+    away, so commit-author lookups run while later issue pages are downloading.
+    Returns the same pr_author_map as the serial Stage 2, or None if the issue
+    fetch was interrupted.
+    """
+    resume_state = resume_state or {}
+    seen_pr_keys = set()
+    unsubmitted = []
+    futures = []
+    issue_count = 0
+
+    print(f"Stages 1+2: Fetching issues updated since {since_iso} from {target_owner}/{target_name} "
+          f"with {workers} workers...")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        def schedule(issue_records, flush=False):
+            nonlocal unsubmitted, issue_count
+            for issue_data in issue_records:
+                issue_count += 1
+                new_keys = set(issue_data["linked_pr_keys"]) - seen_pr_keys
+                seen_pr_keys.update(new_keys)
+                unsubmitted.extend(sorted(new_keys))
+            while len(unsubmitted) >= PR_BATCH_SIZE or (flush and unsubmitted):
+                futures.append(executor.submit(fetch_author_pages, unsubmitted[:PR_BATCH_SIZE], registry))
+                unsubmitted = unsubmitted[PR_BATCH_SIZE:]
+
+        # Records spooled before an interruption are scheduled first
+        schedule(iter_spooled_issues(spool))
+        if not resume_state.get("stage1_complete"):
+            if not spool_issue_pages(target_owner, target_name, since_iso, spool, checkpoint,
+                                     resume_state.get("cursor"), on_page=schedule):
+                return None
+        schedule((), flush=True)
+
+        print(f"Stage 1 Complete: Identified {issue_count} relevant issues and {len(seen_pr_keys)} unique linked PRs.")
+
+        pr_author_map = {}
+        requests_made = 0
+        for future in as_completed(futures):
+            batch_map, batch_requests = future.result()
+            pr_author_map.update(batch_map)
+            requests_made += batch_requests
+
+    print(f"Stage 2 Complete: Processed authors for {len(pr_author_map)} PRs in {requests_made} requests.")
     return pr_author_map
 
 # --- Stage 3: Aggregate and Write CSV ---
-def aggregate_and_write_csv(issues_raw_data, pr_author_map, output_file):
-    print(f"Stage 3: Aggregating contributors and writing to {output_file}...")
-    final_data_for_csv = []
-
-    for issue_data in issues_raw_data:
+def issue_rows(spooled_lines, context):
+    """RowPool function: CSV rows for a chunk of Stage 1 spool lines.
+
+    `context` is (pr_author_map, repo_owner, repo_name).
+    """
+    pr_author_map, repo_owner, repo_name = context
+    rows = []
+    for line in spooled_lines:
+        issue_data = decode_spooled_issue(line)
         issue_details = issue_data["details"]
         linked_pr_keys = issue_data["linked_pr_keys"]
         issue_contributors = set()
@@ -286,47 +530,189 @@ def aggregate_and_write_csv(issues_raw_data, pr_author_map, output_file):
             authors = pr_author_map.get(pr_key, set()) # Get authors for this PR
             issue_contributors.update(authors) # Add them to the issue's set
 
-        final_data_for_csv.append([
+        rows.append(dict(zip(CSV_FIELDS, [
             issue_details.get("id"),
             issue_details.get("number"),
             issue_details.get("title"),
             issue_details.get("state"),
             issue_details.get("createdAt"),
             issue_details.get("closedAt") or "", # Use empty string if null
-            ";".join(sorted(list(issue_contributors))),
-            PUBLIC_REPO_OWNER,
-            PUBLIC_REPO_NAME# Join unique names
-        ])
-
-    print(f"  Aggregated data for {len(final_data_for_csv)} issues.")
+            ";".join(sorted(list(issue_contributors))), # Join unique names
+            repo_owner,
+            repo_name,
+            issue_details.get("updatedAt") or ""
+        ])))
+    return rows
+
+def aggregate_and_write_csv(spooled_lines, pr_author_map, output_file, merge_rows=(),
+                            repo_owner=PUBLIC_REPO_OWNER, repo_name=PUBLIC_REPO_NAME):
+    """Streams one row per spooled issue into the output; `merge_rows` (existing rows) are upserted by issue_id.
+
+    `spooled_lines` are the undecoded Stage 1 records; with PROCESS_WORKERS set
+    they are decoded and joined with `pr_author_map` on a process pool.
+    Returns True on success.
+    """
+    print(f"Stage 3: Aggregating contributors and writing to {output_file}...")
 
-    # --- Write CSV using Python's csv module ---
     try:
-        with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            # Write Header
-            writer.writerow(["issue_id", "issue_number", "title", "state", "created_date", "closed_date", "contributors", "repo_owner", "repo_name"])
-            # Write Data Rows
-            writer.writerows(final_data_for_csv)
-        print(f"Successfully wrote CSV data to {output_file}")
+        writer = StreamingCSVWriter(output_file, CSV_FIELDS, key="issue_id")
+        with RowPool(issue_rows, (pr_author_map, repo_owner, repo_name)) as row_pool:
+            for rows in row_pool.map(spooled_lines):
+                writer.write_rows(rows)
+                if warehouse:
+                    warehouse.upsert("issues", rows)
+
+        print(f"  Aggregated data for {writer.rows_written} issues.")
+        # --- Merge existing rows (incremental mode) and rename into place ---
+        total = writer.finalize(merge_rows)
+        print(f"Successfully wrote {total} issues to {output_file}")
     except IOError as e:
         print(f"Error writing CSV file {output_file}: {e}", file=sys.stderr)
-        sys.exit(1)
+        return False
+    return True
+
+
+def fetch_issues(owner, name, since_iso, output_csv=OUTPUT_CSV, incremental=INCREMENTAL, workers=FETCH_WORKERS,
+                 registry=None):
+    """Runs Stages 1-3 for one repository. Returns True once `output_csv` has been written.
+
+    Stage 2 takes what it can from `registry`, a PRRegistry filled by an
+    earlier fetch_prs call in the same process.
+
+    On failure the spool and checkpoint are kept so the next call resumes,
+    and `output_csv` is left untouched.
+    """
+    def in_window(row):
+        return row["updated_date"] >= since_iso
+
+    incremental = incremental and has_columns(output_csv, CSV_FIELDS)
+    fetch_since = since_iso
+    if incremental:
+        # Resume from the latest update among issues still inside the window
+        fetch_since = max(since_iso, high_water_mark(iter_rows(output_csv, in_window), "updated_date") or since_iso)
+        print(f"Incremental mode: fetching issues updated since {fetch_since} (newest update in {output_csv}).")
+
+    # Stage 1 records stream to a spool file; the checkpoint remembers the issues cursor
+    checkpoint = Checkpoint(output_csv, {"repo": f"{owner}/{name}", "since": fetch_since})
+    saved = checkpoint.load()
+    spool = JsonlSpool(output_csv + ".stage1.jsonl", resume_offset=saved and saved["offset"])
+    resume_state = saved if saved and spool.resumed else None
+    if resume_state:
+        print(f"Resuming interrupted run from its Stage 1 checkpoint (cursor: {resume_state['cursor']}).")
+
+    repo = f"{owner}/{name}"
+    if workers > 1:
+        # Stages 1+2 overlapped on a thread pool
+        with telemetry.span("issues.stage1+2", repo=repo, workers=workers) as span:
+            pr_authors = fetch_issues_and_authors_concurrently(
+                owner, name, fetch_since, workers, spool, checkpoint, resume_state, registry
+            )
+            span["prs"] = len(pr_authors) if pr_authors is not None else None
+    else:
+        # Stage 1
+        with telemetry.span("issues.stage1", repo=repo) as span:
+            unique_prs = fetch_issues_and_identify_prs(
+                owner, name, fetch_since, spool, checkpoint, resume_state
+            )
+            span["prs"] = len(unique_prs) if unique_prs is not None else None
+
+        # Stage 2
+        with telemetry.span("issues.stage2", repo=repo) as span:
+            pr_authors = fetch_authors_for_prs(unique_prs, registry) if unique_prs is not None else None
+            span["prs"] = len(pr_authors) if pr_authors is not None else None
+
+    if pr_authors is None:
+        spool.close()
+        print(f"Fetch interrupted. Re-run to resume; {output_csv} was left unchanged.", file=sys.stderr)
+        return False
+
+    if warehouse:
+        warehouse.upsert("pr_authors", (
+            {"pr_number": pr_number, "author": author, "repo_owner": pr_owner, "repo_name": pr_name}
+            for (pr_owner, pr_name, pr_number), authors in pr_authors.items() for author in authors
+        ))
+
+    # Stage 3
+    with telemetry.span("issues.stage3", repo=repo) as span:
+        written = aggregate_and_write_csv(
+            spool.lines(), pr_authors, output_csv,
+            iter_rows(output_csv, in_window) if incremental else (),
+            repo_owner=owner, repo_name=name
+        )
+        span["ok"] = written
+    if not written:
+        spool.close()
+        return False
+    checkpoint.clear()
+    spool.discard()
+    export_columnar(output_csv, "issues")
+    return True
+
+
+# --- Dry-Run Planning ---
+ISSUE_COUNT_QUERY = """
+query($owner: String!, $name: String!, $since: DateTime!, $linkedPRs: String!) {
+  repository(owner: $owner, name: $name) {
+    issues(filterBy: {since: $since}) { totalCount }
+  }
+  search(query: $linkedPRs, type: ISSUE, first: 1) { issueCount }
+}"""
+
+def plan_issues(owner, name, since_iso, workers=FETCH_WORKERS):
+    """Estimates what fetch_issues would cost, without fetching (see cost_planner.py).
+
+    Stage 2 is sized by the PRs GitHub reports as linked to an issue and
+    updated in the window. PRs that only cross-reference an issue, or live in
+    another repository, are not counted.
+    """
+    linked_prs = f"repo:{owner}/{name} is:pr linked:issue updated:>={since_iso[:10]}"
+    response = cost_planner.probe(client, ISSUE_COUNT_QUERY,
+                                  {"owner": owner, "name": name, "since": since_iso, "linkedPRs": linked_prs})
+    data = response.get("data") or {}
+    issue_count = (((data.get("repository") or {}).get("issues") or {}).get("totalCount")) or 0
+    pr_count = (data.get("search") or {}).get("issueCount") or 0
+
+    issue_page_cost = cost_planner.dry_run_cost(client, FETCH_ISSUES_QUERY,
+                                                {"owner": owner, "name": name, "since": since_iso, "cursor": None})
+    def price_batch(size):
+        variables = {}
+        for i in range(size):
+            variables.update({f"owner{i}": owner, f"name{i}": name, f"number{i}": 1, f"cursor{i}": None})
+        return cost_planner.dry_run_cost(client, build_pr_commits_batch_query(size), variables)
+
+    batch_cost = price_batch(PR_BATCH_SIZE)
+    batch_size = cost_planner.proposed_page_size(PR_BATCH_SIZE, batch_cost, MAX_QUERY_POINTS)
+    if batch_size != PR_BATCH_SIZE:
+        batch_cost = price_batch(batch_size) # The batch fetch_author_pages settles on
+    issue_pages = cost_planner.pages(issue_count, ISSUES_PER_PAGE)
+    pr_batches = math.ceil(pr_count / batch_size)
+    notes = [f"Stage 1: {issue_pages} issue pages at {issue_page_cost} points; Stage 2: ~{pr_count} linked PRs "
+             f"in batches of {batch_size} at {batch_cost} points (cached PRs are skipped)"]
+    if response.get("errors"):
+        notes.append(f"Count probe failed, so the counts above may be too low: {error_messages(response)}")
+    return cost_planner.new_plan(
+        "issues", f"{owner}/{name}", issue_count, issue_pages + pr_batches,
+        issue_pages * issue_page_cost + pr_batches * batch_cost, workers=workers,
+        page_size=ISSUES_PER_PAGE, page_cost=issue_page_cost, linked_prs=pr_count, pr_batch_size=batch_size,
+        notes=notes)
 
 
 # --- Main Execution ---
 if __name__ == "__main__":
-    print("Starting multi-stage contributor fetch process...")
-
-    # Stage 1
-    issues_raw, unique_prs = fetch_issues_and_identify_prs(
-        PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME, SINCE_DATE_ISO
-    )
-
-    # Stage 2
-    pr_authors = fetch_authors_for_prs(unique_prs)
-
-    # Stage 3
-    aggregate_and_write_csv(issues_raw, pr_authors, OUTPUT_CSV)
+    # --- Input Validation ---
+    if not GITHUB_TOKEN:
+        print("Error: GITHUB_TOKEN environment variable not set.", file=sys.stderr)
+        sys.exit(1)
+    if not SINCE_DATE_ISO:
+        print("Error: SINCE_DATE environment variable not set.", file=sys.stderr)
+        sys.exit(1)
+    if cost_planner.PLAN_ONLY:
+        cost_planner.report([plan_issues(PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME, SINCE_DATE_ISO)], client)
+        sys.exit(0)
 
-    print("Process completed!")
\ No newline at end of file
+    print("Starting multi-stage contributor fetch process...")
+    succeeded = fetch_issues(PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME, SINCE_DATE_ISO)
+    print_run_summary(client)
+    if not succeeded:
+        sys.exit(1)
+    print("Process completed!")
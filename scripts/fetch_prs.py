@@ -1,7 +1,23 @@
 import os
-import csv
+import re
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from datetime import datetime, timedelta, timezone
+
 import requests
-from dateutil import parser
+
+import cost_planner
+from columnar_store import export_columnar
+from csv_store import Checkpoint, StreamingCSVWriter, has_columns, high_water_mark, iter_rows
+from github_client import RATE_LIMIT_FRAGMENT, error_messages, print_run_summary, shared_client
+from pr_registry import PR_COMMITS_FIELDS
+from process_pool import RowPool
+from quantile_sketch import SketchStore, sketch_path
+from telemetry import telemetry
+from warehouse import shared_warehouse
 
 # --- Configuration ---
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
@@ -9,17 +25,38 @@ PUBLIC_REPO_OWNER = os.environ.get("PUBLIC_REPO_OWNER")
 PUBLIC_REPO_NAME = os.environ.get("PUBLIC_REPO_NAME")
 DATE_RANGE = os.environ.get("DATE_RANGE")
 OUTPUT_CSV = "prs.csv"
-API_URL = "https://api.github.com/graphql"
+# Only fetch PRs updated since the newest `updated_date` already in OUTPUT_CSV
+INCREMENTAL = os.environ.get("INCREMENTAL", "").lower() in ("1", "true", "yes")
+CSV_FIELDS = ['pr_number', 'created_date', 'time_to_first_review_sec', 'time_to_approval_sec',
+              'time_to_merge_sec', 'was_merged', 'updated_date', 'repo_owner', 'repo_name']
+SEARCH_RESULT_CAP = 1000 # GitHub search returns at most this many results per query
+MIN_SHARD_SEC = 60 # Created-at windows are not split below this width
+# Search shards fetched in parallel; clamped to stay clear of secondary rate limits
+MAX_FETCH_WORKERS = 4
+FETCH_WORKERS = max(1, min(int(os.environ.get("FETCH_WORKERS", "1")), MAX_FETCH_WORKERS))
+PRS_PER_PAGE = 100 # Search page size to start with (GitHub's maximum)
+MIN_PRS_PER_PAGE = 10
+REVIEWS_FIRST_PAGE = 10 # Reviews fetched with each PR; most PRs have their first review and approval in here
+REVIEWS_PER_PAGE = 100 # Reviews per follow-up page for PRs that need more
+REVIEW_BATCH_SIZE = 50 # Max PRs packed into one aliased follow-up query
+MAX_QUERY_POINTS = 10 # Per-request cap that search pages and follow-up batches are sized to (cost_planner.proposed_page_size)
 
-if not GITHUB_TOKEN:
-    print("GITHUB_TOKEN environment variable is required.")
-    exit(1)
+client = shared_client()
+warehouse = shared_warehouse() # None unless WAREHOUSE_DB is set
 
-HEADERS = {"Authorization": f"Bearer {GITHUB_TOKEN}"}
+# What is kept of a PR once its search page is parsed; the raw node is dropped.
+# `reviews_cursor` is the end cursor of the first review window if more reviews exist.
+PRRecord = namedtuple('PRRecord', ['number', 'created_at', 'updated_at', 'merged_at', 'state', 'author',
+                                   'reviews', 'reviews_cursor'])
+Review = namedtuple('Review', ['reviewer', 'state', 'submitted_at'])
 
+# One search page of PRs. Only the first REVIEWS_FIRST_PAGE reviews come along;
+# PRs that need more are completed by fetch_remaining_reviews. When a PRRegistry
+# is collecting commit authors, the last %s selects their first page too.
 PR_QUERY = '''
 query($searchQuery: String!, $cursor: String) {
-  search(query: $searchQuery, type: ISSUE, first: 50, after: $cursor) {
+  %s
+  search(query: $searchQuery, type: ISSUE, first: %d, after: $cursor) {
     pageInfo {
       hasNextPage
       endCursor
@@ -34,10 +71,15 @@ query($searchQuery: String!, $cursor: String) {
           }
           state
           createdAt
+          updatedAt
           mergedAt
           closedAt
           merged
-          timelineItems(itemTypes: [PULL_REQUEST_REVIEW], first: 100) {
+          timelineItems(itemTypes: [PULL_REQUEST_REVIEW], first: %d) {
+            pageInfo {
+              hasNextPage
+              endCursor
+            }
             nodes {
               __typename
               ... on PullRequestReview {
@@ -48,7 +90,7 @@ query($searchQuery: String!, $cursor: String) {
                 submittedAt
               }
             }
-          }
+          }%s
         }
       }
     }
@@ -56,82 +98,523 @@ query($searchQuery: String!, $cursor: String) {
 }
 '''
 
+# Follow-up review pages for many PRs of one repository at once, one aliased
+# `repository` selection (pr0, pr1, ...) per PR sharing the ReviewPage fragment.
+REVIEW_PAGE_FRAGMENT = '''
+fragment ReviewPage on PullRequestTimelineItemsConnection {
+  pageInfo {
+    hasNextPage
+    endCursor
+  }
+  nodes {
+    __typename
+    ... on PullRequestReview {
+      author {
+        login
+      }
+      state
+      submittedAt
+    }
+  }
+}'''
+
+PR_REVIEWS_SELECTION = '''
+  pr%(i)d: repository(owner: $owner, name: $name) {
+    pullRequest(number: $number%(i)d) {
+      timelineItems(itemTypes: [PULL_REQUEST_REVIEW], first: %(per_page)d, after: $cursor%(i)d) { ...ReviewPage }
+    }
+  }'''
+
+# Cheap probe used to size shards: only the result count, no PR fields
+COUNT_QUERY = '''
+query($searchQuery: String!) {
+  search(query: $searchQuery, type: ISSUE, first: 1) {
+    issueCount
+  }
+}
+'''
+
+
+@lru_cache(maxsize=65536)
+def epoch_seconds(timestamp):
+    """Parses a GraphQL `YYYY-MM-DDTHH:MM:SSZ` timestamp to integer epoch seconds.
+
+    Memoized: the same createdAt/submittedAt strings recur across pages,
+    retries and the review timelines of related PRs.
+    """
+    # fromisoformat only accepts a trailing Z from Python 3.11 on
+    return int(datetime.fromisoformat(timestamp.replace("Z", "+00:00")).timestamp())
 
-def hours_between(d1, d2):
-    if not d1 or not d2:
+
+def hours_between(t1, t2):
+    """Interval between two epoch-second timestamps, or None if either is missing."""
+    if t1 is None or t2 is None:
         return None
-    return int((d2 - d1).total_seconds() / 60)
+    return int((t2 - t1) / 60)
 
 
-def fetch_all_prs():
-    prs = []
-    cursor = None
-    while True:
-        search_query_string = f"repo:{PUBLIC_REPO_OWNER}/{PUBLIC_REPO_NAME} is:pr is:public created:{DATE_RANGE}"
+def parse_date_range(date_range):
+    """Splits a `YYYY-MM-DD..YYYY-MM-DD` range into its bounds, or returns None."""
+    parts = (date_range or "").split("..")
+    if len(parts) != 2 or not all(len(p) == 10 for p in parts):
+        return None
+    return parts[0], parts[1]
+
 
+def incremental_search_windows(existing_rows, bounds):
+    """Search windows that cover only what changed since `existing_rows` were fetched.
+
+    Each window is [start_day, end_day, extra_qualifiers]. `existing_rows` is a
+    zero-argument callable returning a fresh row iterator, so the existing CSV
+    is streamed rather than loaded.
+    """
+    start, end = bounds
+    updated_since = high_water_mark(existing_rows(), "updated_date")
+    if not updated_since:
+        return [[start, end, ""]] # Nothing usable left in the window
+    windows = [[start, end, f"updated:>={updated_since}"]]
+    # The window slides forward each month; days past the newest known PR were
+    # never covered, so fetch them in full regardless of when they were updated.
+    newest_created_day = (high_water_mark(existing_rows(), "created_date") or start)[:10]
+    if newest_created_day < end:
+        windows.append([newest_created_day, end, ""])
+    return windows
+
+
+def search_query_string(owner, name, search_filter):
+    # Sorted, so every page lists PRs newest first instead of in "best match" order
+    return f"repo:{owner}/{name} is:pr is:public sort:created-desc {search_filter}"
+
+
+def shard_filter(start, end, extra=""):
+    """Search filter for PRs created within [start, end] (inclusive datetimes)."""
+    return f"created:{start:%Y-%m-%dT%H:%M:%SZ}..{end:%Y-%m-%dT%H:%M:%SZ} {extra}".strip()
+
+
+def response_data(response, action, partial_ok=False):
+    """The `data` of a GraphQL response; raises RuntimeError naming the GraphQL errors instead.
+
+    With `partial_ok`, errors alongside data (such as a PR that is no longer
+    accessible in a batch) are printed and the data is returned.
+    """
+    data = response.get('data')
+    messages = error_messages(response)
+    if data is None or (messages and not partial_ok):
+        raise RuntimeError(f"GraphQL error {action}: {messages or 'response has no data'}")
+    if messages:
+        print(f"GraphQL error {action}: {messages}", file=sys.stderr)
+    return data
+
+
+def count_search_results(search_query):
+    # Never cached: a stale count could leave a shard that has grown past SEARCH_RESULT_CAP unsplit
+    data = client.query(COUNT_QUERY, {"searchQuery": search_query}, use_cache=False)
+    return response_data(data, f"counting {search_query}")['search']['issueCount']
+
+
+def plan_shards(owner, name, start, end, extra="", counts=None):
+    """Splits the created-at window [start, end] until no shard exceeds SEARCH_RESULT_CAP results.
+
+    Returns the search query strings of the non-empty shards, oldest first.
+    Every probed query's result count is recorded in `counts`, if given.
+    """
+    search_query = search_query_string(owner, name, shard_filter(start, end, extra))
+    count = count_search_results(search_query)
+    if counts is not None:
+        counts[search_query] = count
+    if count == 0:
+        return []
+    if count <= SEARCH_RESULT_CAP:
+        return [search_query]
+    if (end - start).total_seconds() < 2 * MIN_SHARD_SEC:
+        print(f"Warning: {count} PRs match {search_query}; search only returns the first {SEARCH_RESULT_CAP}.")
+        return [search_query]
+    mid = start + (end - start) // 2
+    mid = mid.replace(microsecond=0)
+    return (plan_shards(owner, name, start, mid, extra, counts) +
+            plan_shards(owner, name, mid + timedelta(seconds=1), end, extra, counts))
+
+
+def plan_window_shards(owner, name, window, counts=None):
+    """Shards one [start_day, end_day, extra] window; both days are inclusive."""
+    start_day, end_day, extra = window
+    start = datetime.strptime(start_day, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    end = datetime.strptime(end_day, "%Y-%m-%d").replace(tzinfo=timezone.utc) + timedelta(days=1, seconds=-1)
+    return plan_shards(owner, name, start, end, extra, counts)
+
+
+def build_pr_query(page_size, with_commits=False):
+    return PR_QUERY % (RATE_LIMIT_FRAGMENT, page_size, REVIEWS_FIRST_PAGE, PR_COMMITS_FIELDS if with_commits else "")
+
+
+def iter_pr_pages(search_query, cursor=None, with_commits=False, resumed=False):
+    """Yields (edges, end_cursor, has_next_page) for each search results page.
+
+    Pages hold PRS_PER_PAGE results, fewer while the reported cost says a full
+    page would exceed MAX_QUERY_POINTS. With `with_commits`, each
+    node also carries its first page of commit authors. Pages after the first
+    are stored in the response cache, and read back only when `resumed`.
+    """
+    page_size = PRS_PER_PAGE
+    while True:
         # 3. 准备发送到API的变量
         variables = {
-            "searchQuery": search_query_string,
+            "searchQuery": search_query,
             "cursor": cursor  # or the actual cursor for pagination
         }
-        resp = requests.post(API_URL, json={"query": PR_QUERY, "variables": variables}, headers=HEADERS)
-        resp.raise_for_status()
-        data = resp.json()
-        pr_nodes = data['data']['search']['edges']
-        prs.extend(pr_nodes)
-        page = data['data']['search']['pageInfo']
+        # The first page is never cached: search results change as PRs are opened and updated.
+        # Retries 5xx and rate limits before raising
+        data = response_data(client.query(build_pr_query(page_size, with_commits), variables,
+                                          use_cache=cursor is not None, refresh=not resumed),
+                             f"fetching {search_query}")
+        cost = (data.get('rateLimit') or {}).get('cost')
+        page_size = cost_planner.proposed_page_size(page_size, cost, MAX_QUERY_POINTS, MIN_PRS_PER_PAGE, PRS_PER_PAGE)
+        page = data['search']['pageInfo']
+        yield data['search']['edges'], page['endCursor'], page['hasNextPage']
         if not page['hasNextPage']:
             break
         cursor = page['endCursor']
-    return prs
 
-def process_pr(pr):
-    created_at = parser.isoparse(pr['createdAt'])
-    merged_at = parser.isoparse(pr['mergedAt']) if pr['mergedAt'] else None
-    author = pr['author']['login'] if pr['author'] else None
-    # Find first review by non-author
+
+def build_pr_reviews_batch_query(batch_len):
+    """Builds one query that fetches a page of reviews for `batch_len` PRs via aliases."""
+    params = ["$owner: String!, $name: String!"]
+    selections = []
+    for i in range(batch_len):
+        params.append(f"$number{i}: Int!, $cursor{i}: String")
+        selections.append(PR_REVIEWS_SELECTION % {"i": i, "per_page": REVIEWS_PER_PAGE})
+    return "query(%s) {\n  %s%s\n}\n%s" % (", ".join(params), RATE_LIMIT_FRAGMENT, "".join(selections),
+                                           REVIEW_PAGE_FRAGMENT)
+
+
+def login(actor):
+    """Interned login of an author object; None for deleted accounts."""
+    return sys.intern(actor['login']) if actor else None
+
+
+def compact_reviews(nodes):
+    """Review records for a page of review timeline nodes."""
+    return [Review(login(node['author']), sys.intern(node['state']), node['submittedAt'])
+            for node in nodes if node['__typename'] == 'PullRequestReview']
+
+
+def compact_pr(node):
+    """Projects a search result node onto a PRRecord, interning its repeated strings."""
+    timeline = node['timelineItems']
+    page_info = timeline.get('pageInfo') or {}
+    return PRRecord(node['number'], node['createdAt'], node.get('updatedAt'), node['mergedAt'],
+                    sys.intern(node['state']), login(node['author']), compact_reviews(timeline['nodes']),
+                    page_info['endCursor'] if page_info.get('hasNextPage') else None)
+
+
+def needs_more_reviews(pr, cursor):
+    """True if the PR has unfetched reviews (`cursor` is set) that could still change its row.
+
+    With the warehouse enabled every review is stored, so any unfetched page counts.
+    """
+    if cursor is None:
+        return False
+    return warehouse is not None or None in first_review_times(pr)
+
+
+def fetch_remaining_reviews(prs, owner, name):
+    """Pages through the rest of the review timeline of PRs in `prs` that need it.
+
+    Fetched reviews are appended to each PRRecord's reviews in place. PRs are
+    batched into aliased queries; a PR is re-queued only while it still needs
+    more. Returns the number of requests made.
+    """
+    pending = [(pr, pr.reviews_cursor) for pr in prs if needs_more_reviews(pr, pr.reviews_cursor)]
+    batch_size = REVIEW_BATCH_SIZE
+    requests_made = 0
+    while pending:
+        batch, pending = pending[:batch_size], pending[batch_size:]
+        variables = {"owner": owner, "name": name}
+        for i, (pr, cursor) in enumerate(batch):
+            variables[f"number{i}"] = pr.number
+            variables[f"cursor{i}"] = cursor
+        # Uncached: reviews of an open PR keep arriving, and a cursor page is rarely requested twice
+        data = response_data(client.query(build_pr_reviews_batch_query(len(batch)), variables, use_cache=False),
+                             f"fetching reviews of {len(batch)} PRs", partial_ok=True)
+        requests_made += 1
+        cost = (data.get('rateLimit') or {}).get('cost')
+        batch_size = cost_planner.proposed_page_size(len(batch), cost, MAX_QUERY_POINTS, maximum=REVIEW_BATCH_SIZE)
+
+        for i, (pr, _) in enumerate(batch):
+            timeline = ((data.get(f"pr{i}") or {}).get('pullRequest') or {}).get('timelineItems')
+            if not timeline:
+                continue # PR no longer accessible; keep what the first page had
+            pr.reviews.extend(compact_reviews(timeline['nodes']))
+            cursor = timeline['pageInfo']['endCursor'] if timeline['pageInfo']['hasNextPage'] else None
+            if needs_more_reviews(pr, cursor):
+                pending.append((pr, cursor))
+    return requests_made
+
+
+def fetch_shard(search_query, owner, name, row_pool, registry=None, resumed=False):
+    """Fetches every page of one search shard and returns its processed rows.
+
+    PRs whose first review window was not enough are completed in batches
+    once the whole shard is listed, so follow-up queries pack PRs from all pages.
+    Rows are built by `row_pool`, a RowPool over process_pr_chunk. With a
+    PRRegistry, the pages also bring commit authors, which are recorded in it.
+    """
+    prs = []
+    for edges, _, _ in iter_pr_pages(search_query, with_commits=registry is not None, resumed=resumed):
+        for edge in edges:
+            if registry is not None:
+                registry.record_search_node(owner, name, edge['node'])
+            prs.append(compact_pr(edge['node']))
+    with telemetry.span('prs.reviews', prs=len(prs)) as span:
+        span['requests'] = fetch_remaining_reviews(prs, owner, name)
+    with telemetry.span('prs.process', rows=len(prs), process_workers=row_pool.workers):
+        rows = [row for chunk in row_pool.map(prs) for row in chunk]
+    if warehouse:
+        warehouse.upsert('prs', rows)
+        warehouse.upsert('reviews', (review for pr in prs for review in review_rows(pr, owner, name)))
+    print(f"  Fetched {len(rows)} PRs for {search_query}")
+    return rows
+
+def review_rows(pr, owner, name):
+    """One warehouse row per submitted review of the PR."""
+    for review in pr.reviews:
+        if review.submitted_at:
+            yield {
+                'pr_number': pr.number,
+                'reviewer': review.reviewer or 'ghost', # GitHub's name for deleted accounts
+                'state': review.state,
+                'submitted_at': review.submitted_at,
+                'repo_owner': owner,
+                'repo_name': name
+            }
+
+def first_review_times(pr):
+    """Epoch seconds of the PR's first review and first approval by someone other than its author.
+
+    Either is None when the fetched reviews have none.
+    """
     first_review_at = None
     first_approval_at = None
-    for node in pr['timelineItems']['nodes']:
-        if node['__typename'] == 'PullRequestReview':
-            reviewer = node['author']['login'] if node['author'] else None
-            if reviewer and reviewer != author:
-                if not first_review_at:
-                    first_review_at = parser.isoparse(node['submittedAt'])
-                if node['state'] == 'APPROVED' and not first_approval_at:
-                    first_approval_at = parser.isoparse(node['submittedAt'])
-        elif node['__typename'] == 'ReviewedEvent':
-            reviewer = node['actor']['login'] if node['actor'] else None
-            if reviewer and reviewer != author and not first_review_at:
-                first_review_at = parser.isoparse(node['createdAt'])
+    for review in pr.reviews:
+        if review.reviewer and review.reviewer != pr.author:
+            if first_review_at is None:
+                first_review_at = epoch_seconds(review.submitted_at)
+            if review.state == 'APPROVED' and first_approval_at is None:
+                first_approval_at = epoch_seconds(review.submitted_at)
         if first_review_at is not None and first_approval_at is not None:
             break
+    return first_review_at, first_approval_at
+
+def process_pr(pr):
+    created_at = epoch_seconds(pr.created_at)
+    merged_at = epoch_seconds(pr.merged_at) if pr.merged_at else None
+    # Find first review by non-author
+    first_review_at, first_approval_at = first_review_times(pr)
     # Calculate intervals
     t1 = hours_between(created_at, first_review_at)
     t2 = hours_between(first_review_at, first_approval_at)
     t3 = hours_between(first_approval_at, merged_at)
-    was_merged = 1 if pr['state'] == 'MERGED' else 0
+    was_merged = 1 if pr.state == 'MERGED' else 0
     return {
-        'pr_number': pr['number'],
-        'created_date': pr['createdAt'],
+        'pr_number': pr.number,
+        'created_date': pr.created_at,
         'time_to_first_review_sec': t1 if t1 is not None else '',
         'time_to_approval_sec': t2 if t2 is not None else '',
         'time_to_merge_sec': t3 if t3 is not None else '',
-        'was_merged': was_merged
+        'was_merged': was_merged,
+        'updated_date': pr.updated_at or ''
     }
 
-def main():
-    prs = fetch_all_prs()
+def process_pr_chunk(prs, repo):
+    """RowPool function: the CSV rows of a chunk of PRRecords from `repo` (owner, name)."""
+    owner, name = repo
     rows = []
     for pr in prs:
-        row = process_pr(pr['node'])
+        row = process_pr(pr)
+        row['repo_owner'] = owner
+        row['repo_name'] = name
         rows.append(row)
-    with open(OUTPUT_CSV, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=['pr_number', 'created_date', 'time_to_first_review_sec', 'time_to_approval_sec',
-                                               'time_to_merge_sec', 'was_merged'])
-        writer.writeheader()
-        writer.writerows(rows)
-    print(f"Wrote {len(rows)} PRs to {OUTPUT_CSV}")
+    return rows
+
+def updated_sketches(output_csv, fresh, superseded, rebuilt=None):
+    """The latency sketches of `output_csv` once its rows where superseded(row) are replaced by `fresh`.
+
+    Reads the old rows, so call it before the CSV is replaced and save the result after.
+    Without a sketch file (or with one of another accuracy) the existing rows are sketched first.
+    `rebuilt` is a (repo, first month, last month) whose sketches are recomputed from the
+    old rows that are not superseded rather than adjusted, dropping PRs no longer in the CSV.
+    """
+    path = sketch_path(output_csv)
+    existing = has_columns(output_csv, CSV_FIELDS)
+    sketches = SketchStore.load(path)
+    if sketches is None or sketches.relative_accuracy != fresh.relative_accuracy:
+        sketches = SketchStore(fresh.relative_accuracy)
+        if existing:
+            print(f"  Building {path} from the existing rows of {output_csv}...")
+            sketches.add_rows(iter_rows(output_csv))
+    if rebuilt:
+        sketches.drop_months(*rebuilt)
+    def in_rebuilt(row):
+        if not rebuilt:
+            return False
+        repo, first, last = rebuilt
+        return f"{row['repo_owner']}/{row['repo_name']}" == repo and first <= row['created_date'][:7] <= last
+    if existing:
+        for row in iter_rows(output_csv):
+            if in_rebuilt(row):
+                if not superseded(row):
+                    sketches.add_row(row)
+            elif superseded(row):
+                sketches.add_row(row, count=-1)
+    return sketches.merge(fresh)
+
+def fetch_prs(owner, name, date_range, output_csv=OUTPUT_CSV, incremental=INCREMENTAL, workers=FETCH_WORKERS,
+              registry=None):
+    """Fetches PRs created in `date_range` into `output_csv`.
+
+    With a PRRegistry, the commit authors of every PR found are recorded in it
+    for a later issue fetch. The latency sketches in `<output_csv>.sketches.json`
+    are updated from the rows as they are written. Returns the number of rows written. On failure the partial file and
+    checkpoint are kept so the next call resumes, and the error is re-raised.
+    """
+    bounds = parse_date_range(date_range)
+    incremental = incremental and has_columns(output_csv, CSV_FIELDS)
+    if incremental and not bounds:
+        print(f"Incremental mode needs DATE_RANGE as YYYY-MM-DD..YYYY-MM-DD; doing a full fetch.")
+        incremental = False
+
+    def existing_rows():
+        # PRs that have aged out of the window are dropped
+        return iter_rows(output_csv, lambda row: bounds[0] <= row['created_date'][:10] <= bounds[1])
+
+    if incremental:
+        windows = incremental_search_windows(existing_rows, bounds)
+    elif bounds:
+        windows = [[bounds[0], bounds[1], ""]]
+    else:
+        windows = None # Free-form DATE_RANGE: searched as-is, without sharding
+
+    # Rows stream to prs.csv.partial shard by shard; the checkpoint remembers the shard plan and progress
+    checkpoint = Checkpoint(output_csv, {"repo": f"{owner}/{name}", "windows": windows or date_range})
+    saved = checkpoint.load()
+    fresh = SketchStore() # Sketches of the rows written by this run, including those of a resumed partial file
+    writer = StreamingCSVWriter(output_csv, CSV_FIELDS, key='pr_number', resume_offset=saved and saved['offset'],
+                                on_write=fresh.add_row)
+    resumed = bool(saved and writer.resumed)
+    if resumed:
+        shards, done = saved['shards'], saved['done']
+        print(f"Resuming interrupted run after {writer.rows_written} PRs ({done}/{len(shards)} shards done).")
+    else:
+        with telemetry.span('prs.plan', repo=f"{owner}/{name}") as span:
+            if windows is None:
+                shards = [search_query_string(owner, name, f"created:{date_range}")]
+            else:
+                # Newest shard first, so a full fetch writes prs.csv newest first, like the other CSVs
+                shards = [s for w in windows for s in reversed(plan_window_shards(owner, name, w))]
+            span['shards'] = len(shards)
+        done = 0
+        print(f"Split the search into {len(shards)} shards of at most {SEARCH_RESULT_CAP} PRs each.")
+
+    # Shards are fetched concurrently but written in plan order, so output is deterministic;
+    # PRs matched by more than one shard are written once (the writer de-duplicates on pr_number).
+    # With PROCESS_WORKERS set, every shard's rows are built on one shared process pool
+    executor = ThreadPoolExecutor(max_workers=workers)
+    row_pool = RowPool(process_pr_chunk, (owner, name))
+    try:
+        pending = shards[done:]
+        with telemetry.span('prs.fetch', repo=f"{owner}/{name}", shards=len(pending), workers=workers) as span:
+            shard_rows = executor.map(fetch_shard, pending, repeat(owner), repeat(name), repeat(row_pool),
+                                      repeat(registry), repeat(resumed))
+            for index, rows in enumerate(shard_rows, start=done):
+                writer.write_rows(rows)
+                checkpoint.save(shards=shards, done=index + 1, offset=writer.tell())
+            span['rows'] = writer.rows_written
+    except Exception:
+        executor.shutdown(wait=False, cancel_futures=True)
+        row_pool.close()
+        writer.close()
+        print(f"Fetch interrupted after {writer.rows_written} PRs. Re-run to resume; {output_csv} was left unchanged.")
+        raise
+    executor.shutdown()
+    row_pool.close()
+
+    if incremental:
+        print(f"Merging {writer.rows_written} fetched PRs with the existing rows in {output_csv}...")
+    def superseded(row):
+        # Old rows of this repo that the run replaces: the whole window in a full fetch, else the re-fetched PRs.
+        # A full fetch re-sketches the window's months; older months stay after their rows leave the CSV.
+        if (row['repo_owner'], row['repo_name']) != (owner, name):
+            return False
+        if bounds and not incremental:
+            return bounds[0] <= row['created_date'][:10] <= bounds[1]
+        return row['pr_number'] in writer.keys_written
+
+    with telemetry.span('prs.finalize', repo=f"{owner}/{name}") as span:
+        rebuilt = (f"{owner}/{name}", bounds[0][:7], bounds[1][:7]) if bounds and not incremental else None
+        sketches = updated_sketches(output_csv, fresh, superseded, rebuilt)
+        total = writer.finalize(existing_rows() if incremental else ())
+        sketches.save(sketch_path(output_csv))
+        span['rows'] = total
+    checkpoint.clear()
+    print(f"Wrote {total} PRs to {output_csv}")
+    export_columnar(output_csv, "prs")
+    return total
+
+# --- Dry-Run Planning ---
+SHARD_CREATED = re.compile(r"created:(\S+)\.\.(\S+)")
+
+def plan_prs(owner, name, date_range, with_commits=False):
+    """Estimates what fetch_prs would cost, without fetching (see cost_planner.py).
+
+    Makes the same count probes as a real run's shard plan. With
+    `with_commits`, search pages are priced as fetch_all.py sends them.
+    """
+    bounds = parse_date_range(date_range)
+    counts = {}
+    try:
+        if bounds:
+            shards = plan_window_shards(owner, name, [bounds[0], bounds[1], ""], counts)
+        else:
+            shards = [search_query_string(owner, name, f"created:{date_range}")]
+            counts[shards[0]] = count_search_results(shards[0])
+    except (RuntimeError, requests.exceptions.RequestException) as e:
+        # A bad token or search fails every probe; report the count as unknown rather than abort the dry run
+        return cost_planner.new_plan("prs", f"{owner}/{name}", None, len(counts), len(counts),
+                                     workers=FETCH_WORKERS, notes=[f"Count probe failed, so the PRs are not priced: {e}"])
+
+    # Price a full page, then the page iter_pr_pages settles on if that is over MAX_QUERY_POINTS
+    variables = {"searchQuery": shards[0] if shards else search_query_string(owner, name, ""), "cursor": None}
+    page_cost = cost_planner.dry_run_cost(client, build_pr_query(PRS_PER_PAGE, with_commits), variables)
+    page_size = cost_planner.proposed_page_size(PRS_PER_PAGE, page_cost, MAX_QUERY_POINTS, MIN_PRS_PER_PAGE)
+    if page_size != PRS_PER_PAGE:
+        page_cost = cost_planner.dry_run_cost(client, build_pr_query(page_size, with_commits), variables)
+
+    windows = [] # [created from, created to, points] per shard, for splitting over several runs
+    page_requests = 0
+    for shard in shards:
+        page_count = cost_planner.pages(counts[shard], page_size)
+        page_requests += page_count
+        created = SHARD_CREATED.search(shard)
+        if created:
+            windows.append([created.group(1), created.group(2), page_count * page_cost])
+    # A real run repeats the count probes to plan its shards, at a point each
+    return cost_planner.new_plan(
+        "prs", f"{owner}/{name}", sum(counts[shard] for shard in shards), len(counts) + page_requests,
+        len(counts) + page_requests * page_cost, workers=FETCH_WORKERS, page_size=page_size, page_cost=page_cost,
+        shards=len(shards), windows=windows,
+        notes=[f"{len(shards)} search shards, pages of {page_size} PRs at {page_cost} points each"])
+
+def main():
+    if not GITHUB_TOKEN:
+        print("GITHUB_TOKEN environment variable is required.")
+        exit(1)
+    if cost_planner.PLAN_ONLY:
+        cost_planner.report([plan_prs(PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME, DATE_RANGE)], client)
+        return
+    try:
+        fetch_prs(PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME, DATE_RANGE)
+    finally:
+        print_run_summary(client)
 
 if __name__ == '__main__':
     main()
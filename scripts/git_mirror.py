@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Commit statistics from a local git clone instead of the GraphQL history API.
+
+With COMMITS_BACKEND=git, fetch_commits.py reads the default branch from a
+bare clone kept under GIT_MIRROR_DIR. The clone is shallow, going back to
+SINCE_DATE plus one parent. Each run fetches into the clone and then computes
+every commits.csv column in one streaming `git log --numstat` pass. The pass
+costs no API points.
+
+    GIT_MIRROR_DIR=.cache/git          where clones are kept (<owner>__<name>.git)
+    GIT_MIRROR_PATH=/srv/mirrors/x.git use this existing clone as-is; nothing is fetched
+    GIT_REMOTE_URL=file:///tmp/repo    clone from here instead of https://github.com/<owner>/<name>.git
+    GIT_AUTHOR_LOGINS=logins.json      optional {"email": "login"} map for authors
+
+GIT_MIRROR_PATH may also be an ordinary working copy. Together with a
+file:// GIT_REMOTE_URL, that lets the backend run fully offline against a
+local repository.
+
+git does not know GitHub logins. An author's login is taken from GitHub
+noreply addresses (`12345+login@users.noreply.github.com`) or from
+GIT_AUTHOR_LOGINS. Otherwise get_author_name falls back to the name, then
+the email, as it does for commits whose author has no GitHub account.
+"""
+import base64
+import json
+import os
+import re
+import subprocess
+import sys
+
+# --- Configuration ---
+GIT_MIRROR_DIR = os.environ.get("GIT_MIRROR_DIR", os.path.join(".cache", "git"))
+GIT_MIRROR_PATH = os.environ.get("GIT_MIRROR_PATH", "")
+GIT_REMOTE_URL = os.environ.get("GIT_REMOTE_URL", "")
+GIT_AUTHOR_LOGINS = os.environ.get("GIT_AUTHOR_LOGINS", "")
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+
+NOREPLY_EMAIL = re.compile(r"^(?:\d+\+)?([A-Za-z0-9-]+)@users\.noreply\.github\.com$")
+# One record per commit: \x1e starts it, \x1f separates the header fields, numstat lines follow
+LOG_FORMAT = "%x1e%H%x1f%cd%x1f%an%x1f%ae%x1f%s"
+
+
+def _git(args, cwd=None):
+    """Runs git and returns its stdout; raises CalledProcessError with git's message on failure."""
+    result = subprocess.run(["git"] + args, cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, ["git"] + args, result.stdout, result.stderr.strip())
+    return result.stdout
+
+
+def _auth_args(url):
+    """Passes GITHUB_TOKEN as an HTTP header for github.com URLs, without writing it to the clone's config."""
+    if not GITHUB_TOKEN or not url.startswith("https://github.com/"):
+        return []
+    credentials = base64.b64encode(f"x-access-token:{GITHUB_TOKEN}".encode()).decode()
+    return ["-c", f"http.https://github.com/.extraheader=AUTHORIZATION: basic {credentials}"]
+
+
+def ensure_mirror(owner, repo, since_iso):
+    """Returns the path of an up-to-date clone of owner/repo's default branch.
+
+    Clones on first use and fetches afterwards. In both cases the history is
+    shallow, reaching back to the window plus one parent.
+    """
+    if GIT_MIRROR_PATH:
+        print(f"Using existing clone at {GIT_MIRROR_PATH} (not fetched).")
+        return GIT_MIRROR_PATH
+    url = GIT_REMOTE_URL or f"https://github.com/{owner}/{repo}.git"
+    path = os.path.join(GIT_MIRROR_DIR, f"{owner}__{repo}.git")
+    shallow = [f"--shallow-since={since_iso}"]
+    if not os.path.isdir(path):
+        print(f"Cloning {url} into {path}...")
+        os.makedirs(GIT_MIRROR_DIR, exist_ok=True)
+        _git(_auth_args(url) + ["clone", "--bare", "--single-branch", "--no-tags"] + shallow + [url, path])
+    else:
+        branch = _git(["symbolic-ref", "HEAD"], cwd=path).strip()
+        print(f"Fetching {branch} from {url} into {path}...")
+        _git(_auth_args(url) + ["fetch", "--no-tags", "--force"] + shallow + [url, f"{branch}:{branch}"], cwd=path)
+    # One more parent, so the oldest commits in the window diff against it rather than an empty tree
+    _git(_auth_args(url) + ["fetch", "--no-tags", "--deepen=1", url], cwd=path)
+    return path
+
+
+def load_author_logins(path=GIT_AUTHOR_LOGINS):
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {email.lower(): login for email, login in json.load(f).items()}
+
+
+def author_login(email, logins):
+    """GitHub login for a commit email, or None when it cannot be mapped."""
+    email = (email or "").lower()
+    if email in logins:
+        return logins[email]
+    match = NOREPLY_EMAIL.match(email)
+    return match.group(1) if match else None
+
+
+def commit_node(header, numstat_lines, logins):
+    """Builds the GraphQL-shaped history node of one record from iter_log_records."""
+    sha, committed, name, email, subject = header.split("\x1f", 4)
+    additions = deletions = files = 0
+    for line in numstat_lines:
+        added, deleted, _ = line.split("\t", 2)
+        files += 1
+        if added != "-": # Binary files report "-"
+            additions += int(added)
+            deletions += int(deleted)
+    login = author_login(email, logins)
+    return {
+        "oid": sha,
+        "messageHeadline": subject,
+        "committedDate": committed,
+        "changedFilesIfAvailable": files,
+        "additions": additions,
+        "deletions": deletions,
+        "author": {"name": name, "email": email, "user": {"login": login} if login else None},
+    }
+
+
+def iter_log_records(path, since_iso, ref="HEAD"):
+    """Yields the raw `git log` record of each commit on `ref` since `since_iso`, newest first.
+
+    A record is (header, numstat lines), both as text; commit_node parses it.
+    Merge commits are diffed against their first parent and renames count as
+    one changed file, as the API counts them.
+    """
+    args = ["git", "log", ref, f"--since={since_iso}", f"--format={LOG_FORMAT}",
+            "--date=format-local:%Y-%m-%dT%H:%M:%SZ", "--numstat", "--diff-merges=first-parent", "--find-renames"]
+    env = dict(os.environ, TZ="UTC")
+    with subprocess.Popen(args, cwd=path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+                          text=True, encoding="utf-8", errors="replace") as process:
+        header, numstat_lines = None, []
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            if line.startswith("\x1e"):
+                if header is not None:
+                    yield header, numstat_lines
+                header, numstat_lines = line[1:], []
+            elif line:
+                numstat_lines.append(line)
+        if header is not None:
+            yield header, numstat_lines
+        stderr = process.stderr.read()
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args, None, stderr.strip())
+
+
+def iter_history(path, since_iso, ref="HEAD"):
+    """Yields the commits on `ref` since `since_iso`, newest first, shaped like GraphQL history nodes."""
+    logins = load_author_logins()
+    for header, numstat_lines in iter_log_records(path, since_iso, ref):
+        yield commit_node(header, numstat_lines, logins)
+
+
+# --- Main Execution ---
+def main():
+    """Prints the commits of a local repository as JSON lines: git_mirror.py <path> <since>."""
+    if len(sys.argv) != 3:
+        print("Usage: git_mirror.py <repository path> <since, e.g. 2025-01-01T00:00:00Z>", file=sys.stderr)
+        sys.exit(1)
+    for node in iter_history(sys.argv[1], sys.argv[2]):
+        print(json.dumps(node))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Shared GitHub GraphQL client for the fetch scripts.
+
+Keeps one pooled keep-alive session per run, tracks the rate-limit budget
+reported by GitHub and retries transient failures (5xx, secondary/abuse
+limits, exhausted primary budget, dropped connections and truncated or
+non-JSON 200 bodies) with jittered exponential backoff.
+
+The response cache is opt-in per query, because most of what the fetchers
+ask for can change at any time (see response_cache.py for what is cached).
+"""
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from response_cache import open_default_cache
+from telemetry import telemetry
+
+# --- Configuration ---
+# Override to target GitHub Enterprise Server or a local stand-in (see benchmarks/fake_github.py)
+API_URL = os.environ.get("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+MAX_RETRIES = int(os.environ.get("GITHUB_MAX_RETRIES", "6"))
+REQUEST_TIMEOUT_SEC = 60
+BACKOFF_BASE_SEC = 2
+BACKOFF_MAX_SEC = 120
+SECONDARY_LIMIT_WAIT_SEC = 60 # GitHub asks for at least a minute when no Retry-After is sent
+RATE_LIMIT_RESERVE = 50 # Pause until reset once fewer points than this remain
+RETRY_STATUS_CODES = {500, 502, 503, 504}
+
+# Selection to paste into queries so the response reports its own cost.
+RATE_LIMIT_FRAGMENT = "rateLimit { cost remaining resetAt }"
+
+
+class GraphQLClient:
+    """Thread-safe GraphQL client with connection pooling and rate-limit awareness."""
+
+    def __init__(self, token, api_url=API_URL, max_retries=MAX_RETRIES, pool_size=10, cache=None, open_cache=None):
+        self.api_url = api_url
+        self.max_retries = max_retries
+        self._cache = cache # Optional response_cache.ResponseCache
+        self._open_cache = open_cache # Called for the cache on first use instead, if given
+        self._open_cache_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"bearer {token}"})
+
+        self._lock = threading.Lock()
+        self.remaining = None # Points left in the current window
+        self.reset_at = None # Epoch seconds when the window resets
+        self.points_used = 0 # Sum of rateLimit.cost for this run
+        self.request_count = 0
+        self.retry_count = 0
+        self._cache_bypass_depth = 0 # bypass_cache() blocks in progress
+
+    # --- Public API ---
+    @property
+    def cache(self):
+        """The response cache, or None. One given as `open_cache` is opened here on first use."""
+        if self._open_cache is not None:
+            with self._open_cache_lock:
+                if self._open_cache is not None:
+                    self._cache, self._open_cache = self._open_cache(), None
+        return self._cache
+
+    @cache.setter
+    def cache(self, cache):
+        self._cache, self._open_cache = cache, None
+
+    def query(self, query, variables=None, use_cache=False, refresh=False):
+        """Runs a GraphQL query and returns the decoded JSON body.
+
+        Transient failures are retried; once retries are exhausted the last
+        requests exception is raised. GraphQL-level errors that are not rate
+        limits are returned to the caller unchanged. With `use_cache` (and a
+        configured cache) a cached response is returned if there is one, and
+        error-free responses are stored. With `refresh` as well the query is
+        always sent, and its response only stored, e.g. for a later resume.
+        """
+        span_name = "graphql." + _operation_name(query)
+        use_cache = use_cache and not self._cache_bypass_depth
+        if self.cache is not None and use_cache and not refresh:
+            lookup_start = time.time()
+            cached = self.cache.get_query(query, variables)
+            if cached is not None:
+                telemetry.record(span_name, lookup_start, time.time() - lookup_start, cache="hit")
+                return cached
+
+        payload = {"query": query, "variables": variables or {}}
+        attempt = 0
+        while True:
+            self._wait_for_budget()
+            request_start = time.time()
+            try:
+                with self._lock:
+                    self.request_count += 1
+                response = self.session.post(self.api_url, json=payload, timeout=REQUEST_TIMEOUT_SEC)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                telemetry.record(span_name, request_start, time.time() - request_start,
+                                 attempt=attempt, retries=1 if attempt else 0, error=type(e).__name__)
+                attempt = self._retry_or_raise(attempt, f"network error: {e}", e)
+                continue
+
+            self._update_from_headers(response.headers)
+            try:
+                data = response.json() if response.status_code == 200 else None
+            except ValueError as e: # Truncated body, or an HTML page from a proxy in front of the API
+                telemetry.record(span_name, request_start, time.time() - request_start, status=response.status_code,
+                                 attempt=attempt, retries=1 if attempt else 0, error="InvalidJSON")
+                error = requests.exceptions.InvalidJSONError(f"Invalid JSON in 200 response: {e}", response=response)
+                attempt = self._retry_or_raise(attempt, "invalid JSON in 200 response", error)
+                continue
+            rate = ((data or {}).get("data") or {}).get("rateLimit") or {}
+            telemetry.record(span_name, request_start, time.time() - request_start,
+                             status=response.status_code, bytes=len(response.content), attempt=attempt,
+                             retries=1 if attempt else 0, cost=rate.get("cost"), remaining=rate.get("remaining"))
+
+            if response.status_code in RETRY_STATUS_CODES:
+                error = requests.exceptions.HTTPError(f"{response.status_code} Server Error", response=response)
+                attempt = self._retry_or_raise(attempt, f"HTTP {response.status_code}", error)
+                continue
+
+            if response.status_code in (403, 429):
+                wait = self._rate_limit_wait(response)
+                if wait is not None:
+                    error = requests.exceptions.HTTPError(f"{response.status_code} Rate Limited", response=response)
+                    attempt = self._retry_or_raise(attempt, f"rate limited (HTTP {response.status_code})", error, wait)
+                    continue
+
+            response.raise_for_status()
+            if data is None:
+                data = response.json()
+            self._update_from_body(data)
+
+            if _is_rate_limited_error(data):
+                wait = max(self._seconds_until_reset(), BACKOFF_BASE_SEC)
+                error = requests.exceptions.HTTPError("GraphQL RATE_LIMITED", response=response)
+                attempt = self._retry_or_raise(attempt, "GraphQL RATE_LIMITED", error, wait)
+                continue
+
+            if self.cache is not None and use_cache and not data.get("errors"):
+                self.cache.set_query(query, variables, data)
+            return data
+
+    @contextmanager
+    def bypass_cache(self):
+        """Within the block no query() reads or writes the response cache, whatever its caller asks.
+
+        Applies to every thread, so fetchers that run worker pools are covered.
+        Entries a caller reads from `cache` directly (immutable PR author sets) are unaffected.
+        """
+        with self._lock:
+            self._cache_bypass_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._cache_bypass_depth -= 1
+
+    def summary(self):
+        """One-line summary of API usage for the end of a run."""
+        remaining = self.remaining if self.remaining is not None else "unknown"
+        return (f"GitHub API: {self.request_count} requests, {self.retry_count} retries, "
+                f"{self.points_used} points used, {remaining} points remaining")
+
+    # --- Rate limit bookkeeping ---
+    def _update_from_headers(self, headers):
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        with self._lock:
+            if remaining is not None and remaining.isdigit():
+                self.remaining = int(remaining)
+            if reset is not None and reset.isdigit():
+                self.reset_at = int(reset)
+
+    def _update_from_body(self, data):
+        rate = (data.get("data") or {}).get("rateLimit") if isinstance(data, dict) else None
+        if not rate:
+            return
+        with self._lock:
+            self.points_used += rate.get("cost") or 0
+            if rate.get("remaining") is not None:
+                self.remaining = rate["remaining"]
+            if rate.get("resetAt"):
+                reset = datetime.fromisoformat(rate["resetAt"].replace("Z", "+00:00"))
+                self.reset_at = int(reset.timestamp())
+
+    def _seconds_until_reset(self):
+        with self._lock:
+            reset_at = self.reset_at
+        if reset_at is None:
+            return 0
+        return max(0, reset_at - time.time()) + 1
+
+    def _wait_for_budget(self):
+        """Sleeps until the window resets when the remaining budget is nearly spent."""
+        with self._lock:
+            low = self.remaining is not None and self.remaining < RATE_LIMIT_RESERVE
+        if not low:
+            return
+        wait = self._seconds_until_reset()
+        if wait > 0:
+            reset = datetime.fromtimestamp(self.reset_at, tz=timezone.utc).strftime("%H:%M:%S")
+            print(f"  Rate limit budget low ({self.remaining} points left). Sleeping {wait:.0f}s until {reset} UTC...", file=sys.stderr)
+            time.sleep(wait)
+        with self._lock:
+            self.remaining = None # Unknown until the next response reports it
+
+    def _rate_limit_wait(self, response):
+        """Returns seconds to wait for a rate-limited 403/429, or None if it is a real 403."""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return int(retry_after)
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            return self._seconds_until_reset()
+        text = response.text.lower()
+        if "secondary rate limit" in text or "abuse" in text or response.status_code == 429:
+            return SECONDARY_LIMIT_WAIT_SEC
+        if "rate limit" in text:
+            return max(self._seconds_until_reset(), SECONDARY_LIMIT_WAIT_SEC)
+        return None
+
+    # --- Retry helpers ---
+    def _retry_or_raise(self, attempt, reason, error, wait=None):
+        if attempt >= self.max_retries:
+            print(f"  Giving up after {attempt + 1} attempts: {reason}", file=sys.stderr)
+            raise error
+        if wait is None:
+            wait = min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * (2 ** attempt))
+        wait += random.uniform(0, wait * 0.25 + 1) # Jitter so parallel workers don't retry in lockstep
+        with self._lock:
+            self.retry_count += 1
+        print(f"  {reason}; retrying in {wait:.1f}s (attempt {attempt + 1}/{self.max_retries})...", file=sys.stderr)
+        time.sleep(wait)
+        return attempt + 1
+
+
+def _operation_name(query):
+    """Short label for a query, used to group telemetry spans."""
+    for field in ("search", "history", "issues", "issue", "pullRequest", "defaultBranchRef"):
+        if field + "(" in query or field + " {" in query:
+            return field
+    return "query"
+
+
+def _is_rate_limited_error(data):
+    errors = data.get("errors") if isinstance(data, dict) else None
+    if not errors:
+        return False
+    return any(isinstance(err, dict) and err.get("type") == "RATE_LIMITED" for err in errors)
+
+
+def error_messages(data):
+    """The messages of the GraphQL errors in response `data`, joined by "; " ("" when there are none)."""
+    errors = data.get("errors") if isinstance(data, dict) else None
+    return "; ".join(err.get("message", str(err)) if isinstance(err, dict) else str(err) for err in errors or ())
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+def shared_client():
+    """Returns the process-wide client, creating it from GITHUB_TOKEN on first use.
+
+    Every fetcher running in one process (a single script or a batch run) goes
+    through this client, so they share one connection pool, one response cache
+    and one view of the rate-limit budget. The cache is only opened once a
+    query uses it: the scripts create the client on import, and row worker
+    processes (process_pool.py) import them without querying.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = GraphQLClient(os.environ.get("GITHUB_TOKEN"), open_cache=open_default_cache)
+        return _shared_client
+
+
+def print_run_summary(client):
+    """Prints API usage, cache statistics and telemetry, and closes the cache."""
+    print(client.summary())
+    if client.cache:
+        print(client.cache.summary())
+        client.cache.close()
+        client.cache = None
+    telemetry.report()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""In-memory registry of PR commit authors, shared by the stages of one run.
+
+fetch_prs.py and fetch_issues.py both look at the same PRs: the first for
+their review timelines, the second for the authors of their commits. When
+they run in one process (fetch_all.py), the PR search pages also select each
+PR's first COMMITS_FIRST_PAGE commits, next to its first reviews. Each
+PR is then recorded here. Stage 2 of the issue fetch takes the authors of
+linked PRs from the registry. It only queries PRs the search did not cover,
+and only the remaining commit pages of PRs with more commits than the first page.
+
+PRs are keyed by (owner, name, number), with owner and name lowercased.
+Search results are keyed by the configured repository, while issue timelines
+report `nameWithOwner` as GitHub spells it.
+"""
+import sys
+import threading
+from collections import namedtuple
+
+# --- Configuration ---
+# Commits selected with each PR on a search page. A larger page costs no more points: GitHub
+# prices a nested connection by its parents' page sizes, not its own.
+COMMITS_FIRST_PAGE = 100
+
+# Commit authors of one PR. `cursor` is where its next commits page starts, None once all are known.
+PRCommits = namedtuple('PRCommits', ['authors', 'cursor'])
+
+# Selected inside `... on PullRequest` when a registry is collecting commit authors
+PR_COMMITS_FIELDS = '''
+          commits(first: %d) {
+            pageInfo {
+              hasNextPage
+              endCursor
+            }
+            nodes {
+              commit {
+                author {
+                  user { login }
+                  name
+                }
+              }
+            }
+          }''' % COMMITS_FIRST_PAGE
+
+
+def commit_authors(commit_nodes):
+    """Interned author names of a page of PR commit nodes: the GitHub login, else the git name."""
+    authors = set()
+    for node in commit_nodes:
+        author = ((node or {}).get("commit") or {}).get("author")
+        if not author:
+            continue
+        user = author.get("user")
+        name = user.get("login") if user and user.get("login") else author.get("name")
+        if name:
+            authors.add(sys.intern(name))
+    return authors
+
+
+class PRRegistry:
+    """Thread-safe map of (owner, name, number) -> PRCommits, filled from PR search pages."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prs = {}
+        self.hits = 0 # Lookups answered completely, without a commits query
+
+    @staticmethod
+    def key(owner, name, number):
+        return (owner.lower(), name.lower(), number)
+
+    def record_search_node(self, owner, name, node):
+        """Records the commit authors a search result node of owner/name carries, if it selected any."""
+        commits = node.get('commits')
+        if commits is None:
+            return
+        page_info = commits.get('pageInfo') or {}
+        entry = PRCommits(frozenset(commit_authors(commits['nodes'])),
+                          page_info['endCursor'] if page_info.get('hasNextPage') else None)
+        with self._lock:
+            self._prs[self.key(owner, name, node['number'])] = entry
+
+    def lookup(self, pr_key):
+        """The PRCommits recorded for an (owner, name, number) key, or None."""
+        with self._lock:
+            entry = self._prs.get(self.key(*pr_key))
+            if entry is not None and entry.cursor is None:
+                self.hits += 1
+            return entry
+
+    def __len__(self):
+        with self._lock:
+            return len(self._prs)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Opt-in process pool for turning fetched records into CSV rows.
+
+By default rows are built in the fetching process, one record after another.
+For large backfills the work can be spread over several processes:
+
+    PROCESS_WORKERS=4          worker processes (0 or 1: build rows in-process, the default)
+    PROCESS_CHUNK_SIZE=1000    records handed to a worker at a time
+
+Records are sent to the workers in chunks. Callers send what is cheapest to
+pickle: raw text where the input is text anyway (spooled JSON lines, `git log`
+records), otherwise the parsed nodes. Their compact projections were measured
+slower to build and pickle than the nodes themselves. Whatever a row function
+needs besides the records, like the repository or a lookup map, is pickled and
+passed to each worker once when it starts.
+
+Chunks come back in input order, so the output is identical to an
+in-process run.
+"""
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# --- Configuration ---
+PROCESS_WORKERS = max(0, int(os.environ.get("PROCESS_WORKERS", "0")))
+PROCESS_CHUNK_SIZE = max(1, int(os.environ.get("PROCESS_CHUNK_SIZE", "1000")))
+CHUNKS_IN_FLIGHT_PER_WORKER = 2 # Bounds memory when records are streamed in
+
+# Row function and its context inside a worker process, set once by _start_worker
+_worker_func = None
+_worker_context = None
+
+
+def _start_worker(func, context):
+    global _worker_func, _worker_context
+    _worker_func, _worker_context = func, context
+
+
+def _run_chunk(chunk):
+    return _worker_func(chunk, _worker_context)
+
+
+def chunked(records, size):
+    """Yields lists of up to `size` consecutive records."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class RowPool:
+    """Maps chunks of records through `func(chunk, context)` -> list of rows, in order.
+
+    `func` must be a module-level function. With workers <= 1 it runs in the
+    calling thread. Otherwise a pool of that many processes is started
+    and kept until close(). map() may be called from several threads at once.
+    """
+
+    def __init__(self, func, context=None, workers=PROCESS_WORKERS, chunk_size=PROCESS_CHUNK_SIZE):
+        self.func = func
+        self.context = context
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._executor = None
+        if workers > 1:
+            # Not fork: by the time rows are built the fetching threads and the HTTP pool exist, and a
+            # forked child can inherit a lock held by one of them. The forkserver is a fresh
+            # single-threaded process that imports the calling script once; workers fork from it. The
+            # scripts open the response cache, warehouse and telemetry file on first use, so none are open there.
+            start = multiprocessing.get_context("forkserver") \
+                if "forkserver" in multiprocessing.get_all_start_methods() else None
+            self._executor = ProcessPoolExecutor(workers, mp_context=start, initializer=_start_worker,
+                                                 initargs=(func, context))
+
+    def map(self, records):
+        """Yields the list of rows for each chunk of `records`, in input order."""
+        if self._executor is None:
+            for chunk in chunked(records, self.chunk_size):
+                yield self.func(chunk, self.context)
+            return
+        pending = deque()
+        for chunk in chunked(records, self.chunk_size):
+            pending.append(self._executor.submit(_run_chunk, chunk))
+            if len(pending) >= self.workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""Mergeable streaming quantile sketches of the PR review-latency columns.
+
+fetch_prs.py keeps one sketch per repo, creation month and latency column
+(time_to_first_review_sec, time_to_approval_sec, time_to_merge_sec) in
+`prs.csv.sketches.json`. Each sketch is updated as PR rows are written. The
+dashboard and this script read percentiles from the file without the raw PRs.
+
+The sketches follow DDSketch: a value goes into the bucket
+ceil(log_gamma(|value|)), with gamma = (1 + a) / (1 - a). Every quantile is then
+within a relative error `a` (SKETCH_ACCURACY, 1% by default) of a value in
+the data. Two sketches merge by adding bucket counts, so months, repos and
+runs combine exactly. A value can be removed the same way, which is how a
+re-fetched PR replaces its old row. Memory is bounded: a sketch holds at most
+MAX_BINS buckets. Past that, the smallest buckets are folded together, which
+only coarsens the low quantiles. At 1%, 1 minute to 10 years is about 800 buckets.
+
+Months that age out of the CSV window stay in the file, so it keeps the history.
+A full fetch re-sketches the months of its window, so PRs that had aged out
+are not counted twice when a later window covers them again.
+
+Usage: python scripts/quantile_sketch.py prs.csv.sketches.json [more.sketches.json ...]
+       (prints p50/p90/p99 per month, merged over every repo and file)
+"""
+import json
+import math
+import os
+import sys
+from collections import defaultdict
+
+# --- Configuration ---
+RELATIVE_ACCURACY = float(os.environ.get("SKETCH_ACCURACY", "0.01"))
+MAX_BINS = 2048 # Buckets kept per sign; the lowest are folded together past this
+SKETCH_SUFFIX = ".sketches.json" # Next to the CSV: prs.csv.sketches.json
+LATENCY_COLUMNS = ["time_to_first_review_sec", "time_to_approval_sec", "time_to_merge_sec"]
+QUANTILES = (0.5, 0.9, 0.99)
+# Report per repo as well as per month
+REPORT_BY_REPO = os.environ.get("SKETCH_BY_REPO", "").lower() in ("1", "true", "yes")
+
+
+class _Buckets:
+    """Counts per bucket index of one sign. Indices below `floor` have been folded into it."""
+
+    def __init__(self, max_bins):
+        self.max_bins = max_bins
+        self.counts = {}
+        self.floor = None
+
+    def add(self, index, count):
+        if self.floor is not None and index < self.floor:
+            index = self.floor
+        total = self.counts.get(index, 0) + count
+        if total > 0:
+            self.counts[index] = total
+        else:
+            self.counts.pop(index, None) # Removing what was never added clamps at zero
+        if len(self.counts) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        indices = sorted(self.counts)
+        self.floor = indices[-self.max_bins]
+        folded = sum(self.counts.pop(index) for index in indices[:-self.max_bins])
+        self.counts[self.floor] += folded
+
+    def to_json(self):
+        """[offset, [counts...]]: dense counts from the lowest index, plus the floor if set."""
+        if not self.counts:
+            return None
+        low = min(self.counts)
+        dense = [self.counts.get(index, 0) for index in range(low, max(self.counts) + 1)]
+        return [low, dense] if self.floor is None else [low, dense, self.floor]
+
+    def load(self, data):
+        if not data:
+            return
+        low, dense = data[0], data[1]
+        for offset, count in enumerate(dense):
+            if count:
+                self.add(low + offset, count)
+        if len(data) > 2:
+            self.floor = data[2] if self.floor is None else max(self.floor, data[2])
+
+
+class QuantileSketch:
+    """DDSketch-style quantile sketch with relative accuracy `relative_accuracy`.
+
+    Counts may be negative in add() to remove values added before.
+    """
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, max_bins=MAX_BINS):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.zeros = 0
+        self.positive = _Buckets(max_bins)
+        self.negative = _Buckets(max_bins) # Indexed by magnitude
+
+    @property
+    def count(self):
+        return self.zeros + sum(self.positive.counts.values()) + sum(self.negative.counts.values())
+
+    def _index(self, magnitude):
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, index):
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        value = float(value)
+        if value > 0:
+            self.positive.add(self._index(value), count)
+        elif value < 0:
+            self.negative.add(self._index(-value), count)
+        else:
+            self.zeros = max(0, self.zeros + count)
+
+    def merge(self, other):
+        """Adds the counts of `other`, which must have the same relative accuracy."""
+        if other.gamma != self.gamma:
+            raise ValueError(f"Cannot merge sketches of accuracy {other.relative_accuracy} "
+                             f"and {self.relative_accuracy}")
+        self.zeros += other.zeros
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            if theirs.floor is not None:
+                mine.floor = theirs.floor if mine.floor is None else max(mine.floor, theirs.floor)
+                for index in [index for index in mine.counts if index < mine.floor]:
+                    mine.add(mine.floor, mine.counts.pop(index))
+            for index, count in theirs.counts.items():
+                mine.add(index, count)
+        return self
+
+    def quantile(self, q):
+        """The value at quantile q (0..1), or None for an empty sketch."""
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.negative.counts, reverse=True):
+            seen += self.negative.counts[index]
+            if seen > rank:
+                return -self._value(index)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive.counts):
+            seen += self.positive.counts[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.positive.counts)) if self.positive.counts else 0.0
+
+    def to_json(self):
+        data = {"zeros": self.zeros} if self.zeros else {}
+        for key, buckets in (("pos", self.positive), ("neg", self.negative)):
+            dense = buckets.to_json()
+            if dense:
+                data[key] = dense
+        return data
+
+    @classmethod
+    def from_json(cls, data, relative_accuracy=RELATIVE_ACCURACY):
+        sketch = cls(relative_accuracy)
+        sketch.zeros = data.get("zeros", 0)
+        sketch.positive.load(data.get("pos"))
+        sketch.negative.load(data.get("neg"))
+        return sketch
+
+
+def percentiles(sketch, quantiles=QUANTILES):
+    """Rounded values of `sketch` at each of `quantiles`; None for each when it is empty."""
+    values = [sketch.quantile(q) if sketch is not None else None for q in quantiles]
+    return [round(value) if value is not None else None for value in values]
+
+
+class SketchStore:
+    """Latency sketches of the PR rows by repo ("owner/name"), creation month and column.
+
+    Sketches are created on first use, so memory grows with the number of
+    (repo, month) pairs, not with the number of PRs.
+    """
+
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.repos = defaultdict(dict) # repo -> month -> column -> QuantileSketch
+
+    def sketch(self, repo, month, column):
+        columns = self.repos[repo].setdefault(month, {})
+        if column not in columns:
+            columns[column] = QuantileSketch(self.relative_accuracy)
+        return columns[column]
+
+    def add_row(self, row, count=1):
+        """Adds (count=-1: removes) the latencies of one prs.csv row; blank columns are skipped."""
+        created = row.get("created_date") or ""
+        if len(created) < 7:
+            return
+        repo = f"{row.get('repo_owner', '')}/{row.get('repo_name', '')}"
+        for column in LATENCY_COLUMNS:
+            value = row.get(column)
+            if value not in (None, ""):
+                self.sketch(repo, created[:7], column).add(value, count)
+
+    def add_rows(self, rows, count=1):
+        for row in rows:
+            self.add_row(row, count)
+        return self
+
+    def drop_months(self, repo, first, last):
+        """Forgets the sketches of `repo` for the months `first`..`last` (YYYY-MM, inclusive)."""
+        months = self.repos.get(repo, {})
+        for month in [month for month in months if first <= month <= last]:
+            del months[month]
+        return self
+
+    def merge(self, other):
+        for repo, months in other.repos.items():
+            for month, columns in months.items():
+                for column, sketch in columns.items():
+                    self.sketch(repo, month, column).merge(sketch)
+        return self
+
+    def merged(self, months=None, repos=None):
+        """{column: QuantileSketch} over the given months and repos (default: all of them)."""
+        result = {}
+        for repo, by_month in self.repos.items():
+            if repos is not None and repo not in repos:
+                continue
+            for month, columns in by_month.items():
+                if months is not None and month not in months:
+                    continue
+                for column, sketch in columns.items():
+                    result.setdefault(column, QuantileSketch(self.relative_accuracy)).merge(sketch)
+        return result
+
+    def months(self):
+        return sorted({month for by_month in self.repos.values() for month in by_month})
+
+    def to_json(self):
+        repos = {}
+        for repo, by_month in self.repos.items():
+            for month, columns in by_month.items():
+                stored = {column: sketch.to_json() for column, sketch in columns.items() if sketch.count}
+                if stored:
+                    repos.setdefault(repo, {})[month] = stored
+        return {"relative_accuracy": self.relative_accuracy, "columns": LATENCY_COLUMNS, "repos": repos}
+
+    @classmethod
+    def from_json(cls, data):
+        store = cls(data.get("relative_accuracy", RELATIVE_ACCURACY))
+        for repo, by_month in data.get("repos", {}).items():
+            for month, columns in by_month.items():
+                for column, sketch in columns.items():
+                    store.repos[repo].setdefault(month, {})[column] = \
+                        QuantileSketch.from_json(sketch, store.relative_accuracy)
+        return store
+
+    @classmethod
+    def load(cls, path):
+        """The store saved at `path`, or None if there is none (or it cannot be read)."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls.from_json(json.load(f))
+        except (IOError, ValueError) as e:
+            print(f"  Could not read sketches {path}: {e}", file=sys.stderr)
+            return None
+
+    def save(self, path):
+        """Writes the store atomically, with sorted keys so unchanged sketches give an identical file."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, path)
+
+
+def sketch_path(output_csv):
+    return output_csv + SKETCH_SUFFIX
+
+
+# --- Main Execution ---
+def main():
+    paths = sys.argv[1:]
+    if not paths:
+        print(__doc__.strip(), file=sys.stderr)
+        sys.exit(1)
+    store = None
+    for path in paths:
+        loaded = SketchStore.load(path)
+        if loaded is None:
+            print(f"Skipping {path}: no sketches found.", file=sys.stderr)
+            continue
+        store = loaded if store is None else store.merge(loaded)
+    if store is None:
+        sys.exit(1)
+
+    groups = [(repo, [repo]) for repo in sorted(store.repos)] if REPORT_BY_REPO else [("all repos", None)]
+    labels = [f"p{round(q * 100)}" for q in QUANTILES]
+    for label, repos in groups:
+        print(f"--- {label} ---")
+        print(f"{'month':<8} {'column':<26} {'count':>6} " + " ".join(f"{name:>8}" for name in labels))
+        for month in store.months() + ["all"]:
+            sketches = store.merged(months=None if month == "all" else [month], repos=repos)
+            for column in LATENCY_COLUMNS:
+                sketch = sketches.get(column)
+                if sketch is None or not sketch.count:
+                    continue
+                values = " ".join(f"{value:>8}" for value in percentiles(sketch))
+                print(f"{month:<8} {column:<26} {sketch.count:>6} {values}")
+
+
+if __name__ == "__main__":
+    main()
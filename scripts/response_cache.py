@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Persistent on-disk cache for GitHub GraphQL responses.
+
+Entries live in a small SQLite database keyed by a hash of the query text and
+its variables. Ordinary entries expire after a TTL; entries describing data
+that can no longer change (e.g. commit authors of a merged PR) are stored as
+immutable and only leave the cache through size-bounded LRU eviction.
+
+Callers opt in per query (GraphQLClient.query(use_cache=True)), and only
+for two kinds of data:
+
+- Pages reached by a cursor: commit history of a full fetch, issue pages
+  and PR search pages. Every run stores them, but only a run resuming from
+  its checkpoint reads them back. So a re-run after a crash does not pay
+  again for pages the crashed run fetched, and no other run sees them.
+- Commit authors of MERGED/CLOSED PRs, stored as immutable by fetch_issues.py.
+
+Everything else is always fetched: first pages and sync walks, which show
+what changed since the last run; search counts; review and timeline
+follow-ups; webhook lookups; and dry-run probes.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# --- Configuration ---
+# Path of the cache database; set RESPONSE_CACHE=off to disable caching.
+CACHE_PATH = os.environ.get("RESPONSE_CACHE", ".cache/github_responses.sqlite")
+CACHE_TTL_SEC = int(os.environ.get("RESPONSE_CACHE_TTL_SEC", str(6 * 3600)))
+CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_MB", "256")) * 1024 * 1024
+EVICTION_CHECK_EVERY = 100 # Writes between size checks
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    immutable INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+"""
+
+
+def query_key(query, variables=None):
+    """Stable cache key for a GraphQL query and its variables."""
+    payload = json.dumps({"query": query, "variables": variables or {}}, sort_keys=True)
+    return "q:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe SQLite-backed cache with TTL expiry and size-bounded eviction."""
+
+    def __init__(self, path, ttl_sec=CACHE_TTL_SEC, max_bytes=CACHE_MAX_BYTES):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._writes_since_check = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    # --- Generic key/value API ---
+    def get(self, key):
+        """Returns the decoded value for `key`, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, immutable FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at, immutable = row
+            if not immutable and created_at + self.ttl_sec < now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value, immutable=False):
+        """Stores a JSON-serialisable value. Immutable entries never expire by TTL."""
+        encoded = json.dumps(value, separators=(",", ":"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at, immutable) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now, 1 if immutable else 0)
+            )
+            self._conn.commit()
+            self.writes += 1
+            self._writes_since_check += 1
+            if self._writes_since_check >= EVICTION_CHECK_EVERY:
+                self._writes_since_check = 0
+                self._evict()
+
+    # --- GraphQL convenience wrappers ---
+    def get_query(self, query, variables=None):
+        return self.get(query_key(query, variables))
+
+    def set_query(self, query, variables, response, immutable=False):
+        self.set(query_key(query, variables), response, immutable)
+
+    # --- Maintenance ---
+    def _evict(self):
+        """Drops expired entries, then least recently used ones until under max_bytes."""
+        cutoff = time.time() - self.ttl_sec
+        cursor = self._conn.execute("DELETE FROM entries WHERE immutable = 0 AND created_at < ?", (cutoff,))
+        self.evictions += cursor.rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            target = int(self.max_bytes * 0.9) # Leave headroom so we don't evict on every write
+            freed = 0
+            doomed = []
+            for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                if total - freed <= target:
+                    break
+                doomed.append((key,))
+                freed += size
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+            self.evictions += len(doomed)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self._conn.close()
+
+    def summary(self):
+        """One-line cache statistics for the end of a run."""
+        lookups = self.hits + self.misses
+        hit_rate = f"{100 * self.hits / lookups:.0f}%" if lookups else "n/a"
+        return (f"Response cache ({self.path}): {self.hits} hits, {self.misses} misses "
+                f"({hit_rate} hit rate), {self.writes} writes, {self.evictions} evictions")
+
+
+def open_default_cache():
+    """Opens the cache configured by RESPONSE_CACHE, or returns None when disabled."""
+    if not CACHE_PATH or CACHE_PATH.lower() in ("off", "0", "false", "none"):
+        return None
+    try:
+        return ResponseCache(CACHE_PATH)
+    except sqlite3.Error as e:
+        print(f"Warning: could not open response cache at {CACHE_PATH}: {e}. Continuing without it.", file=sys.stderr)
+        return None
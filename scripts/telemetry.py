@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Lightweight span recording for API requests and fetch stages.
+
+Every GraphQL request (including cache hits and retried attempts) and every
+stage of a fetcher is recorded as a span: name, start time, duration and
+attributes such as HTTP status, rateLimit cost/remaining, bytes received or
+rows written. Spans go to either or both of:
+
+    TELEMETRY_FILE=telemetry.jsonl   one JSON object per span, appended as it ends
+    TELEMETRY_SUMMARY=true           a per-span-name table printed at the end of the run
+
+With neither set, recording is a no-op.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Configuration ---
+TELEMETRY_FILE = os.environ.get("TELEMETRY_FILE", "")
+TELEMETRY_SUMMARY = os.environ.get("TELEMETRY_SUMMARY", "").lower() in ("1", "true", "yes")
+# Attributes summed per span name in the summary table
+SUMMED_ATTRIBUTES = ["cost", "bytes", "rows", "retries"]
+
+
+class Telemetry:
+    """Thread-safe span recorder writing JSON lines and/or aggregating a summary."""
+
+    def __init__(self, path=None, summary=False):
+        self.enabled = bool(path) or summary
+        self.summary_enabled = summary
+        self._lock = threading.Lock()
+        self.path = path
+        self._file = None # Opened with the first span, so importing a script opens nothing
+        self._stats = {} # name -> {"durations": [...], attribute: total}
+        self.run_id = f"{int(time.time())}-{os.getpid()}"
+
+    def record(self, name, start, duration, **attributes):
+        """Records one finished span. `start` is epoch seconds, `duration` seconds."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self.path:
+                if self._file is None:
+                    self._file = open(self.path, "a", encoding="utf-8")
+                span = {"run": self.run_id, "span": name, "start": round(start, 3),
+                        "duration_ms": round(duration * 1000, 2), "thread": threading.current_thread().name}
+                span.update(attributes)
+                self._file.write(json.dumps(span, separators=(",", ":"), default=str) + "\n")
+                self._file.flush()
+            if self.summary_enabled:
+                stats = self._stats.setdefault(name, {"durations": []})
+                stats["durations"].append(duration)
+                for attribute in SUMMED_ATTRIBUTES:
+                    value = attributes.get(attribute)
+                    if isinstance(value, (int, float)):
+                        stats[attribute] = stats.get(attribute, 0) + value
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Times the enclosed block. Yields a dict; attributes added to it are recorded too.
+
+        A block that raises is recorded with error=<exception type> and the exception propagates.
+        """
+        if not self.enabled:
+            yield {}
+            return
+        start = time.time()
+        began = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            self.record(name, start, time.perf_counter() - began, **attributes)
+
+    def summary_table(self):
+        """Per span name: count, total/mean/p50/p95/max milliseconds and summed attributes."""
+        with self._lock:
+            stats = {name: dict(values, durations=sorted(values["durations"])) for name, values in self._stats.items()}
+        if not stats:
+            return "Telemetry: no spans recorded."
+        header = (f"{'span':<28} {'count':>6} {'total s':>9} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}"
+                  + "".join(f" {attribute:>9}" for attribute in SUMMED_ATTRIBUTES))
+        lines = [header, "-" * len(header)]
+        for name in sorted(stats):
+            durations = stats[name]["durations"]
+            count = len(durations)
+            total = sum(durations)
+            p50 = durations[(count - 1) // 2]
+            p95 = durations[min(count - 1, int(count * 0.95))]
+            line = (f"{name:<28} {count:>6} {total:>9.2f} {1000 * total / count:>9.1f} "
+                    f"{1000 * p50:>9.1f} {1000 * p95:>9.1f} {1000 * durations[-1]:>9.1f}")
+            line += "".join(f" {stats[name].get(attribute, ''):>9}" for attribute in SUMMED_ATTRIBUTES)
+            lines.append(line)
+        return "\n".join(lines)
+
+    def report(self):
+        """Prints the summary (when enabled) and closes the JSON lines file."""
+        if self.summary_enabled:
+            print(self.summary_table(), file=sys.stderr)
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+                print(f"Telemetry spans written to {self.path}", file=sys.stderr)
+
+
+# Process-wide recorder shared by the client and the fetchers
+telemetry = Telemetry(TELEMETRY_FILE, TELEMETRY_SUMMARY)
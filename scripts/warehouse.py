@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Optional SQLite warehouse holding everything the fetchers have seen.
+
+Set WAREHOUSE_DB=path/to/activity.sqlite and every fetcher upserts its rows
+into the store as pages arrive, alongside the CSVs. Tables:
+
+    commits      one row per commit                      (repo, sha)
+    issues       one row per issue                       (repo, issue_number)
+    prs          one row per PR with its lifecycle times (repo, pr_number)
+    reviews      one row per submitted review            (repo, pr_number, reviewer, submitted_at)
+    pr_authors   commit authors of PRs linked to issues  (repo, pr_number, author)
+
+Each table is indexed by repo and date, and by author where it has one, so
+per-author, per-date and per-PR questions are index lookups. The CSVs the
+dashboard reads can be regenerated from the store with a single query:
+
+    python scripts/warehouse.py export commits commits.csv [owner/name] [since]
+    python scripts/warehouse.py import commits commits.csv    # load an existing CSV
+"""
+import csv
+import os
+import sqlite3
+import sys
+import threading
+
+# --- Configuration ---
+# Path of the warehouse database; unset (or "off") disables it.
+WAREHOUSE_DB = os.environ.get("WAREHOUSE_DB", "")
+
+# Columns per table, in CSV order; `key` is the primary key, `date` the column exports filter and sort on,
+# newest first, as the fetchers write the CSVs (issues are fetched and windowed by when they were updated).
+TABLES = {
+    "commits": {
+        "columns": ["sha", "message", "created_date", "number_of_files_updated", "diff", "author",
+                    "repo_owner", "repo_name"],
+        "key": ["repo_owner", "repo_name", "sha"],
+        "date": "created_date",
+    },
+    "issues": {
+        "columns": ["issue_id", "issue_number", "title", "state", "created_date", "closed_date",
+                    "contributors", "repo_owner", "repo_name", "updated_date"],
+        "key": ["repo_owner", "repo_name", "issue_number"],
+        "date": "updated_date",
+    },
+    "prs": {
+        "columns": ["pr_number", "created_date", "time_to_first_review_sec", "time_to_approval_sec",
+                    "time_to_merge_sec", "was_merged", "updated_date", "repo_owner", "repo_name"],
+        "key": ["repo_owner", "repo_name", "pr_number"],
+        "date": "created_date",
+    },
+    "reviews": {
+        "columns": ["pr_number", "reviewer", "state", "submitted_at", "repo_owner", "repo_name"],
+        "key": ["repo_owner", "repo_name", "pr_number", "reviewer", "submitted_at"],
+        "date": "submitted_at",
+    },
+    "pr_authors": {
+        "columns": ["pr_number", "author", "repo_owner", "repo_name"],
+        "key": ["repo_owner", "repo_name", "pr_number", "author"],
+        "date": None,
+    },
+}
+
+INTEGER_COLUMNS = {"issue_number", "pr_number", "number_of_files_updated", "diff",
+                   "time_to_first_review_sec", "time_to_approval_sec", "time_to_merge_sec", "was_merged"}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS commits_repo_date ON commits (repo_owner, repo_name, created_date);
+CREATE INDEX IF NOT EXISTS commits_author ON commits (author, created_date);
+CREATE INDEX IF NOT EXISTS issues_repo_date ON issues (repo_owner, repo_name, created_date);
+CREATE INDEX IF NOT EXISTS issues_repo_updated ON issues (repo_owner, repo_name, updated_date);
+CREATE INDEX IF NOT EXISTS prs_repo_date ON prs (repo_owner, repo_name, created_date);
+CREATE INDEX IF NOT EXISTS prs_repo_updated ON prs (repo_owner, repo_name, updated_date);
+CREATE INDEX IF NOT EXISTS reviews_reviewer ON reviews (reviewer, submitted_at);
+CREATE INDEX IF NOT EXISTS pr_authors_author ON pr_authors (author);
+"""
+
+
+def _create_table_sql(table, spec):
+    columns = ", ".join(
+        f"{column} {'INTEGER' if column in INTEGER_COLUMNS else 'TEXT'}" for column in spec["columns"]
+    )
+    return f"CREATE TABLE IF NOT EXISTS {table} ({columns}, PRIMARY KEY ({', '.join(spec['key'])}))"
+
+
+def _upsert_sql(table, spec):
+    columns = spec["columns"]
+    updates = [column for column in columns if column not in spec["key"]]
+    conflict = f"DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in updates)}" if updates else "DO NOTHING"
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT ({', '.join(spec['key'])}) {conflict}")
+
+
+class Warehouse:
+    """Thread-safe SQLite store; each upsert call is one transaction.
+
+    The database is opened on first use, so the fetch scripts can create the
+    shared warehouse on import: row worker processes (process_pool.py) import
+    them too, and never open it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._failed = False # Could not be opened; upserts are skipped
+        self._upserts = {table: _upsert_sql(table, spec) for table, spec in TABLES.items()}
+
+    def _connection(self):
+        """The writer connection, opened and set up on first use; None if it cannot be. Call with the lock held."""
+        if self._conn is None and not self._failed:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode = WAL") # Readers don't block the fetchers
+                conn.execute("PRAGMA synchronous = NORMAL")
+                for table, spec in TABLES.items():
+                    conn.execute(_create_table_sql(table, spec))
+                conn.executescript(INDEXES)
+                self._conn = conn
+            except (sqlite3.Error, OSError) as e:
+                print(f"Warning: could not open warehouse at {self.path}: {e}. Continuing without it.", file=sys.stderr)
+                self._failed = True
+        return self._conn
+
+    def upsert(self, table, rows):
+        """Inserts or updates dict rows (as written to the CSVs) by primary key. Returns the row count."""
+        columns = TABLES[table]["columns"]
+        values = [
+            tuple(None if row.get(column) in ("", None) else row[column] for column in columns)
+            for row in rows
+        ]
+        if not values:
+            return 0
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return 0
+            with conn:
+                conn.executemany(self._upserts[table], values)
+        return len(values)
+
+    def delete(self, table, rows):
+        """Deletes rows matching the primary key of each dict in `rows`. Returns the row count."""
+        key = TABLES[table]["key"]
+        values = [tuple(row[column] for column in key) for row in rows]
+        if not values:
+            return 0
+        sql = f"DELETE FROM {table} WHERE {' AND '.join(f'{column} = ?' for column in key)}"
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return 0
+            with conn:
+                conn.executemany(sql, values)
+        return len(values)
+
+    def iter_rows(self, table, repo_owner=None, repo_name=None, since=None):
+        """Yields rows of `table` as tuples in CSV column order, newest first.
+
+        Filters on repo and on the table's date column (`since` is an inclusive
+        ISO-8601 prefix such as "2025-01-01").
+        """
+        spec = TABLES[table]
+        where, params = [], []
+        if repo_owner:
+            where.append("repo_owner = ? AND repo_name = ?")
+            params += [repo_owner, repo_name]
+        if since and spec["date"]:
+            where.append(f"{spec['date']} >= ?")
+            params.append(since)
+        sql = f"SELECT {', '.join(spec['columns'])} FROM {table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        order = [f"{spec['date']} DESC"] if spec["date"] else []
+        sql += " ORDER BY " + ", ".join(order + spec["key"])
+        with self._lock:
+            if self._connection() is None: # Also creates the tables of a new database
+                return
+        # A separate connection streams the result without holding the writers' lock (WAL mode)
+        reader = sqlite3.connect(self.path)
+        try:
+            yield from reader.execute(sql, params)
+        finally:
+            reader.close()
+
+    def export_csv(self, table, output_csv, repo_owner=None, repo_name=None, since=None):
+        """Writes `table` (optionally one repo, rows since `since`) to a CSV. Returns the row count."""
+        tmp_path = output_csv + ".tmp"
+        count = 0
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(TABLES[table]["columns"])
+            for row in self.iter_rows(table, repo_owner, repo_name, since):
+                writer.writerow("" if value is None else value for value in row)
+                count += 1
+        os.replace(tmp_path, output_csv)
+        return count
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_shared_warehouse = None
+_shared_warehouse_lock = threading.Lock()
+
+def shared_warehouse():
+    """Returns the process-wide warehouse configured by WAREHOUSE_DB, or None when disabled."""
+    global _shared_warehouse
+    if not WAREHOUSE_DB or WAREHOUSE_DB.lower() in ("off", "0", "false", "none"):
+        return None
+    with _shared_warehouse_lock:
+        if _shared_warehouse is None:
+            _shared_warehouse = Warehouse(WAREHOUSE_DB)
+        return _shared_warehouse
+
+
+# --- Main Execution ---
+def main():
+    usage = ("Usage: warehouse.py export <table> <output.csv> [owner/name] [since]\n"
+             "       warehouse.py import <table> <input.csv>")
+    args = sys.argv[1:]
+    if len(args) < 3 or args[0] not in ("export", "import") or args[1] not in TABLES:
+        print(usage, file=sys.stderr)
+        sys.exit(1)
+    warehouse = shared_warehouse()
+    if warehouse is None:
+        print("Error: set WAREHOUSE_DB to the warehouse database path.", file=sys.stderr)
+        sys.exit(1)
+
+    command, table, path = args[:3]
+    if command == "export":
+        owner, name = args[3].split("/", 1) if len(args) > 3 else (None, None)
+        since = args[4] if len(args) > 4 else None
+        count = warehouse.export_csv(table, path, owner, name, since)
+        print(f"Exported {count} {table} rows to {path}")
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            count = warehouse.upsert(table, csv.DictReader(f))
+        print(f"Imported {count} {table} rows from {path} into {warehouse.path}")
+    warehouse.close()
+
+
+if __name__ == "__main__":
+    main()
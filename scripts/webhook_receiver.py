@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""Webhook receiver that keeps the CSVs current between scheduled fetches.
+
+GitHub delivers `push`, `pull_request`, `pull_request_review` and `issues`
+events for PUBLIC_REPO_OWNER/PUBLIC_REPO_NAME to this service. Every
+WEBHOOK_FLUSH_SEC it rebuilds the rows those events touched, upserts them
+into commits.csv, issues.csv and prs.csv (and the warehouse when
+WAREHOUSE_DB is set), and rebuilds the dashboard JSON. A flush costs a few
+points at most:
+
+    push                 stats of the pushed commits: one aliased `object(oid:)` query per 100 commits
+    pull_request(_review) the PR and its reviews, as fetch_prs.py builds them: one query per 50 PRs
+    issues               nothing; the row comes from the payload, contributors from the existing row
+
+Some changes cannot be applied event by event: deliveries missed while the
+service was down, force pushes, pushes of more than 20 commits (the payload
+lists at most 20) and newly linked PRs changing an issue's contributors.
+Reconciliation catches them by running the incremental fetchers every
+WEBHOOK_RECONCILE_SEC. Commits are also synced right after a force push or
+a truncated push. Every query the receiver makes, reconciliation included,
+bypasses the response cache, so each flush sees the current state.
+
+    WEBHOOK_PORT=8080
+    WEBHOOK_SECRET=...              the webhook's secret; deliveries need a valid X-Hub-Signature-256
+    WEBHOOK_INSECURE=1              start without WEBHOOK_SECRET and accept unsigned deliveries (local testing only)
+    WEBHOOK_FLUSH_SEC=60            how often touched rows are written
+    WEBHOOK_RECONCILE_SEC=21600     how often the incremental fetchers run (0: never)
+    WEBHOOK_RECORD=events.jsonl     append every accepted delivery here, for replay
+    WEBHOOK_WINDOW_MONTHS=3         move SINCE_DATE and DATE_RANGE with the clock, as the scheduled workflows
+                                    set them (0: keep the values given at startup until a restart)
+    WEBHOOK_DASHBOARD=false         do not rebuild dashboard/<dataset>/ after a flush
+
+Recorded deliveries can be replayed, in order, against a running receiver:
+
+    python scripts/webhook_receiver.py                                  # serve
+    python scripts/webhook_receiver.py replay events.jsonl [http://localhost:8080/]
+"""
+import calendar
+import hashlib
+import hmac
+import http.server
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+import build_dashboard_data
+import fetch_commits
+import fetch_issues
+import fetch_prs
+from columnar_store import export_columnar
+from csv_store import StreamingCSVWriter, iter_rows
+from github_client import RATE_LIMIT_FRAGMENT, print_run_summary, shared_client
+from quantile_sketch import SketchStore, sketch_path
+from telemetry import telemetry
+from warehouse import shared_warehouse
+
+# --- Configuration ---
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN")
+PUBLIC_REPO_OWNER = os.environ.get("PUBLIC_REPO_OWNER")
+PUBLIC_REPO_NAME = os.environ.get("PUBLIC_REPO_NAME")
+SINCE_DATE_ISO = os.environ.get("SINCE_DATE")
+DATE_RANGE = os.environ.get("DATE_RANGE")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+WEBHOOK_INSECURE = os.environ.get("WEBHOOK_INSECURE", "").lower() in ("1", "true", "yes")
+WEBHOOK_FLUSH_SEC = float(os.environ.get("WEBHOOK_FLUSH_SEC", "60"))
+WEBHOOK_RECONCILE_SEC = float(os.environ.get("WEBHOOK_RECONCILE_SEC", "21600"))
+WEBHOOK_RECORD = os.environ.get("WEBHOOK_RECORD", "")
+WEBHOOK_DASHBOARD = os.environ.get("WEBHOOK_DASHBOARD", "true").lower() in ("1", "true", "yes")
+WEBHOOK_WINDOW_MONTHS = max(0, int(os.environ.get("WEBHOOK_WINDOW_MONTHS", "0")))
+EVENTS = ("push", "pull_request", "pull_request_review", "issues")
+PUSH_PAYLOAD_COMMIT_LIMIT = 20 # Push payloads list at most this many commits
+COMMIT_BATCH_SIZE = 100 # Max commits looked up in one aliased query
+# Per dataset: (CSV written by its fetcher, columns, key column)
+DATASETS = {
+    "commits": (fetch_commits.OUTPUT_CSV, fetch_commits.CSV_FIELDS, "sha"),
+    "issues": (fetch_issues.OUTPUT_CSV, fetch_issues.CSV_FIELDS, "issue_id"),
+    "prs": (fetch_prs.OUTPUT_CSV, fetch_prs.CSV_FIELDS, "pr_number"),
+}
+
+client = shared_client()
+warehouse = shared_warehouse() # None unless WAREHOUSE_DB is set
+
+# Pushed commits, looked up by SHA. Fields as in fetch_commits' history query.
+COMMIT_SELECTION = '''
+    c%(i)d: object(oid: $oid%(i)d) {
+      ... on Commit {
+        oid
+        messageHeadline
+        committedDate
+        changedFilesIfAvailable
+        additions
+        deletions
+        author {
+          name
+          email
+          user {
+            login
+          }
+        }
+      }
+    }'''
+
+# PRs touched by events, by number, shaped like fetch_prs' search result nodes
+PR_SELECTION = '''
+  pr%(i)d: repository(owner: $owner, name: $name) {
+    pullRequest(number: $number%(i)d) {
+      number
+      author {
+        login
+      }
+      state
+      createdAt
+      updatedAt
+      mergedAt
+      timelineItems(itemTypes: [PULL_REQUEST_REVIEW], first: %(per_page)d) { ...ReviewPage }
+    }
+  }'''
+
+
+# --- Deliveries ---
+def signature(body):
+    return "sha256=" + hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+class PendingUpdates:
+    """What the deliveries since the last flush touched, keyed so repeated events coalesce."""
+
+    def __init__(self):
+        self.commit_shas = [] # Newest first, like the history API
+        self.pr_numbers = set()
+        self.issues = {} # issue_id -> latest issue payload
+        self.deleted_issues = {} # issue_id -> issue number
+        self.reconcile = set() # Datasets to re-sync with their incremental fetcher
+
+    def __bool__(self):
+        return bool(self.commit_shas or self.pr_numbers or self.issues or self.deleted_issues or self.reconcile)
+
+
+def handle_event(event, payload, pending):
+    """Notes in `pending` what one delivery touched. Returns a short description for the log."""
+    action = payload.get("action")
+    if event == "push":
+        if payload.get("ref") != f"refs/heads/{payload['repository']['default_branch']}":
+            return f"push to {payload.get('ref')}, not the default branch; ignored"
+        commits = payload.get("commits") or []
+        if payload.get("forced") or len(commits) >= PUSH_PAYLOAD_COMMIT_LIMIT:
+            pending.reconcile.add("commits")
+            return "force push or push of more commits than the payload lists; commits will be synced"
+        # Payloads list commits oldest first
+        pending.commit_shas[:0] = [commit["id"] for commit in reversed(commits)]
+        return f"push of {len(commits)} commits"
+    if event in ("pull_request", "pull_request_review"):
+        number = payload["pull_request"]["number"]
+        pending.pr_numbers.add(number)
+        return f"{event} {action} on #{number}"
+    issue = payload["issue"]
+    if action in ("deleted", "transferred"):
+        pending.issues.pop(issue["node_id"], None)
+        pending.deleted_issues[issue["node_id"]] = issue["number"]
+    else:
+        pending.deleted_issues.pop(issue["node_id"], None)
+        pending.issues[issue["node_id"]] = issue
+    return f"issues {action} on #{issue['number']}"
+
+
+# --- Rows ---
+def build_commits_query(batch_len):
+    params = ["$owner: String!, $name: String!"] + [f"$oid{i}: GitObjectID!" for i in range(batch_len)]
+    selections = "".join(COMMIT_SELECTION % {"i": i} for i in range(batch_len))
+    return "query(%s) {\n  %s\n  repository(owner: $owner, name: $name) {%s\n  }\n}" % (
+        ", ".join(params), RATE_LIMIT_FRAGMENT, selections)
+
+
+def build_prs_query(batch_len):
+    params = ["$owner: String!, $name: String!"] + [f"$number{i}: Int!" for i in range(batch_len)]
+    selections = "".join(PR_SELECTION % {"i": i, "per_page": fetch_prs.REVIEWS_FIRST_PAGE} for i in range(batch_len))
+    return "query(%s) {\n  %s%s\n}\n%s" % (", ".join(params), RATE_LIMIT_FRAGMENT, selections,
+                                           fetch_prs.REVIEW_PAGE_FRAGMENT)
+
+
+def months_back(day, months):
+    """`day` (a date or datetime) `months` calendar months earlier, clamped to the end of a shorter month."""
+    year, month = divmod(day.year * 12 + day.month - 1 - months, 12)
+    return day.replace(year=year, month=month + 1, day=min(day.day, calendar.monthrange(year, month + 1)[1]))
+
+
+def current_window(now=None):
+    """(SINCE_DATE, DATE_RANGE) for one flush or reconciliation.
+
+    With WEBHOOK_WINDOW_MONTHS=N they are computed from `now` as the scheduled
+    workflows compute them: commits and issues from N months ago, PRs created
+    in the N full months before the current one. Otherwise they are the values
+    the receiver was started with.
+    """
+    if not WEBHOOK_WINDOW_MONTHS:
+        return SINCE_DATE_ISO, DATE_RANGE
+    now = now or datetime.now(timezone.utc)
+    first_of_month = now.date().replace(day=1)
+    return (f"{months_back(now, WEBHOOK_WINDOW_MONTHS):%Y-%m-%dT%H:%M:%SZ}",
+            f"{months_back(first_of_month, WEBHOOK_WINDOW_MONTHS)}..{first_of_month - timedelta(days=1)}")
+
+
+def commit_rows(owner, name, shas, since_iso):
+    """commits.csv rows for `shas` committed since `since_iso` (all of them if it is None), in the given order."""
+    rows = []
+    for start in range(0, len(shas), COMMIT_BATCH_SIZE):
+        batch = shas[start:start + COMMIT_BATCH_SIZE]
+        variables = {"owner": owner, "name": name}
+        variables.update((f"oid{i}", sha) for i, sha in enumerate(batch))
+        data = client.query(build_commits_query(len(batch)), variables, use_cache=False).get("data") or {}
+        repository = data.get("repository") or {}
+        for i in range(len(batch)):
+            node = repository.get(f"c{i}")
+            if node: # Unknown SHAs come back as null
+                row = fetch_commits.build_commit_row(node, owner, name)
+                if not since_iso or row["created_date"] >= since_iso:
+                    rows.append(row)
+    return rows
+
+
+def pr_records(owner, name, numbers, date_range):
+    """PRRecords with complete reviews for the PRs in `numbers` that were created inside `date_range`."""
+    bounds = fetch_prs.parse_date_range(date_range) if date_range else None
+    records = []
+    for start in range(0, len(numbers), fetch_prs.REVIEW_BATCH_SIZE):
+        batch = numbers[start:start + fetch_prs.REVIEW_BATCH_SIZE]
+        variables = {"owner": owner, "name": name}
+        variables.update((f"number{i}", number) for i, number in enumerate(batch))
+        data = client.query(build_prs_query(len(batch)), variables, use_cache=False).get("data") or {}
+        for i in range(len(batch)):
+            node = (data.get(f"pr{i}") or {}).get("pullRequest")
+            if node and (not bounds or bounds[0] <= node["createdAt"][:10] <= bounds[1]):
+                records.append(fetch_prs.compact_pr(node))
+    fetch_prs.fetch_remaining_reviews(records, owner, name)
+    return records
+
+
+def issue_rows(owner, name, issues):
+    """issues.csv rows built from issue payloads, keeping each issue's existing contributors."""
+    output_csv = DATASETS["issues"][0]
+    contributors = {}
+    if os.path.exists(output_csv):
+        contributors = {row["issue_id"]: row["contributors"]
+                        for row in iter_rows(output_csv, lambda row: row["issue_id"] in issues)}
+    return [dict(zip(fetch_issues.CSV_FIELDS, [
+        issue_id,
+        issue["number"],
+        issue["title"],
+        issue["state"].upper(), # REST "open"/"closed", GraphQL OPEN/CLOSED
+        issue["created_at"],
+        issue.get("closed_at") or "",
+        contributors.get(issue_id, ""),
+        owner,
+        name,
+        issue.get("updated_at") or ""
+    ])) for issue_id, issue in issues.items()]
+
+
+def upsert_csv(dataset, rows, deleted_keys=()):
+    """Writes `rows` to the front of the dataset's CSV, replacing rows with the same key."""
+    output_csv, fields, key = DATASETS[dataset]
+    deleted = {str(k) for k in deleted_keys}
+    # Not <csv>.partial: that holds the rows of an interrupted fetch, which the next fetch resumes from
+    writer = StreamingCSVWriter(output_csv, fields, key=key, suffix=".webhook.tmp")
+    writer.write_rows(rows)
+    existing = iter_rows(output_csv, lambda row: row[key] not in deleted) if os.path.exists(output_csv) else ()
+    total = writer.finalize(existing)
+    print(f"  Upserted {len(rows)} rows into {output_csv} ({total} rows).")
+    export_columnar(output_csv, dataset)
+
+
+# --- Flush and reconciliation ---
+def reconcile(owner, name, dataset, since_iso, date_range):
+    """Re-syncs one dataset with its incremental fetcher, bypassing the response cache. Returns True on success."""
+    print(f"Reconciling {dataset} for {owner}/{name}...")
+    with telemetry.span("webhook.reconcile", dataset=dataset) as span, client.bypass_cache():
+        try:
+            if dataset == "commits":
+                succeeded = fetch_commits.fetch_commits(owner, name, since_iso, incremental=True)
+            elif dataset == "issues":
+                succeeded = fetch_issues.fetch_issues(owner, name, since_iso, incremental=True, workers=1)
+            else:
+                fetch_prs.fetch_prs(owner, name, date_range, incremental=True, workers=1)
+                succeeded = True
+        except Exception as e:
+            print(f"Reconciling {dataset} failed: {e}", file=sys.stderr)
+            succeeded = False
+        span["ok"] = succeeded
+    return succeeded
+
+
+def flush(owner, name, pending):
+    """Applies `pending` to the CSVs, the warehouse and the dashboard JSON.
+
+    Raises on API errors; everything written so far is an idempotent upsert,
+    so the caller keeps `pending` and retries the whole flush later.
+    """
+    changed = set()
+    since_iso, date_range = current_window()
+    with telemetry.span("webhook.flush", commits=len(pending.commit_shas), prs=len(pending.pr_numbers),
+                        issues=len(pending.issues) + len(pending.deleted_issues)):
+        if pending.commit_shas:
+            rows = commit_rows(owner, name, list(dict.fromkeys(pending.commit_shas)), since_iso)
+            upsert_csv("commits", rows)
+            if warehouse:
+                warehouse.upsert("commits", rows)
+            changed.add("commits")
+        if pending.pr_numbers:
+            records = pr_records(owner, name, sorted(pending.pr_numbers), date_range)
+            rows = fetch_prs.process_pr_chunk(records, (owner, name))
+            numbers = {str(row["pr_number"]) for row in rows}
+            sketches = fetch_prs.updated_sketches(fetch_prs.OUTPUT_CSV, SketchStore().add_rows(rows),
+                                                  lambda row: row["pr_number"] in numbers
+                                                  and (row["repo_owner"], row["repo_name"]) == (owner, name))
+            upsert_csv("prs", rows)
+            sketches.save(sketch_path(fetch_prs.OUTPUT_CSV))
+            if warehouse:
+                warehouse.upsert("prs", rows)
+                warehouse.upsert("reviews", (review for pr in records for review in fetch_prs.review_rows(pr, owner, name)))
+            changed.add("prs")
+        if pending.issues or pending.deleted_issues:
+            rows = issue_rows(owner, name, pending.issues)
+            upsert_csv("issues", rows, deleted_keys=pending.deleted_issues)
+            if warehouse:
+                warehouse.upsert("issues", rows)
+                warehouse.delete("issues", [{"repo_owner": owner, "repo_name": name, "issue_number": number}
+                                            for number in pending.deleted_issues.values()])
+            changed.add("issues")
+    for dataset in sorted(pending.reconcile):
+        if reconcile(owner, name, dataset, since_iso, date_range):
+            changed.add(dataset)
+    if WEBHOOK_DASHBOARD:
+        for dataset in sorted(changed):
+            output_csv = DATASETS[dataset][0]
+            build_dashboard_data.publish(dataset, iter_rows(output_csv))
+
+
+def apply_loop(owner, name, events):
+    """Consumes (event, payload) pairs from `events` and flushes every WEBHOOK_FLUSH_SEC.
+
+    A None item flushes what is pending and ends the loop.
+    """
+    pending = PendingUpdates()
+    next_flush = time.monotonic() + WEBHOOK_FLUSH_SEC
+    next_reconcile = time.monotonic() + WEBHOOK_RECONCILE_SEC if WEBHOOK_RECONCILE_SEC > 0 else None
+    stopping = False
+    while not stopping:
+        try:
+            item = events.get(timeout=max(0, next_flush - time.monotonic()))
+        except queue.Empty:
+            item = ()
+        if item is None:
+            stopping = True
+        elif item:
+            event, payload = item
+            try:
+                print(f"Received {handle_event(event, payload, pending)}.")
+            except (KeyError, TypeError) as e:
+                print(f"Skipping malformed {event} delivery: missing {e}", file=sys.stderr)
+        now = time.monotonic()
+        if next_reconcile is not None and now >= next_reconcile:
+            pending.reconcile.update(DATASETS)
+            next_reconcile = now + WEBHOOK_RECONCILE_SEC
+        if (now >= next_flush or stopping) and pending:
+            try:
+                flush(owner, name, pending)
+                pending = PendingUpdates()
+            except Exception as e:
+                print(f"Flush failed, retrying with the next one: {e}", file=sys.stderr)
+        if now >= next_flush:
+            next_flush = now + WEBHOOK_FLUSH_SEC
+
+
+# --- HTTP ---
+class WebhookHandler(http.server.BaseHTTPRequestHandler):
+    """Validates deliveries, records them and queues them for the apply loop."""
+
+    record_lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, message):
+        body = (message + "\n").encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if WEBHOOK_SECRET and not hmac.compare_digest(signature(body), self.headers.get("X-Hub-Signature-256") or ""):
+            return self._reply(401, "invalid signature")
+        event = self.headers.get("X-GitHub-Event", "")
+        if event == "ping":
+            return self._reply(200, "pong")
+        if event not in EVENTS:
+            return self._reply(202, f"ignored {event or 'unknown'} event")
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._reply(400, "payload is not JSON")
+        repo = (payload.get("repository") or {}).get("full_name") or ""
+        if repo.lower() != f"{self.server.owner}/{self.server.name}".lower():
+            return self._reply(202, f"ignored event for {repo or 'no repository'}")
+        if WEBHOOK_RECORD:
+            delivery = {"event": event, "delivery": self.headers.get("X-GitHub-Delivery"), "payload": payload}
+            with self.record_lock, open(WEBHOOK_RECORD, "a", encoding="utf-8") as f:
+                f.write(json.dumps(delivery, separators=(",", ":")) + "\n")
+        self.server.events.put((event, payload))
+        self._reply(202, "queued")
+
+
+def replay(path, url):
+    """POSTs the deliveries recorded in `path` to a receiver at `url`, in order. Returns the failure count."""
+    session = requests.Session()
+    failures = 0
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            delivery = json.loads(line)
+            body = json.dumps(delivery["payload"], separators=(",", ":")).encode()
+            headers = {"Content-Type": "application/json", "X-GitHub-Event": delivery["event"],
+                       "X-GitHub-Delivery": delivery.get("delivery") or f"replay-{n}"}
+            if WEBHOOK_SECRET:
+                headers["X-Hub-Signature-256"] = signature(body)
+            response = session.post(url, data=body, headers=headers, timeout=30)
+            print(f"{n}: {delivery['event']} {delivery['payload'].get('action') or ''} -> "
+                  f"{response.status_code} {response.text.strip()}")
+            failures += not response.ok
+    return failures
+
+
+# --- Main Execution ---
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["replay"] and len(args) in (2, 3):
+        url = args[2] if len(args) == 3 else f"http://localhost:{WEBHOOK_PORT}/"
+        sys.exit(1 if replay(args[1], url) else 0)
+    if args:
+        print("Usage: webhook_receiver.py [replay <deliveries.jsonl> [url]]", file=sys.stderr)
+        sys.exit(1)
+    if not GITHUB_TOKEN:
+        print("Error: GITHUB_TOKEN environment variable not set.", file=sys.stderr)
+        sys.exit(1)
+    if not PUBLIC_REPO_OWNER or not PUBLIC_REPO_NAME:
+        print("Error: PUBLIC_REPO_OWNER and PUBLIC_REPO_NAME must be set.", file=sys.stderr)
+        sys.exit(1)
+    if not WEBHOOK_SECRET:
+        # Anyone who can reach the port could otherwise write to the CSVs and the warehouse
+        if not WEBHOOK_INSECURE:
+            print("Error: WEBHOOK_SECRET environment variable not set "
+                  "(set WEBHOOK_INSECURE=1 to accept unsigned deliveries).", file=sys.stderr)
+            sys.exit(1)
+        print("Warning: WEBHOOK_SECRET not set; accepting unsigned deliveries (WEBHOOK_INSECURE).", file=sys.stderr)
+
+    events = queue.Queue()
+    applier = threading.Thread(target=apply_loop, args=(PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME, events),
+                               name="webhook-apply")
+    applier.start()
+    server = http.server.ThreadingHTTPServer(("", WEBHOOK_PORT), WebhookHandler)
+    server.owner, server.name, server.events = PUBLIC_REPO_OWNER, PUBLIC_REPO_NAME, events
+    signal.signal(signal.SIGTERM, signal.default_int_handler) # Stop like Ctrl-C, flushing what is pending
+    print(f"Receiving webhooks for {PUBLIC_REPO_OWNER}/{PUBLIC_REPO_NAME} on port {WEBHOOK_PORT} "
+          f"(flush every {WEBHOOK_FLUSH_SEC:g}s, reconcile every {WEBHOOK_RECONCILE_SEC:g}s).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping; flushing pending updates...")
+    finally:
+        server.server_close()
+        events.put(None)
+        applier.join()
+        print_run_summary(client)
+
+
+if __name__ == "__main__":
+    main()